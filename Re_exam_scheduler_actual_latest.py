@@ -21,13 +21,15 @@ Excel/PDF layout matches re_exam_to_pdf.py exactly:
 
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta, date as _date
+from datetime import datetime, date as _date
 from fpdf import FPDF
 import os
 import re
 import io
 import traceback
-from PyPDF2 import PdfReader, PdfWriter
+
+from timetable_engine import Calendar, get_first_valid_days
+from timetable_layout import wrap_text
 
 # ── Streamlit compat ──────────────────────────────────────────────────────────
 if hasattr(st, "dialog"):
@@ -65,7 +67,6 @@ COLLEGES = [
 ]
 
 LOGO_PATH = "logo.png"
-wrap_text_cache = {}
 
 # ── CSS ───────────────────────────────────────────────────────────────────────
 st.markdown("""
@@ -220,14 +221,9 @@ def parse_input_file(uploaded_file):
 # SECTION 2 — SCHEDULING ENGINE
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def get_valid_dates(start: datetime, num_days: int, holidays: set) -> list:
-    """Return num_days working dates (Mon–Sat, excl. holidays) from start."""
-    valid, cur = [], start
-    while len(valid) < num_days:
-        if cur.weekday() != 6 and cur.date() not in holidays:   # 6 = Sunday
-            valid.append(cur)
-        cur += timedelta(days=1)
-    return valid
+def get_valid_dates(start: datetime, num_days: int, holidays: set) -> Calendar:
+    """Return the Calendar of num_days working dates (Mon–Sat, excl. holidays) from start."""
+    return get_first_valid_days(start, num_days, holidays)
 
 
 def schedule_reexams(df: pd.DataFrame, start_date: datetime,
@@ -252,7 +248,8 @@ def schedule_reexams(df: pd.DataFrame, start_date: datetime,
         cfg = time_slots_dict.get(slot_id, time_slots_dict[1])
         return f"{cfg['start']} - {cfg['end']}"
 
-    valid_dates = get_valid_dates(start_date, num_days, holidays)
+    # Dates are handled as prebuilt DD-MM-YYYY strings from here on
+    valid_dates = get_valid_dates(start_date, num_days, holidays).strs
 
     # Split OE / core
     oe_mask   = df['OE'].notna() & (df['OE'].astype(str).str.strip() != '')
@@ -294,8 +291,7 @@ def schedule_reexams(df: pd.DataFrame, start_date: datetime,
                 assigned_date = None
 
                 # Find the first available date without a clash for this cohort
-                for d in core_dates:
-                    d_str = d.strftime('%d-%m-%Y')
+                for d_str in core_dates:
                     is_free = True
                     for cohort in cohorts_for_subj:
                         if d_str in cohort_busy_dates.get(cohort, set()):
@@ -307,8 +303,7 @@ def schedule_reexams(df: pd.DataFrame, start_date: datetime,
 
                 # Fallback to round-robin only if no clash-free date exists
                 if not assigned_date:
-                    fallback_d = core_dates[len(subject_date_map) % len(core_dates)]
-                    assigned_date = fallback_d.strftime('%d-%m-%Y')
+                    assigned_date = core_dates[len(subject_date_map) % len(core_dates)]
 
                 subject_date_map[subj] = assigned_date
 
@@ -364,8 +359,7 @@ def schedule_reexams(df: pd.DataFrame, start_date: datetime,
             cohorts_for_subj = oe_subject_cohorts.get(subj, set())
             assigned_date = None
 
-            for d in oe_dates_avail:
-                d_str = d.strftime('%d-%m-%Y')
+            for d_str in oe_dates_avail:
                 is_free = True
                 for cohort in cohorts_for_subj:
                     if d_str in oe_cohort_busy_dates.get(cohort, set()):
@@ -376,8 +370,7 @@ def schedule_reexams(df: pd.DataFrame, start_date: datetime,
                     break
 
             if not assigned_date:
-                fallback_d = oe_dates_avail[len(oe_date_map) % len(oe_dates_avail)]
-                assigned_date = fallback_d.strftime('%d-%m-%Y')
+                assigned_date = oe_dates_avail[len(oe_date_map) % len(oe_dates_avail)]
 
             oe_date_map[subj] = assigned_date
 
@@ -689,59 +682,6 @@ def save_to_excel(semester_wise_timetable):
 # SECTION 5 — FPDF ENGINE  (verbatim copy from re_exam_to_pdf.py — NO changes)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def wrap_text(pdf, text, col_width):
-    cache_key = (text, col_width, pdf.font_style)
-    if cache_key in wrap_text_cache:
-        return wrap_text_cache[cache_key]
-
-    time_pattern = re.compile(
-        r'([\[\(]\s*\d{1,2}:\d{2}\s*[AP]M\s*-\s*\d{1,2}:\d{2}\s*[AP]M\s*[\]\)])',
-        re.IGNORECASE
-    )
-
-    parts = time_pattern.split(str(text))
-    tokens = []
-    for i, p in enumerate(parts):
-        if i % 2 == 1:
-            tokens.append(p)
-        else:
-            p = p.replace("<hr>", " <hr> ")
-            tokens.extend(p.split())
-
-    lines = []
-    current_line = ""
-    old_family = pdf.font_family
-    old_style  = pdf.font_style
-    old_size   = pdf.font_size_pt
-
-    for token in tokens:
-        if token == "<hr>":
-            if current_line: lines.append(current_line); current_line = ""
-            lines.append("<hr>"); continue
-
-        test_line = token if not current_line else current_line + " " + token
-        test_w = 0
-        for pt in time_pattern.split(test_line):
-            if not pt: continue
-            if time_pattern.match(pt):
-                pdf.set_font(old_family, 'B', old_size)
-                test_w += pdf.get_string_width(pt)
-            else:
-                pdf.set_font(old_family, old_style, old_size)
-                test_w += pdf.get_string_width(pt)
-
-        if test_w <= col_width:
-            current_line = test_line
-        else:
-            if current_line: lines.append(current_line)
-            current_line = token
-
-    if current_line: lines.append(current_line)
-    pdf.set_font(old_family, old_style, old_size)
-    wrap_text_cache[cache_key] = lines
-    return lines
-
-
 def print_row_custom(pdf, row_data, col_widths, line_height=5, header=False):
     cell_padding      = 1
     header_bg_color   = (255, 255, 255)
@@ -849,7 +789,16 @@ def print_row_custom(pdf, row_data, col_widths, line_height=5, header=False):
 def print_table_custom(pdf, df, columns, col_widths, line_height=5,
                         header_content=None, Programs=None, time_slot=None,
                         actual_time_slots=None, declaration_date=None):
-    if df.empty: return
+    """
+    Print df as a paginated table, starting on a new page of its own.
+    Pages are only added for rows that land on them; returns True if any
+    row was printed.
+    """
+    rows = []
+    for idx in range(len(df)):
+        row = [str(df.iloc[idx][c]) if pd.notna(df.iloc[idx][c]) else "" for c in columns]
+        if any(cell.strip() for cell in row): rows.append(row)
+    if not rows: return False
     setattr(pdf, '_row_counter', 0)
 
     footer_height = 14
@@ -929,6 +878,7 @@ def print_table_custom(pdf, df, columns, col_widths, line_height=5,
 
         pdf.set_xy(pdf.l_margin, header_end_y)
 
+    pdf.add_page()
     render_footer()
     render_header()
 
@@ -962,10 +912,8 @@ def print_table_custom(pdf, df, columns, col_widths, line_height=5,
 
     pdf.set_font("Times", '', 9.5)
 
-    for idx in range(len(df)):
-        row = [str(df.iloc[idx][c]) if pd.notna(df.iloc[idx][c]) else "" for c in columns]
-        if not any(cell.strip() for cell in row): continue
-
+    rows_on_page = 0
+    for row in rows:
         wrapped_cells = []
         max_lines = 0
         for i, cell_text in enumerate(row):
@@ -975,7 +923,7 @@ def print_table_custom(pdf, df, columns, col_widths, line_height=5,
             max_lines = max(max_lines, len(lines))
         row_h = line_height * max_lines
 
-        if pdf.get_y() + row_h > pdf.h - footer_height - 5:
+        if rows_on_page and pdf.get_y() + row_h > pdf.h - footer_height - 5:
             pdf.add_page()
             render_footer()
             render_header()
@@ -991,8 +939,11 @@ def print_table_custom(pdf, df, columns, col_widths, line_height=5,
                 pdf.set_font("Times", 'B', 9.5)
                 print_row_custom(pdf, upper_columns, col_widths, line_height=line_height, header=True)
             pdf.set_font("Times", '', 9.5)
+            rows_on_page = 0
 
         print_row_custom(pdf, row, col_widths, line_height=line_height, header=False)
+        rows_on_page += 1
+    return True
 
 
 def _ordinal_suffix(day):
@@ -1000,12 +951,21 @@ def _ordinal_suffix(day):
     return {1:'st',2:'nd',3:'rd'}.get(day % 10, 'th')
 
 
-def convert_excel_to_pdf(excel_path, pdf_path, declaration_date=None,
+def pdf_to_bytes(pdf):
+    """The finished FPDF document as bytes (what output(path) would write)."""
+    data = pdf.output(dest='S')
+    return data.encode('latin-1') if isinstance(data, str) else bytes(data)
+
+
+def convert_excel_to_pdf(excel_source, declaration_date=None,
                          portal_dates=None, all_semesters=None):
     """
     Verbatim from re_exam_to_pdf.py — no structural changes.
     cols_per_page=6: up to 6 SubBranch columns fit on one landscape Legal page.
     Each programme's own sheet is rendered onto its own page(s).
+
+    excel_source is anything pd.read_excel accepts (the in-memory workbook
+    from save_to_excel); the PDF is returned as bytes, or None on failure.
     """
     pdf = FPDF(orientation='L', unit='mm', format='Legal')
     pdf.set_auto_page_break(auto=False, margin=15)
@@ -1176,9 +1136,9 @@ def convert_excel_to_pdf(excel_path, pdf_path, declaration_date=None,
 
     # ── Timetable pages ───────────────────────────────────────────────────────
     try:
-        df_dict = pd.read_excel(excel_path, sheet_name=None)
+        df_dict = pd.read_excel(excel_source, sheet_name=None)
     except Exception as e:
-        st.error(f"Error reading Excel file: {e}"); return
+        st.error(f"Error reading Excel file: {e}"); return None
 
     sheets_processed = 0
 
@@ -1277,7 +1237,6 @@ def convert_excel_to_pdf(excel_path, pdf_path, declaration_date=None,
                     sub_width       = remaining_width / max(len(chunk), 1)
                     col_widths      = [date_col_width] + [sub_width] * len(chunk)
 
-                    pdf.add_page()
                     orig = st.session_state.get('selected_college')
                     st.session_state['selected_college'] = sheet_college_name
 
@@ -1296,14 +1255,14 @@ def convert_excel_to_pdf(excel_path, pdf_path, declaration_date=None,
                         if _time_counts:
                             page_time_slot = max(_time_counts, key=_time_counts.get)
 
-                    print_table_custom(
+                    printed = print_table_custom(
                         pdf, chunk_df, cols_to_print, col_widths, line_height=5,
                         header_content=header_content, Programs=chunk,
                         time_slot=page_time_slot, actual_time_slots=None,
                         declaration_date=declaration_date
                     )
                     if orig: st.session_state['selected_college'] = orig
-                    sheets_processed += 1
+                    if printed: sheets_processed += 1
 
             else:
                 target_cols    = ['Exam Date', 'OE Type', 'Open Elective (All Applicable Streams)']
@@ -1319,82 +1278,65 @@ def convert_excel_to_pdf(excel_path, pdf_path, declaration_date=None,
                     ).dt.strftime("%A, %d %B, %Y")
                 except: pass
 
-                pdf.add_page()
                 col_widths      = [30, 25]
                 remaining_width = pdf.w - 2 * pdf.l_margin - sum(col_widths)
                 col_widths.append(remaining_width)
 
                 orig = st.session_state.get('selected_college')
                 st.session_state['selected_college'] = sheet_college_name
-                print_table_custom(
+                printed = print_table_custom(
                     pdf, sheet_df, available_cols, col_widths, line_height=5,
                     header_content=header_content, Programs=["Electives"],
                     time_slot=header_exam_time, actual_time_slots=None,
                     declaration_date=declaration_date
                 )
                 if orig: st.session_state['selected_college'] = orig
-                sheets_processed += 1
+                if printed: sheets_processed += 1
 
         except Exception as e:
             st.warning(f"Error processing PDF sheet {sheet_name}: {e}")
             continue
 
     if sheets_processed == 0:
-        st.error("No valid sheets generated in PDF."); return
+        st.error("No valid sheets generated in PDF."); return None
 
     try:
-        pdf.output(pdf_path)
+        return pdf_to_bytes(pdf)
     except Exception as e:
         st.error(f"Save PDF failed: {e}")
+        return None
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # SECTION 6 — ORCHESTRATOR
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def generate_outputs(semester_wise_timetable, output_pdf,
-                     declaration_date=None, portal_dates=None):
-    temp_excel = "temp_auto_reexam.xlsx"
+def generate_outputs(semester_wise_timetable, declaration_date=None, portal_dates=None):
+    """
+    Build the Excel and PDF timetables entirely in memory.
+
+    Nothing is written to the working directory, so several users generating
+    at once on one server cannot overwrite each other's files.
+
+    Returns:
+        tuple: (Excel BytesIO or None, PDF bytes or None)
+    """
     excel_data = save_to_excel(semester_wise_timetable)
 
     if not excel_data:
-        st.error("❌ No Excel data generated."); return None
-
-    try:
-        with open(temp_excel, "wb") as f:
-            f.write(excel_data.getvalue())
-    except Exception as e:
-        st.error(f"❌ Error saving temp Excel: {e}"); return None
+        st.error("❌ No Excel data generated."); return None, None
 
     try:
         _all_sems = sorted(semester_wise_timetable.keys())
-        convert_excel_to_pdf(temp_excel, output_pdf,
-                             declaration_date=declaration_date,
-                             portal_dates=portal_dates,
-                             all_semesters=_all_sems)
+        pdf_bytes = convert_excel_to_pdf(io.BytesIO(excel_data.getvalue()),
+                                         declaration_date=declaration_date,
+                                         portal_dates=portal_dates,
+                                         all_semesters=_all_sems)
     except Exception as e:
-        st.error(f"❌ PDF error: {e}\n{traceback.format_exc()}"); return excel_data
-    finally:
-        try: os.remove(temp_excel)
-        except: pass
+        st.error(f"❌ PDF error: {e}\n{traceback.format_exc()}"); return excel_data, None
 
-    # Post-process: remove blank pages
-    try:
-        if os.path.exists(output_pdf):
-            reader  = PdfReader(output_pdf)
-            writer  = PdfWriter()
-            pat     = re.compile(r'^[\s\n]*(?:Page\s*)?\d+[\s\n]*$')
-            for page in reader.pages:
-                try:    text = page.extract_text() or ""
-                except: text = ""
-                cleaned = text.strip()
-                if cleaned and not pat.match(cleaned) and len(cleaned) > 10:
-                    writer.add_page(page)
-            if writer.pages:
-                with open(output_pdf, 'wb') as f: writer.write(f)
-    except: pass
-
-    return excel_data
+    # No blank-page pass: print_table_custom only adds pages it puts rows on
+    return excel_data, pdf_bytes
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1583,34 +1525,32 @@ def main():
 
         if st.button("🚀 Generate PDF & Excel Timetable", type="primary", use_container_width=True):
             with st.spinner("Rendering PDF…"):
-                pdf_filename = "AutoScheduled_ReExam_Timetable.pdf"
                 _portal_dates = {
                     'start_date': portal_start_date,
                     'start_time': portal_start_time,
                     'end_date':   portal_end_date,
                     'end_time':   portal_end_time,
                 }
-                excel_data = generate_outputs(
+                excel_data, pdf_data = generate_outputs(
                     st.session_state.timetable,
-                    pdf_filename,
                     declaration_date=decl_date,
                     portal_dates=_portal_dates,
                 )
                 st.session_state.excel_data = excel_data
+                st.session_state.pdf_data = pdf_data
 
-            if os.path.exists(pdf_filename):
+            if st.session_state.pdf_data:
                 st.success("✅ PDF generated successfully!")
                 st.balloons()
                 c1, c2 = st.columns(2)
                 with c1:
-                    with open(pdf_filename, "rb") as f:
-                        st.download_button(
-                            "📥 Download PDF Timetable",
-                            f,
-                            f"ReExam_AutoScheduled_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
-                            "application/pdf",
-                            use_container_width=True
-                        )
+                    st.download_button(
+                        "📥 Download PDF Timetable",
+                        st.session_state.pdf_data,
+                        f"ReExam_AutoScheduled_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
+                        "application/pdf",
+                        use_container_width=True
+                    )
                 with c2:
                     if st.session_state.excel_data:
                         st.download_button(
@@ -1620,8 +1560,6 @@ def main():
                             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                             use_container_width=True
                         )
-                try: os.remove(pdf_filename)
-                except: pass
             else:
                 st.error("❌ PDF file was not created. Check errors above.")
                 if st.session_state.excel_data:
@@ -1,4 +1,5 @@
 import streamlit as st
+import altair as alt
 import pandas as pd
 from datetime import datetime, timedelta, date
 from fpdf import FPDF
@@ -6,8 +7,24 @@ import os
 import re
 import random
 import io
-from PyPDF2 import PdfReader, PdfWriter
+import copy
 from collections import deque, defaultdict
+from timetable_engine import (
+    get_college_profile, get_valid_dates_in_range, get_first_valid_days,
+    get_time_slot_from_number, get_core_exam_dates,
+    has_open_electives, schedule_subjects, schedule_input_key, probe_capacity_schedules,
+    DEFAULT_TIME_SLOTS, CapacityLedger, violations_from_report, extract_numeric_sem
+)
+from timetable_io import PARSE_CACHE, PRIORITY_CM_PREFIX, MissingColumnsError, parse_input
+from timetable_solver import SOLVER_AVAILABLE
+from timetable_pipeline import (
+    OE_SEARCH_BUDGET, PASS_TIME_LIMITS, fill_schedule_gaps, generate_timetable, improve_oe_placement,
+    placement_pass, schedule_oe_groups
+)
+from timetable_batch import prepare_schools, capacity_by_school
+from timetable_sweep import sweep_grid, find_minimal_end_date
+from timetable_pdf import PDF_CONTEXT_KEYS, pdf_workers, render_sheets_parallel
+from timetable_layout import wrap_text
 # ... existing imports ...
 import pandas as pd
 # Add this check to support older and newer Streamlit versions
@@ -72,7 +89,9 @@ def show_semesters_breakdown(df):
     unique_sems = sorted(df['Semester'].unique())
     st.write(f"**Active Semesters:** {', '.join(map(str, unique_sems))}")
     
-    sem_counts = df['Semester'].value_counts().sort_index().reset_index()
+    # Semester is categorical; leave out semesters with no rows in this frame
+    sem_counts = df['Semester'].value_counts()
+    sem_counts = sem_counts[sem_counts > 0].sort_index().reset_index()
     sem_counts.columns = ['Semester', 'Subject Count']
     
     st.dataframe(
@@ -170,6 +189,115 @@ def show_span_breakdown(df, holidays_set):
     
     st.bar_chart(data=daily, x='Date', y='Count')
 
+def show_what_if_sweep(uploaded_file, base_date, end_date, holidays_set):
+    """Grid of end dates x capacities x slot counts, scheduled in parallel and shown as a table and heatmap."""
+    time_slots = st.session_state.get('time_slots') or college_time_slots(st.session_state.get('selected_college', ''))
+    capacity = int(st.session_state.get('capacity_slider', 1250))
+
+    st.markdown("Schedules the core subjects once per combination (greedy, no electives or gap filling) to show "
+                "which windows, capacities and slot counts fit.")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        first_end = st.date_input("📆 Earliest End Date", value=max(base_date, end_date - timedelta(days=5)),
+                                  key="sweep_first_end")
+    with col2:
+        last_end = st.date_input("📆 Latest End Date", value=end_date + timedelta(days=5), key="sweep_last_end")
+    with col3:
+        step = st.number_input("Step (days)", min_value=1, max_value=14, value=1, key="sweep_step")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        capacities_text = st.text_input("🏫 Capacities (comma-separated)",
+                                        value=", ".join(str(c) for c in (max(50, capacity - 250), capacity, capacity + 250)),
+                                        key="sweep_capacities")
+    with col2:
+        slot_counts = st.multiselect("⏰ Number of Slots", options=list(range(1, len(time_slots) + 1)),
+                                     default=list(range(1, len(time_slots) + 1)), key="sweep_slots",
+                                     help="n uses the first n configured time slots")
+
+    try:
+        capacities = [int(c) for c in capacities_text.replace(";", ",").split(",") if c.strip()]
+    except ValueError:
+        st.error("⚠️ Capacities must be whole numbers separated by commas.")
+        return
+    end_dates = []
+    day = datetime.combine(first_end, datetime.min.time())
+    while day.date() <= last_end:
+        if day > base_date:
+            end_dates.append(day)
+        day += timedelta(days=int(step))
+
+    points = len(end_dates) * len(capacities) * len(slot_counts)
+    if st.button(f"🧪 Run Sweep ({points} combinations)", use_container_width=True, disabled=points == 0):
+        df_non_elec, _, _ = read_timetable(uploaded_file)
+        if df_non_elec is None:
+            return
+        profile = get_college_profile(st.session_state.get('selected_college', ''))
+        with st.spinner(f"⏳ Scheduling {points} combinations in parallel..."):
+            st.session_state.sweep_results = (uploaded_file.name, sweep_grid(
+                df_non_elec, profile, holidays_set, base_date, time_slots, end_dates, capacities, slot_counts))
+
+    # Results belong to the file they were computed for
+    file_name, results = st.session_state.get('sweep_results') or (None, None)
+    if file_name != uploaded_file.name or results is None or results.empty:
+        return
+
+    feasible = results[results['Feasible']]
+    if feasible.empty:
+        st.warning("⚠️ No combination fits every subject within capacity.")
+    else:
+        days = pd.to_datetime(feasible['End Date'], format="%d-%m-%Y")
+        best = feasible.loc[days.idxmin()]
+        st.success(f"✅ Earliest feasible end date: {best['End Date']} "
+                   f"(capacity {best['Capacity']}, {best['Slots']} slot(s), span {best['Span (Days)']} days)")
+
+    metric = st.selectbox("Heatmap Metric", ["Unscheduled", "Overloaded Sessions", "Span (Days)", "Max Daily Load"],
+                          key="sweep_metric")
+    date_order = sorted(results['End Date'].unique(), key=lambda d: datetime.strptime(d, "%d-%m-%Y"))
+    heatmap = alt.Chart(results).mark_rect().encode(
+        x=alt.X('End Date:O', sort=date_order),
+        y=alt.Y('Capacity:O', sort='descending'),
+        color=alt.Color(f'{metric}:Q', scale=alt.Scale(scheme='orangered')),
+        tooltip=list(results.columns),
+    ).properties(height=60 + 30 * results['Capacity'].nunique()).facet(row=alt.Row('Slots:O', title='Slots'))
+    st.altair_chart(heatmap, use_container_width=True)
+    st.dataframe(results, use_container_width=True, hide_index=True)
+
+def find_auto_end_date(uploaded_file, holidays_set, base_date, latest_end):
+    """
+    Earliest end date up to latest_end that fits every core subject within capacity.
+
+    Probe results are kept per input (file, holidays, start date, slots,
+    capacity, school), so the reruns after the capacity popup and later
+    searches with a different latest date reuse them.
+
+    Returns:
+        datetime: The end date to schedule with (latest_end when nothing earlier fits)
+    """
+    df_non_elec, _, _ = read_timetable(uploaded_file)
+    if df_non_elec is None:
+        return latest_end
+
+    profile = get_college_profile(st.session_state.get('selected_college', ''))
+    time_slots_dict = st.session_state.get('time_slots', profile['default_time_slots'])
+    capacity = st.session_state.capacity_slider
+    key = schedule_input_key(df_non_elec, holidays_set, base_date, None, time_slots_dict, capacity, profile,
+                             "auto-end")
+    search = st.session_state.get('auto_end_probes')
+    if not search or search['key'] != key:
+        search = {'key': key, 'memo': {}}
+        st.session_state['auto_end_probes'] = search
+
+    end_date, probes = find_minimal_end_date(df_non_elec, profile, holidays_set, base_date, latest_end,
+                                             time_slots_dict, capacity, memo=search['memo'])
+    if end_date is None:
+        st.warning(f"🔎 Auto End Date: even {latest_end.strftime('%d-%m-%Y')} leaves subjects unscheduled at "
+                   f"{capacity} students per session; using it as the end date.")
+        return latest_end
+    st.success(f"🔎 Auto End Date: {end_date.strftime('%d-%m-%Y')} is the earliest end date that fits every "
+               f"subject ({len(probes)} probes, {len(search['memo'])} schedules run for this input).")
+    return end_date
+
 # Set page configuration
 st.set_page_config(
     page_title="Exam Timetable Generator - College Selector",
@@ -686,6 +814,13 @@ def show_college_selector():
                         st.session_state.selected_college = college['name']
                         st.rerun()
 
+    st.markdown("---")
+    st.markdown("### 📚 Several Schools at Once")
+    st.markdown("Schedule multiple schools' input files together against one shared Mumbai campus capacity:")
+    if st.button("📚\n\nMulti-School Batch", key="college_batch", use_container_width=True):
+        st.session_state.selected_college = BATCH_MODE
+        st.rerun()
+
     # Footer
     st.markdown("---")
     st.markdown("""
@@ -962,8 +1097,72 @@ BRANCH_FULL_FORM = {
 # Define logo path (adjust as needed for your environment)
 LOGO_PATH = "logo.png"  # Ensure this path is valid in your environment
 
-# Cache for text wrapping results
-wrap_text_cache = {}
+GREEDY_MODE = "Greedy (fast)"
+SEARCH_MODE = "Greedy + local search"
+SOLVER_MODE = "Exact solver (OR-Tools CP-SAT)"
+PLACEMENT_MODE_NAMES = {GREEDY_MODE: "greedy", SEARCH_MODE: "search", SOLVER_MODE: "solver"}
+
+
+def selected_placement_mode():
+    """
+    Scheduling Engine chosen in the sidebar.
+
+    Returns:
+        tuple: (mode name for timetable_pipeline, seconds per pass or None)
+    """
+    mode = PLACEMENT_MODE_NAMES.get(st.session_state.get('scheduling_mode'), "greedy")
+    if mode == "search":
+        return mode, st.session_state.get('search_time_budget', PASS_TIME_LIMITS['search'])
+    if mode == "solver":
+        return mode, st.session_state.get('solver_time_limit', PASS_TIME_LIMITS['solver'])
+    return mode, None
+
+
+def selected_placement_pass():
+    """
+    Placement routine for the Scheduling Engine chosen in the sidebar.
+
+    Returns:
+        tuple: (run_pass for schedule_subjects / schedule_core, None for the
+               greedy passes; mode string for schedule_input_key; message
+               describing the mode, None for greedy)
+    """
+    run_pass, mode = placement_pass(*selected_placement_mode())
+    method, _, time_limit = mode.partition(":")
+    if method == "solver":
+        return run_pass, mode, f"🧮 Exact solver mode: searching up to {time_limit}s per pass for a tighter schedule"
+    if method == "search":
+        return run_pass, mode, f"🔀 Local search mode: improving the greedy schedule for {time_limit}s per pass"
+    return run_pass, mode, None
+
+
+def show_scheduling_engine_controls():
+    """Sidebar controls for the placement method and its time budget."""
+    st.markdown("#### 🧮 Scheduling Engine")
+    st.radio(
+        "Placement Method",
+        [GREEDY_MODE, SEARCH_MODE] + ([SOLVER_MODE] if SOLVER_AVAILABLE else []),
+        key="scheduling_mode",
+        help="Local search keeps moving and swapping exams (CM and OE groups as blocks) after the greedy pass "
+             "to shorten the span and relieve capacity. The exact solver searches for a placement with fewer "
+             "exam days and no overloads, starting from the greedy result"
+    )
+    if not SOLVER_AVAILABLE:
+        st.caption("Install `ortools` to enable the exact solver.")
+    if st.session_state.scheduling_mode == SEARCH_MODE:
+        st.number_input(
+            "Search Time Budget (seconds)",
+            min_value=1, max_value=300, value=PASS_TIME_LIMITS['search'], step=1,
+            key="search_time_budget"
+        )
+    elif st.session_state.scheduling_mode == SOLVER_MODE:
+        st.number_input(
+            "Solver Time Limit per Pass (seconds)",
+            min_value=5, max_value=600, value=PASS_TIME_LIMITS['solver'], step=5,
+            key="solver_time_limit",
+            help="The solver runs once within the capacity limit and, if that leaves subjects unscheduled, "
+                 "once more allowing overload, so a generation can take up to twice this long"
+        )
 
 def get_friendly_error_message(e):
     """Translates technical Python errors into user-friendly advice."""
@@ -1011,584 +1210,61 @@ def get_friendly_error_message(e):
     # Default fallback for unknown errors
     return f"⚠️ **Unexpected Error:** Something went wrong. \n\n**Technical hint:** {str(e)}"
 
-def get_valid_dates_in_range(start_date, end_date, holidays_set):
-    """
-    Get all valid examination dates within the specified range.
-    Excludes weekends (Sundays) and holidays.
-    
-    Args:
-        start_date (datetime): Start date for examinations
-        end_date (datetime): End date for examinations
-        holidays_set (set): Set of holiday dates
-    
-    Returns:
-        list: List of valid date strings in DD-MM-YYYY format
-    """
-    valid_dates = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        # Skip Sundays (weekday 6) and holidays
-        if current_date.weekday() != 6 and current_date.date() not in holidays_set:
-            valid_dates.append(current_date.strftime("%d-%m-%Y"))
-        current_date += timedelta(days=1)
-    
-    return valid_dates
-
-def find_next_valid_day_in_range(start_date, end_date, holidays_set):
-    """
-    Find the next valid examination day within the specified range.
-    
-    Args:
-        start_date (datetime): Start date to search from
-        end_date (datetime): End date limit
-        holidays_set (set): Set of holiday dates
-    
-    Returns:
-        datetime or None: Next valid date or None if no valid date found in range
-    """
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date.weekday() != 6 and current_date.date() not in holidays_set:
-            return current_date
-        current_date += timedelta(days=1)
-    return None
-
-def get_time_slot_from_number(slot_number, time_slots_dict):
-    """
-    Get time slot string based on slot number from configuration
-    
-    Args:
-        slot_number: The exam slot number (1, 2, 3, etc.)
-        time_slots_dict: Dictionary of configured time slots
-    
-    Returns:
-        str: Time slot string in format "HH:MM AM - HH:MM PM"
-    """
-    # Default to slot 1 if invalid or missing
-    if pd.isna(slot_number) or slot_number == 0 or slot_number not in time_slots_dict:
-        slot_number = 1
-    
-    slot_config = time_slots_dict.get(int(slot_number), time_slots_dict[1])
-    return f"{slot_config['start']} - {slot_config['end']}"
-
-def get_time_slot_with_capacity(slot_number, date_str, session_capacity, student_count, 
-                                 time_slots_dict, max_capacity=2000):
-    """
-    Get time slot considering capacity constraints and slot number
-    
-    Args:
-        slot_number: Exam slot number from Excel
-        date_str: Date string in DD-MM-YYYY format
-        session_capacity: Dictionary tracking capacity per date/slot
-        student_count: Number of students for this exam
-        time_slots_dict: Dictionary of configured time slots
-        max_capacity: Maximum students per session
-    
-    Returns:
-        str: Time slot string or None if no capacity available
-    """
-    # Get preferred time slot based on slot number
-    preferred_slot = get_time_slot_from_number(slot_number, time_slots_dict)
-    
-    if date_str not in session_capacity:
-        return preferred_slot
-    
-    # Get slot key for capacity tracking
-    slot_key = f"slot_{int(slot_number) if not pd.isna(slot_number) else 1}"
-    current_capacity = session_capacity[date_str].get(slot_key, 0)
-    
-    if current_capacity + student_count <= max_capacity:
-        return preferred_slot
-    
-    # Try other available slots
-    for alt_slot_num in sorted(time_slots_dict.keys()):
-        if alt_slot_num == slot_number:
-            continue
-        
-        alt_slot = get_time_slot_from_number(alt_slot_num, time_slots_dict)
-        alt_slot_key = f"slot_{alt_slot_num}"
-        alt_capacity = session_capacity[date_str].get(alt_slot_key, 0)
-        
-        if alt_capacity + student_count <= max_capacity:
-            return alt_slot
-    
-    # If no slot fits, return None
-    return None
-                                     
 def schedule_all_subjects_comprehensively(df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION=1250):
-    from collections import defaultdict
-    import random
-    current_college = st.session_state.get('selected_college', '')
-    IS_LAW_SCHOOL = "Law" in current_college
-    IS_MPSTME = "Mukesh Patel" in current_college or "Technology Management" in current_college
-    is_business_school = (
-        "School of Business Management" in current_college
-        or "Pravin Dalal" in current_college
-        or "School of Economics" in current_college
-        or "Sarla Anil Modi" in current_college
-        or "School of Liberal Arts" in current_college
-        or "Jyoti Dalal" in current_college
-        or "School of Branding and Advertising" in current_college
-        or "School of Science" in current_college
-        or "Sunandan Divatia" in current_college
-        or "School of Commerce" in current_college
-        or "Anil Surendra Modi" in current_college
-        or "Diploma in Textile Technology" in current_college
-    )
-    
+    profile = get_college_profile(st.session_state.get('selected_college', ''))
+    time_slots_dict = st.session_state.get('time_slots', profile['default_time_slots'])
+
     st.info(f"🚀 SCHEDULING STRATEGY: Stream-by-Stream -> Common (Alternate Day) -> Individual (Gap Fill)")
-    if IS_LAW_SCHOOL:
+    if profile['is_law_school']:
         st.warning("⚖️ LAW SCHOOL MODE ACTIVE: Alternate Days & Specific Elective Logic Applied")
-    if is_business_school:
+    if profile['is_business_school']:
         st.info("💼 BUSINESS SCHOOL MODE ACTIVE: Strict Multi-Pass Slot Isolation & Even Spreading Enforced")
-        time_slots_dict = st.session_state.get('time_slots', {
-            1: {"start": "11:30 AM", "end": "01:30 PM"},
-            2: {"start": "03:00 PM", "end": "05:00 PM"},
-            3: {"start": "08:30 AM", "end": "10:30 AM"}
-        })
-    else:
-        time_slots_dict = st.session_state.get('time_slots', {
-            1: {"start": "10:00 AM", "end": "1:00 PM"},
-            2: {"start": "2:00 PM", "end": "5:00 PM"}
-        })
-    
-    # 1. Define Valid Dates
-    all_valid_strings = get_valid_dates_in_range(base_date, end_date, holidays)
-    all_valid_dates = []
-    for d_str in all_valid_strings:
-        try:
-            d_obj = datetime.strptime(d_str, "%d-%m-%Y")
-            if d_obj.weekday() != 6 and d_obj.date() not in holidays:
-                all_valid_dates.append(d_obj)
-        except ValueError:
-            continue
 
-    # 2. Check for Open Electives to determine if last 2 days actually need reserving
-    has_oe = False
-    if 'OE' in df.columns:
-        has_oe = (df['OE'].notna() & (df['OE'].str.strip() != "")).any()
-        
-    if len(all_valid_dates) < 3 or not has_oe:
-        core_valid_dates = all_valid_dates
-        if not has_oe:
-            st.info("📅 Full date range unlocked & utilized (No Open Electives detected).")
-    else:
-        core_valid_dates = all_valid_dates[:-2]
+    core_valid_dates, all_valid_dates = get_core_exam_dates(df, base_date, end_date, holidays)
+    if not has_open_electives(df):
+        st.info("📅 Full date range unlocked & utilized (No Open Electives detected).")
+    elif len(core_valid_dates) < len(all_valid_dates):
         st.info("📅 Last 2 days reserved specifically for Open Electives.")
-        
-    def extract_numeric_sem(sem_val):
-        s = str(sem_val).strip().upper()
-        romans = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8, 'IX': 9, 'X': 10}
-        for r_key, r_val in romans.items():
-            if s == r_key or s.endswith(f" {r_key}"): return r_val
-        import re
-        digits = re.findall(r'\d+', s)
-        return int(digits[0]) if digits else 1
-
-    eligible_subjects = df[(~(df['OE'].notna() & (df['OE'].str.strip() != "")))].copy()
-    if eligible_subjects.empty: return df
-
-    if IS_LAW_SCHOOL:
-        sem_upper = eligible_subjects['Semester'].astype(str).str.strip().str.upper()
-        is_elec = eligible_subjects['Category'] == 'ELEC'
-        sem8_elec_mask = is_elec & (sem_upper.str.endswith('VIII') | sem_upper.str.endswith(' 8') | (sem_upper == '8'))
-        if sem8_elec_mask.any():
-            eligible_subjects.loc[sem8_elec_mask, 'CMGroup'] = "LAW_SEM8_ELEC_GROUP"
-            eligible_subjects.loc[sem8_elec_mask, 'CMGroup_Clean'] = "LAW_SEM8_ELEC_GROUP"
-
-        sem6_elec_mask = is_elec & (sem_upper.str.endswith('VI') | sem_upper.str.endswith(' 6') | (sem_upper == '6'))
-        if sem6_elec_mask.any():
-            eligible_subjects.loc[sem6_elec_mask, 'CMGroup'] = ""
-            eligible_subjects.loc[sem6_elec_mask, 'CMGroup_Clean'] = ""
-
-    if 'CMGroup' in eligible_subjects.columns:
-        eligible_subjects['CMGroup_Clean'] = eligible_subjects['CMGroup'].fillna("").astype(str).str.strip().replace(["0", "0.0", "nan"], "")
-    else:
-        eligible_subjects['CMGroup_Clean'] = ""
-
-    import re as _re
-    _sol_ba_bba_re  = _re.compile(r'^(B\.A\.|B\.B\.A\.)[,\s].*LL\.B', _re.IGNORECASE)
-    _sol_llm_re     = _re.compile(r'(LL\.M|master\s+of\s+law|llm)',    _re.IGNORECASE)
-
-    def _is_ba_bba_llb(val):
-        s = str(val).strip()
-        return (not _sol_llm_re.search(s)) and bool(_sol_ba_bba_re.match(s))
 
-    if IS_LAW_SCHOOL:
-        no_cm_mask = eligible_subjects['CMGroup_Clean'] == ""
-        sol_mask   = eligible_subjects['Program'].apply(_is_ba_bba_llb)
-        pairing_pool = eligible_subjects[no_cm_mask & sol_mask].copy()
-
-        if not pairing_pool.empty:
-            _ba_re  = _re.compile(r'^B\.A\.',   _re.IGNORECASE)
-            _bba_re = _re.compile(r'^B\.B\.A\.', _re.IGNORECASE)
-
-            ba_rows  = pairing_pool[pairing_pool['Program'].str.match(r'^B\.A\.',   case=False, na=False)]
-            bba_rows = pairing_pool[pairing_pool['Program'].str.match(r'^B\.B\.A\.', case=False, na=False)]
-
-            for sem_val, ba_sem_group in ba_rows.groupby('Semester'):
-                bba_sem_group = bba_rows[bba_rows['Semester'] == sem_val]
-                if bba_sem_group.empty:
-                    continue
-
-                ba_sorted  = ba_sem_group.sort_values('ModuleCode').reset_index()   
-                bba_sorted = bba_sem_group.sort_values('ModuleCode').reset_index()
-
-                pair_count = min(len(ba_sorted), len(bba_sorted))
-                for pair_idx in range(pair_count):
-                    ba_orig_idx  = ba_sorted.iloc[pair_idx]['index']
-                    bba_orig_idx = bba_sorted.iloc[pair_idx]['index']
-                    synthetic_cm = f"SOL_BABBBA_SEM{str(sem_val).strip().replace(' ','_')}_PAIR{pair_idx}"
-                    eligible_subjects.loc[ba_orig_idx,  'CMGroup_Clean'] = synthetic_cm
-                    eligible_subjects.loc[bba_orig_idx, 'CMGroup_Clean'] = synthetic_cm
-
-    mba_tech_common_within_ids = set()
-    if IS_MPSTME and 'IsCommon' in eligible_subjects.columns:
-        mba_mask = eligible_subjects['Program'].astype(str).str.upper().str.contains("MBA TECH", na=False)
-        sem_u = eligible_subjects['Semester'].astype(str).str.strip().str.upper()
-        target_sem = (
-            sem_u.str.endswith("VIII") | sem_u.str.endswith(" 8") | (sem_u == "8") |
-            sem_u.str.endswith("X")    | sem_u.str.endswith(" 10") | (sem_u == "10")
-        )
-        is_within = eligible_subjects['IsCommon'].astype(str).str.strip().str.upper() == "WITHIN"
-        mba_within_rows = eligible_subjects[mba_mask & target_sem & is_within]
-        mba_tech_common_within_ids = set(mba_within_rows['CMGroup_Clean'].unique()) - {""}
-
-    df_common    = eligible_subjects[eligible_subjects['CMGroup_Clean'] != ""]
-    df_individual = eligible_subjects[eligible_subjects['CMGroup_Clean'] == ""]
-    
-    def _all_two_credit(group_df):
-        if 'Difficulty' not in group_df.columns:
-            return False
-        return bool((group_df['Difficulty'].fillna(-1) == 0).all())
-
-    common_units_priority, common_units_normal = [], []
-    if not df_common.empty:
-        for cm_id, group in df_common.groupby('CMGroup_Clean'):
-            unit = {
-                'type': 'COMMON', 'id': f"CM_{cm_id}", 'indices': group.index.tolist(),
-                'branch_sems': list(set([f"{r['Branch']}_{r['Semester']}" for _, r in group.iterrows()])), 
-                'fixed_slot': group['ExamSlotNumber'].iloc[0],
-                'sem_raw': group['Semester'].iloc[0],
-                'student_count': group['StudentCount'].sum(),
-                'is_two_credit': _all_two_credit(group),   
-            }
-            if cm_id in mba_tech_common_within_ids or "PRIORITY" in cm_id: 
-                common_units_priority.append(unit)
-            else: 
-                common_units_normal.append(unit)
-
-    individual_units = []
-    if not df_individual.empty:
-        for mod_code, group in df_individual.groupby('ModuleCode'):
-            unit = {
-                'type': 'INDIVIDUAL', 'id': f"MOD_{mod_code}", 'indices': group.index.tolist(),
-                'branch_sems': list(set([f"{r['Branch']}_{r['Semester']}" for _, r in group.iterrows()])), 
-                'fixed_slot': group['ExamSlotNumber'].iloc[0],
-                'sem_raw': group['Semester'].iloc[0],
-                'student_count': group['StudentCount'].sum(),
-                'is_two_credit': _all_two_credit(group),   
-            }
-            individual_units.append(unit)
-
-    df['Capacity_Exceeded_Flag'] = "No"
+    # Strict and relaxed results are produced together and kept for this input,
+    # so answering the capacity popup does not schedule everything again.
+    run_pass, mode, mode_note = selected_placement_pass()
+    if mode_note:
+        st.info(mode_note)
+
+    probe_key = schedule_input_key(df, holidays, base_date, end_date, time_slots_dict,
+                                   MAX_STUDENTS_PER_SESSION, profile, mode)
+    probe = st.session_state.get('capacity_probe')
+    if not probe or probe['key'] != probe_key:
+        probe = {'key': probe_key,
+                 'result': probe_capacity_schedules(df, holidays, base_date, end_date, time_slots_dict,
+                                                    MAX_STUDENTS_PER_SESSION, profile, run_pass=run_pass)}
+        st.session_state['capacity_probe'] = probe
 
     def execute_pass(enforce_cap):
-        work_df = df.copy()
-        daily_schedule_map = {d.strftime("%d-%m-%Y"): set() for d in all_valid_dates}
-        slot_schedule_map = {d.strftime("%d-%m-%Y"): {s: set() for s in time_slots_dict.keys()} for d in all_valid_dates}
-        date_load_tracker = {d.strftime("%d-%m-%Y"): 0 for d in all_valid_dates}
-        daily_branch_count = {d.strftime("%d-%m-%Y"): defaultdict(int) for d in all_valid_dates}
-        session_capacity = {} 
-        
-        def check_campus_capacity(date_str, time_slot, unit_row_indices):
-            unit_impact = {}
-            for idx in unit_row_indices:
-                campus = str(work_df.loc[idx, 'Campus']).strip().upper() if pd.notna(work_df.loc[idx, 'Campus']) else "UNKNOWN"
-                unit_impact[campus] = unit_impact.get(campus, 0) + work_df.loc[idx, 'StudentCount']
-                
-            current_slot_usage = session_capacity.get(date_str, {}).get(time_slot, {})
-            is_overloaded = False
-
-            for campus, required_count in unit_impact.items():
-                if "MUMBAI" in campus:
-                    current_load = current_slot_usage.get(campus, 0)
-                    if (current_load + required_count) > MAX_STUDENTS_PER_SESSION:
-                        is_overloaded = True 
-                        
-            if enforce_cap and is_overloaded:
-                return False, False
-            return True, is_overloaded
-
-        def add_to_campus_capacity(date_str, time_slot, unit_row_indices):
-            if date_str not in session_capacity: session_capacity[date_str] = {}
-            if time_slot not in session_capacity[date_str]: session_capacity[date_str][time_slot] = {}
-            for idx in unit_row_indices:
-                campus = str(work_df.loc[idx, 'Campus']).strip().upper() if pd.notna(work_df.loc[idx, 'Campus']) else "UNKNOWN"
-                session_capacity[date_str][time_slot][campus] = session_capacity[date_str][time_slot].get(campus, 0) + work_df.loc[idx, 'StudentCount']
-
-        # ══════════════════════════════════════════════════════════════════
-        # CRITICAL REFACTOR: GLOBAL ARRAYS FOR BUSINESS SCHOOL PHASES
-        # ══════════════════════════════════════════════════════════════════
-        if is_business_school:
-            branch_sem_map = {}
-            all_units = common_units_priority + common_units_normal + individual_units
-            
-            for unit in all_units:
-                for bs in unit['branch_sems']:
-                    if bs not in branch_sem_map:
-                        branch_sem_map[bs] = {'score': 0, 'common': [], 'individual': []}
-                    if unit['type'] == 'COMMON':
-                        if unit not in branch_sem_map[bs]['common']: branch_sem_map[bs]['common'].append(unit)
-                    else:
-                        if unit not in branch_sem_map[bs]['individual']: branch_sem_map[bs]['individual'].append(unit)
-                    branch_sem_map[bs]['score'] += unit['student_count']
-            
-            sorted_bsems = sorted(branch_sem_map.keys(), key=lambda x: branch_sem_map[x]['score'], reverse=True)
-            priority_ids = set(u['id'] for u in common_units_priority)
-            
-            bs_units = []
-            registered_ids = set()
-            for bs in sorted_bsems:
-                branch_sem_map[bs]['common'].sort(key=lambda x: (1 if x['id'] in priority_ids else 0, x['student_count']), reverse=True)
-                for unit in branch_sem_map[bs]['common']:
-                    if unit['id'] not in registered_ids:
-                        bs_units.append(unit)
-                        registered_ids.add(unit['id'])
-            for bs in sorted_bsems:
-                branch_sem_map[bs]['individual'].sort(key=lambda x: x['student_count'], reverse=True)
-                for unit in branch_sem_map[bs]['individual']:
-                    if unit['id'] not in registered_ids:
-                        bs_units.append(unit)
-                        registered_ids.add(unit['id'])
-
-            cohort_exam_count = defaultdict(int)
-            num_days = len(core_valid_dates)
-
-            # ──── Pass 1: Slot 1 Consecutive Packing ────
-            for unit in bs_units:
-                current_exam_idx = max(cohort_exam_count[bs] for bs in unit['branch_sems']) if unit['branch_sems'] else 0
-                if current_exam_idx < num_days:
-                    date_obj = core_valid_dates[current_exam_idx]
-                    date_str = date_obj.strftime("%d-%m-%Y")
-                    slot_num = 1
-                    time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
-                    
-                    if set(unit['branch_sems']).isdisjoint(slot_schedule_map[date_str][slot_num]):
-                        allowed, overloaded = check_campus_capacity(date_str, time_slot_str, unit['indices'])
-                        if allowed:
-                            for row_idx in unit['indices']:
-                                work_df.loc[row_idx, 'Exam Date'] = date_str
-                                work_df.loc[row_idx, 'Time Slot'] = time_slot_str
-                                work_df.loc[row_idx, 'ExamSlotNumber'] = slot_num
-                                if overloaded: work_df.loc[row_idx, 'Capacity_Exceeded_Flag'] = "Yes"
-                            
-                            slot_schedule_map[date_str][slot_num].update(unit['branch_sems'])
-                            daily_schedule_map[date_str].update(unit['branch_sems'])
-                            date_load_tracker[date_str] += 1
-                            for bs in unit['branch_sems']:
-                                daily_branch_count[date_str][bs] += 1
-                                cohort_exam_count[bs] += 1
-                            add_to_campus_capacity(date_str, time_slot_str, unit['indices'])
-                            unit['scheduled'] = True
-
-            # ──── Pass 2: Slot 2 Isolated Spreading ────
-            for unit in bs_units:
-                if unit.get('scheduled'): continue
-                current_exam_idx = max(cohort_exam_count[bs] for bs in unit['branch_sems']) if unit['branch_sems'] else 0
-                
-                max_total_subjects = 1
-                for bs in unit['branch_sems']:
-                    cohort_total = sum(1 for u in bs_units if bs in u['branch_sems'])
-                    if cohort_total > max_total_subjects: max_total_subjects = cohort_total
-                
-                remainder_count = max_total_subjects - num_days
-                r_idx = current_exam_idx - num_days
-                target_day_idx = int(r_idx * num_days / remainder_count) if remainder_count > 0 else 0
-                if target_day_idx >= num_days: target_day_idx = num_days - 1
-
-                valid_dates = [d for d in core_valid_dates if max(daily_branch_count[d.strftime("%d-%m-%Y")][bs] for bs in unit['branch_sems']) < 2]
-                sorted_dates = sorted(valid_dates, key=lambda d: (
-                    max(daily_branch_count[d.strftime("%d-%m-%Y")][bs] for bs in unit['branch_sems']),
-                    abs(core_valid_dates.index(d) - target_day_idx),
-                    date_load_tracker[d.strftime("%d-%m-%Y")]
-                ))
-
-                slot_num = 2
-                time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
-                for date_obj in sorted_dates:
-                    date_str = date_obj.strftime("%d-%m-%Y")
-                    if set(unit['branch_sems']).isdisjoint(slot_schedule_map[date_str][slot_num]):
-                        allowed, overloaded = check_campus_capacity(date_str, time_slot_str, unit['indices'])
-                        if allowed:
-                            for row_idx in unit['indices']:
-                                work_df.loc[row_idx, 'Exam Date'] = date_str
-                                work_df.loc[row_idx, 'Time Slot'] = time_slot_str
-                                work_df.loc[row_idx, 'ExamSlotNumber'] = slot_num
-                                if overloaded: work_df.loc[row_idx, 'Capacity_Exceeded_Flag'] = "Yes"
-                            
-                            slot_schedule_map[date_str][slot_num].update(unit['branch_sems'])
-                            daily_schedule_map[date_str].update(unit['branch_sems'])
-                            date_load_tracker[date_str] += 1
-                            for bs in unit['branch_sems']:
-                                daily_branch_count[date_str][bs] += 1
-                                cohort_exam_count[bs] += 1
-                            add_to_campus_capacity(date_str, time_slot_str, unit['indices'])
-                            unit['scheduled'] = True
-                            break
-
-            # ──── Pass 3: Slot 3 Isolated Exception Spreading ────
-            for unit in bs_units:
-                if unit.get('scheduled'): continue
-                current_exam_idx = max(cohort_exam_count[bs] for bs in unit['branch_sems']) if unit['branch_sems'] else 0
-                
-                max_total_subjects = 1
-                for bs in unit['branch_sems']:
-                    cohort_total = sum(1 for u in bs_units if bs in u['branch_sems'])
-                    if cohort_total > max_total_subjects: max_total_subjects = cohort_total
-                
-                remainder_count = max_total_subjects - 2 * num_days
-                r_idx = current_exam_idx - 2 * num_days
-                target_day_idx = int(r_idx * num_days / remainder_count) if remainder_count > 0 else 0
-                if target_day_idx >= num_days: target_day_idx = num_days - 1
-
-                valid_dates = [d for d in core_valid_dates if max(daily_branch_count[d.strftime("%d-%m-%Y")][bs] for bs in unit['branch_sems']) < 3]
-                sorted_dates = sorted(valid_dates, key=lambda d: (
-                    max(daily_branch_count[d.strftime("%d-%m-%Y")][bs] for bs in unit['branch_sems']),
-                    abs(core_valid_dates.index(d) - target_day_idx),
-                    date_load_tracker[d.strftime("%d-%m-%Y")]
-                ))
-
-                slot_num = 3
-                time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
-                for date_obj in sorted_dates:
-                    date_str = date_obj.strftime("%d-%m-%Y")
-                    if set(unit['branch_sems']).isdisjoint(slot_schedule_map[date_str][slot_num]):
-                        allowed, overloaded = check_campus_capacity(date_str, time_slot_str, unit['indices'])
-                        if allowed:
-                            for row_idx in unit['indices']:
-                                work_df.loc[row_idx, 'Exam Date'] = date_str
-                                work_df.loc[row_idx, 'Time Slot'] = time_slot_str
-                                work_df.loc[row_idx, 'ExamSlotNumber'] = slot_num
-                                if overloaded: work_df.loc[row_idx, 'Capacity_Exceeded_Flag'] = "Yes"
-                            
-                            slot_schedule_map[date_str][slot_num].update(unit['branch_sems'])
-                            daily_schedule_map[date_str].update(unit['branch_sems'])
-                            date_load_tracker[date_str] += 1
-                            for bs in unit['branch_sems']:
-                                daily_branch_count[date_str][bs] += 1
-                                cohort_exam_count[bs] += 1
-                            add_to_campus_capacity(date_str, time_slot_str, unit['indices'])
-                            unit['scheduled'] = True
-                            break
-
-            # ──── Pass 4 & 5: Emergency Fallback Triggers ────
-            def get_cohort_daily_max(date_str):
-                """Returns the highest exam count already scheduled on date_str
-                across any single branch-sem cohort (0 if none scheduled yet)."""
-                counts = daily_branch_count.get(date_str)
-                if not counts:
-                    return 0
-                return max(counts.values())
-
-            for unit in bs_units:
-                if unit.get('scheduled'): continue
-                for pass_max in [3, 99]:
-                    for slot_num in [1, 2, 3]:
-                        time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
-                        for date_obj in core_valid_dates:
-                            date_str = date_obj.strftime("%d-%m-%Y")
-                            if get_cohort_daily_max(date_str) < pass_max:
-                                if set(unit['branch_sems']).isdisjoint(slot_schedule_map[date_str][slot_num]):
-                                    allowed, overloaded = check_campus_capacity(date_str, time_slot_str, unit['indices'])
-                                    if allowed:
-                                        for row_idx in unit['indices']:
-                                            work_df.loc[row_idx, 'Exam Date'] = date_str
-                                            work_df.loc[row_idx, 'Time Slot'] = time_slot_str
-                                            work_df.loc[row_idx, 'ExamSlotNumber'] = slot_num
-                                        slot_schedule_map[date_str][slot_num].update(unit['branch_sems'])
-                                        daily_schedule_map[date_str].update(unit['branch_sems'])
-                                        unit['scheduled'] = True
-                                        break
-                        if unit.get('scheduled'): break
-                    if unit.get('scheduled'): break
-
-            unscheduled_groups = [u for u in bs_units if not u.get('scheduled')]
-            return work_df, unscheduled_groups
-
-        # ══════════════════════════════════════════════════════════════════
-        # STANDARD COLLEGE GENERATION PARADIGM (UNCHANGED)
-        # ══════════════════════════════════════════════════════════════════
-        def attempt_schedule(unit, allowed_dates, require_1_day_gap=False):
-            preferred_slot_num = int(unit['fixed_slot']) if unit['fixed_slot'] > 0 else (1 if ((extract_numeric_sem(unit['sem_raw']) + 1) // 2) % 2 == 1 else 2)
-            is_two_credit = unit.get('is_two_credit', False)
-            slots_to_try = [preferred_slot_num] + [s for s in sorted(time_slots_dict.keys()) if s != preferred_slot_num]
-            
-            for date_obj in allowed_dates:
-                date_str = date_obj.strftime("%d-%m-%Y")
-                if not set(unit['branch_sems']).isdisjoint(daily_schedule_map.get(date_str, set())): continue
-                
-                apply_gap = (IS_LAW_SCHOOL or require_1_day_gap) and not is_two_credit
-                if apply_gap:
-                    prev_date_str = (date_obj - timedelta(days=1)).strftime("%d-%m-%Y")
-                    next_date_str = (date_obj + timedelta(days=1)).strftime("%d-%m-%Y")
-                    if prev_date_str in daily_schedule_map and not set(unit['branch_sems']).isdisjoint(daily_schedule_map[prev_date_str]): continue 
-                    if next_date_str in daily_schedule_map and not set(unit['branch_sems']).isdisjoint(daily_schedule_map[next_date_str]): continue
-                
-                for slot_num in slots_to_try:
-                    time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
-                    allowed, overloaded = check_campus_capacity(date_str, time_slot_str, unit['indices'])
-                    if allowed:
-                        for row_idx in unit['indices']:
-                            work_df.loc[row_idx, 'Exam Date'] = date_str
-                            work_df.loc[row_idx, 'Time Slot'] = time_slot_str
-                            work_df.loc[row_idx, 'ExamSlotNumber'] = slot_num
-                            if overloaded: work_df.loc[row_idx, 'Capacity_Exceeded_Flag'] = "Yes"
-                        daily_schedule_map[date_str].update(unit['branch_sems'])
-                        if date_str in slot_schedule_map and slot_num in slot_schedule_map[date_str]:
-                            slot_schedule_map[date_str][slot_num].update(unit['branch_sems'])
-                        date_load_tracker[date_str] += 1
-                        for bs in unit['branch_sems']: daily_branch_count[date_str][bs] += 1
-                        add_to_campus_capacity(date_str, time_slot_str, unit['indices'])
-                        return True
-            return False
-
-        unscheduled_groups = []
-        scheduled_ids = set()
-        branch_sem_map = {}
-        all_units = common_units_priority + common_units_normal + individual_units
-        
-        for unit in all_units:
-            for bs in unit['branch_sems']:
-                if bs not in branch_sem_map:
-                    score = 0
-                    if "MBA TECH" in bs.upper() and ("VIII" in bs.upper() or " 8" in bs or "X" in bs.upper() or " 10" in bs): score = 1000000
-                    branch_sem_map[bs] = {'score': score, 'common': [], 'individual': []}
-                if unit['type'] == 'COMMON':
-                    if unit not in branch_sem_map[bs]['common']: branch_sem_map[bs]['common'].append(unit)
-                else:
-                    if unit not in branch_sem_map[bs]['individual']: branch_sem_map[bs]['individual'].append(unit)
-                branch_sem_map[bs]['score'] += unit['student_count']
-                
-        sorted_bsems = sorted(branch_sem_map.keys(), key=lambda x: branch_sem_map[x]['score'], reverse=True)
-        priority_ids = set(u['id'] for u in common_units_priority)
-        
-        for bs in sorted_bsems:
-            branch_sem_map[bs]['common'].sort(key=lambda x: (1 if x['id'] in priority_ids else 0, x['student_count']), reverse=True)
-            for unit in branch_sem_map[bs]['common']:
-                if unit['id'] not in scheduled_ids:
-                    if not attempt_schedule(unit, core_valid_dates, require_1_day_gap=True): unscheduled_groups.append(unit)
-                    scheduled_ids.add(unit['id'])
-                    
-        for bs in sorted_bsems:
-            branch_sem_map[bs]['individual'].sort(key=lambda x: x['student_count'], reverse=True)
-            for unit in branch_sem_map[bs]['individual']:
-                if unit['id'] not in scheduled_ids:
-                    if not attempt_schedule(unit, core_valid_dates, require_1_day_gap=False): unscheduled_groups.append(unit)
-                    scheduled_ids.add(unit['id'])
-
-        return work_df, unscheduled_groups
+        if enforce_cap:
+            result_df, unsched = probe['result']['strict']
+        elif probe['result']['relaxed'] is not None:
+            result_df, unsched = probe['result']['relaxed']
+        else:
+            result_df, unsched = schedule_subjects(df, holidays, base_date, end_date, time_slots_dict,
+                                                   MAX_STUDENTS_PER_SESSION, profile, enforce_cap=False,
+                                                   run_pass=run_pass)
+        solver_info = result_df.attrs.get('solver')
+        if solver_info and solver_info['fallback'] and solver_info['objective'] is None:
+            st.warning(f"⏱️ Solver found no schedule within the time limit ({solver_info['status']}); using the greedy result.")
+        elif solver_info and solver_info['fallback']:
+            st.info(f"🧮 Solver's best schedule ({solver_info['status']}) was no better than the greedy one; using the greedy result.")
+        elif solver_info:
+            st.info(f"🧮 Solver finished with status {solver_info['status']} in {solver_info['wall_time']:.1f}s")
+        search_info = result_df.attrs.get('local_search')
+        if search_info and search_info['kept_greedy']:
+            st.info(f"🔀 Local search found nothing better than the greedy schedule in {search_info['iterations']:,} "
+                    f"iterations; keeping it")
+        elif search_info:
+            st.info(f"🔀 Local search moved {search_info['moved_units']} units in {search_info['iterations']:,} iterations "
+                    f"(objective {search_info['initial_cost']:,.0f} → {search_info['final_cost']:,.0f})")
+        return result_df.copy(deep=False), unsched
 
     if 'capacity_override_choice' not in st.session_state:
         temp_df, unsched = execute_pass(enforce_cap=True)
@@ -1614,55 +1290,28 @@ def schedule_all_subjects_comprehensively(df, holidays, base_date, end_date, MAX
             st.error(f"❌ Could not schedule {len(unsched)} subject groups due to strict capacity limits.")
             return final_df
             
-def validate_capacity_constraints(timetable_data, max_capacity=1250):
+def validate_capacity_constraints(timetable_data, max_capacity=1250, ledger=None):
     """
     Validates that the number of students per session for the MUMBAI campus does not exceed max_capacity.
-    """
-    if not timetable_data:
-        return True, []
 
-    # Combine all semester dataframes
-    full_df = pd.concat(timetable_data.values(), ignore_index=True)
-    
-    # Filter only scheduled rows
-    scheduled_df = full_df[
-        (full_df['Exam Date'].notna()) & 
-        (full_df['Exam Date'] != "") & 
-        (full_df['Exam Date'] != "Out of Range") &
-        (full_df['Exam Date'] != "Not Scheduled")
-    ].copy()
-
-    if scheduled_df.empty:
-        return True, []
-
-    # Ensure Campus column exists and fill nans
-    if 'Campus' not in scheduled_df.columns:
-        scheduled_df['Campus'] = 'Unknown'
-    
-    scheduled_df['Campus'] = scheduled_df['Campus'].fillna('Unknown').astype(str).str.strip().str.upper()
-    
-    # Group by Date, Slot AND CAMPUS
-    session_counts = scheduled_df.groupby(['Exam Date', 'Time Slot', 'Campus']).agg({
-        'StudentCount': 'sum',
-        'Subject': 'count'
-    }).reset_index()
+    Args:
+        timetable_data (dict): Semester -> scheduled DataFrame
+        max_capacity (int): Mumbai student limit per date/slot
+        ledger (CapacityLedger): Ledger already kept for timetable_data; built
+                                 from the frames when not given
 
-    violations = []
-    
-    for _, row in session_counts.iterrows():
-        campus_name = str(row['Campus'])
-        # ONLY apply capacity limit to MUMBAI campus
-        if "MUMBAI" in campus_name and row['StudentCount'] > max_capacity:
-            violations.append({
-                'date': row['Exam Date'],
-                'time_slot': row['Time Slot'],
-                'campus': campus_name,
-                'student_count': int(row['StudentCount']),
-                'subjects_count': int(row['Subject']),
-                'excess': int(row['StudentCount'] - max_capacity)
-            })
+    Returns:
+        tuple: (is_valid, violations, report) where report is the ledger's
+               per date/slot/campus table with the headroom of every session
+    """
+    if ledger is None:
+        if not timetable_data:
+            return True, [], CapacityLedger(max_capacity).to_frame()
+        ledger = CapacityLedger.from_frame(timetable_data, max_capacity)
 
-    return len(violations) == 0, violations
+    report = ledger.to_frame(max_capacity)
+    violations = violations_from_report(report)
+    return len(violations) == 0, violations, report
 
 def read_timetable(uploaded_file):
     try:
@@ -1673,215 +1322,28 @@ def read_timetable(uploaded_file):
             return None, None, None
         uploaded_file.seek(0)
 
-        df = pd.read_excel(uploaded_file, engine='openpyxl')
-        
-        # --- Clean Headers ---
-        df.columns = df.columns.str.strip()
-        
-        # 1. Map Columns
-        column_mapping = {
-            "Program": "Program", "Programme": "Program", 
-            "Stream": "Stream", "Specialization": "Stream", "Branch": "Stream",
-            "Current Session": "Semester", "Academic Session": "Semester", "Session": "Semester", "Semester": "Semester",
-            "Module Description": "SubjectName", "Subject Name": "SubjectName", "Subject Description": "SubjectName",
-            "Module Abbreviation": "ModuleCode", "Module Code": "ModuleCode", "Subject Code": "ModuleCode", "Code": "ModuleCode",
-            "Campus Name": "Campus", "Campus": "Campus", "School Name": "Campus", "Location": "Campus",
-            "Difficulty Score": "Difficulty", "Difficulty": "Difficulty",
-            "Exam Duration": "Exam Duration", "Duration": "Exam Duration",
-            "Student count": "StudentCount", "Student Count": "StudentCount", "Enrollment": "StudentCount", "Count": "StudentCount",
-            "CM group": "CMGroup", "CM Group": "CMGroup", "cm group": "CMGroup", 
-            "CMGroup": "CMGroup", "CM_Group": "CMGroup", "Common Module Group": "CMGroup",
-            "Exam Slot Number": "ExamSlotNumber", "exam slot number": "ExamSlotNumber",
-            "ExamSlotNumber": "ExamSlotNumber", "Exam_Slot_Number": "ExamSlotNumber", "Slot Number": "ExamSlotNumber",
-            "Common across sems": "CommonAcrossSems", "CommonAcrossSems": "CommonAcrossSems",
-            "Is Common": "IsCommon", "IsCommon": "IsCommon"
-        }
-        
-        df = df.rename(columns=column_mapping)
-        
-        # 2. Check Required Cols
-        required_cols = ["Program", "Semester", "ModuleCode", "SubjectName"]
-        missing_required = [col for col in required_cols if col not in df.columns]
-        if missing_required:
-            st.error(f"❌ **Missing Required Columns:** {', '.join(missing_required)}")
-            return None, None, None
+        # Same bytes for the same school parse to the same frames
+        cache_key = PARSE_CACHE.key(uploaded_file, st.session_state.get('selected_college', ''))
+        cached = PARSE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
 
-        # --- CRITICAL FIX FOR MERGED CELLS ---
-        cols_to_fill = ["Program", "Semester"]
-        if "Stream" in df.columns: cols_to_fill.append("Stream")
-        
-        for col in cols_to_fill:
-            if col in df.columns:
-                df[col] = df[col].ffill()
-
-        # 3. Clean Strings (Now removes non-breaking spaces \xa0)
-        string_columns = ["Program", "Stream", "SubjectName", "ModuleCode", "Campus", "Semester"]
-        for col in string_columns:
-            if col in df.columns:
-                df[col] = df[col].fillna("").astype(str).str.replace(r'\xa0', ' ', regex=True).str.strip()
-
-        # 4. Clean CMGroup (STRICT "0" HANDLING)
-        if "CMGroup" in df.columns:
-            df["CMGroup"] = df["CMGroup"].fillna("").astype(str)
-            df["CMGroup"] = df["CMGroup"].apply(lambda x: str(x).split('.')[0].strip())
-            df.loc[df["CMGroup"].isin(["0", "nan", "NaN", "None", ""]), "CMGroup"] = ""
-        else:
-            df["CMGroup"] = ""
-
-        # 5. Clean Numerics
-        numeric_columns = ["Exam Duration", "StudentCount", "Difficulty"]
-        for col in numeric_columns:
-            if col in df.columns:
-                if col == "Exam Duration":
-                    # Preserve whether the value was genuinely provided before the
-                    # fallback fill below overwrites blanks. Additive column only —
-                    # does not change existing fillna behavior for any college.
-                    df["Exam Duration_WasProvided"] = pd.to_numeric(df[col], errors='coerce').notna()
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0 if col != "Exam Duration" else 3)
-        
-        # 6. Branch Creation
-        def create_branch_identifier(row):
-            prog = row.get("Program", "")
-            stream = row.get("Stream", "")
-            if not stream or stream == prog or stream == "":
-                return prog
-            else:
-                return f"{prog} - {stream}"
-        
-        df["Branch"] = df.apply(create_branch_identifier, axis=1)
-        df["Subject"] = df["SubjectName"] + " (" + df["ModuleCode"] + ")"
-        
-        # Defaults
-        if "ExamSlotNumber" not in df.columns: df["ExamSlotNumber"] = 0
-        else: df["ExamSlotNumber"] = pd.to_numeric(df["ExamSlotNumber"], errors='coerce').fillna(0).astype(int)
-            
-        if "Category" not in df.columns: df["Category"] = "COMP"
-        
-        # 7. Clean OE Column
-        if "OE" not in df.columns: 
-            df["OE"] = ""
-        else: 
-            df["OE"] = df["OE"].fillna("").astype(str).replace(['nan', 'NaN', 'None'], '').str.strip()
-
-        # 8. Read and clean IsCommon column
-        if "IsCommon" not in df.columns:
-            df["IsCommon"] = "NO"
-        else:
-            df["IsCommon"] = df["IsCommon"].fillna("NO").astype(str).str.strip()
-
-        # Reset/Initialize CommonAcrossSems
-        if "CommonAcrossSems" not in df.columns:
-            df["CommonAcrossSems"] = False
-        else:
-            df["CommonAcrossSems"] = df["CommonAcrossSems"].fillna(False).astype(bool)
-
-        # ---------------------------------------------------------------
-        # MBA TECH SPECIAL LOGIC
-        # ---------------------------------------------------------------
-        sem_upper_series = df["Semester"].astype(str).str.strip().str.upper()
-        target_sem_mask = (
-            sem_upper_series.str.endswith("VIII") | sem_upper_series.str.endswith(" 8") | (sem_upper_series == "8") |
-            sem_upper_series.str.endswith("X")    | sem_upper_series.str.endswith(" 10") | (sem_upper_series == "10") |
-            (sem_upper_series == "SEM VIII") | (sem_upper_series == "SEM X")
-        )
-        is_common_within_mask = df["IsCommon"].astype(str).str.strip().str.upper() == "WITHIN"
-
-        priority_mask = target_sem_mask & is_common_within_mask
+        try:
+            df_non, df_ele, df = parse_input(uploaded_file)
+        except MissingColumnsError as e:
+            st.error(f"❌ **Missing Required Columns:** {', '.join(e.columns)}")
+            return None, None, None
 
-        if priority_mask.any():
-            df_priority_target = df[priority_mask]
-            for (sem_val, mod_code), group_idx in df_priority_target.groupby(["Semester", "ModuleCode"]).groups.items():
-                synthetic_cm = f"MBATECH_PRIORITY_{str(sem_val).strip().upper().replace(' ', '_')}_{str(mod_code).strip()}"
-                df.loc[group_idx, "CMGroup"] = synthetic_cm
+        if df["CMGroup"].astype(str).str.startswith(PRIORITY_CM_PREFIX).any():
             st.info(f"ℹ️ Priority Common-Within subjects detected: Assigned independent priority queues for Sem VIII / X.")
 
-        is_true_oe_mask = (df["OE"] != "")
-        
-        df_ele = df[is_true_oe_mask].copy()
-        df_non = df[~is_true_oe_mask].copy()
-
-        # Use raw Program/Stream for Main/Sub branch
-        for d in [df_non, df_ele]:
-            if not d.empty:
-                d["MainBranch"] = d["Program"]
-                d["SubBranch"] = d["Stream"]
-                d.loc[(d["SubBranch"] == "") | (d["SubBranch"].isna()) | (d["SubBranch"] == "nan"), "SubBranch"] = d["MainBranch"]
-
-        cols = ["MainBranch", "SubBranch", "Branch", "Semester", "Subject", "Category", "OE", 
-                "Exam Date", "Time Slot", "Exam Duration", "Exam Duration_WasProvided", "StudentCount", "ModuleCode", 
-                "CMGroup", "ExamSlotNumber", "Program", "CommonAcrossSems", "IsCommon", "Campus", "Difficulty"]
-        
-        for c in cols:
-            if c not in df_non.columns: df_non[c] = None
-            if not df_ele.empty and c not in df_ele.columns: df_ele[c] = None
-
-        return df_non[cols], df_ele, df
+        return PARSE_CACHE.put(cache_key, (df_non, df_ele, df))
 
     except Exception as e:
         st.error(f"❌ **Failed to Read File:** {str(e)}")
         import traceback
         st.code(traceback.format_exc())
         return None, None, None
-    
-
-def wrap_text(pdf, text, col_width):
-    cache_key = (text, col_width, pdf.font_style)
-    if cache_key in wrap_text_cache:
-        return wrap_text_cache[cache_key]
-        
-    import re
-    time_pattern = re.compile(r'([\[\(]\s*\d{1,2}:\d{2}\s*[AP]M\s*-\s*\d{1,2}:\d{2}\s*[AP]M\s*[\]\)])', re.IGNORECASE)
-    
-    parts = time_pattern.split(str(text))
-    tokens = []
-    for i, p in enumerate(parts):
-        if i % 2 == 1:
-            tokens.append(p)
-        else:
-            p = p.replace("<hr>", " <hr> ")
-            tokens.extend(p.split())
-            
-    lines = []
-    current_line = ""
-    
-    old_family = pdf.font_family
-    old_style = pdf.font_style
-    old_size = pdf.font_size_pt
-    
-    for token in tokens:
-        if token == "<hr>":
-            if current_line:
-                lines.append(current_line)
-                current_line = ""
-            lines.append("<hr>")
-            continue
-
-        test_line = token if not current_line else current_line + " " + token
-        
-        test_w = 0
-        for pt in time_pattern.split(test_line):
-            if not pt: continue
-            if time_pattern.match(pt):
-                pdf.set_font(old_family, 'B', old_size)
-                test_w += pdf.get_string_width(pt)
-            else:
-                pdf.set_font(old_family, old_style, old_size)
-                test_w += pdf.get_string_width(pt)
-                
-        if test_w <= col_width:
-            current_line = test_line
-        else:
-            if current_line:
-                lines.append(current_line)
-            current_line = token
-            
-    if current_line:
-        lines.append(current_line)
-        
-    pdf.set_font(old_family, old_style, old_size)
-    
-    wrap_text_cache[cache_key] = lines
-    return lines   
 
 def print_row_custom(pdf, row_data, col_widths, line_height=5, header=False):
     cell_padding = 1
@@ -1990,7 +1452,20 @@ def print_row_custom(pdf, row_data, col_widths, line_height=5, header=False):
     pdf.set_xy(x0, y0 + row_h)
 
 def print_table_custom(pdf, df, columns, col_widths, line_height=5, header_content=None, Programs=None, time_slot=None, actual_time_slots=None, declaration_date=None):
-    if df.empty: return
+    """
+    Print df as a paginated table, starting on a new page of its own.
+
+    A page is only added once there is a row to put on it, so a table with
+    no printable rows adds nothing and no page ends up holding just headers.
+
+    Returns:
+        bool: True if any row was printed
+    """
+    rows = []
+    for values in df[columns].itertuples(index=False, name=None):
+        row = [str(v) if pd.notna(v) else "" for v in values]
+        if any(cell.strip() for cell in row): rows.append(row)
+    if not rows: return False
     setattr(pdf, '_row_counter', 0)
 
     footer_height = 14
@@ -2093,6 +1568,7 @@ def print_table_custom(pdf, df, columns, col_widths, line_height=5, header_conte
 
         pdf.set_xy(pdf.l_margin, header_end_y)
 
+    pdf.add_page()
     render_footer()
     render_header()
 
@@ -2115,10 +1591,8 @@ def print_table_custom(pdf, df, columns, col_widths, line_height=5, header_conte
     # Table Row Content — Size 9.5, Regular
     pdf.set_font("Times", '', 9.5)
 
-    for idx in range(len(df)):
-        row = [str(df.iloc[idx][c]) if pd.notna(df.iloc[idx][c]) else "" for c in columns]
-        if not any(cell.strip() for cell in row): continue
-
+    rows_on_page = 0
+    for row in rows:
         wrapped_cells = []
         max_lines = 0
         for i, cell_text in enumerate(row):
@@ -2129,15 +1603,19 @@ def print_table_custom(pdf, df, columns, col_widths, line_height=5, header_conte
             max_lines = max(max_lines, len(lines))
         row_h = line_height * max_lines
 
-        if pdf.get_y() + row_h > pdf.h - footer_height - 5:
+        # Never break away from a page that has no rows yet (headers only)
+        if rows_on_page and pdf.get_y() + row_h > pdf.h - footer_height - 5:
             pdf.add_page()
             render_footer()
             render_header()
             pdf.set_font("Times", 'B', 9.5)
             print_row_custom(pdf, upper_columns, col_widths, line_height=line_height, header=True)
             pdf.set_font("Times", '', 9.5)
+            rows_on_page = 0
 
         print_row_custom(pdf, row, col_widths, line_height=line_height, header=False)
+        rows_on_page += 1
+    return True
 
         
 def calculate_end_time(start_time, duration_hours):
@@ -2162,8 +1640,49 @@ def calculate_end_time(start_time, duration_hours):
         
 
         
+def pdf_to_bytes(pdf):
+    """
+    The finished FPDF document as bytes, without writing it to disk.
+
+    FPDF 1.7 keeps the document as a latin-1 string (output(dest='S')); that
+    encoding is exactly what output(path) would have written. Nothing touches
+    the working directory, so concurrent sessions cannot clobber each other.
+    """
+    data = pdf.output(dest='S')
+    return data.encode('latin-1') if isinstance(data, str) else bytes(data)
+
+
+# Parsed images (FPDF image info) shared by every document this process renders
+_IMAGE_INFO = {}
+
+def preload_image(pdf, path):
+    """
+    Give a new FPDF document an image that has already been parsed.
+
+    FPDF 1.7 decodes a PNG's alpha channel pixel by pixel (about 1.5s for the
+    logo) the first time each document uses it. Business schools build one
+    document per program and trimester, so this is done once per process
+    instead. The image entry is copied because FPDF modifies it on output;
+    the PDF version an alpha channel requires (1.4) is carried over too.
+    """
+    if not os.path.exists(path): return
+    if path not in _IMAGE_INFO:
+        probe = FPDF()
+        probe.add_page()
+        probe.image(path, x=0, y=0, w=1)
+        info = {k: v for k, v in probe.images[path].items() if k != 'i'}
+        _IMAGE_INFO[path] = (info, probe.pdf_version)
+    if path not in pdf.images:
+        info, pdf_version = _IMAGE_INFO[path]
+        pdf.images[path] = dict(info, i=len(pdf.images) + 1)
+        pdf.pdf_version = max(pdf.pdf_version, pdf_version)
+
+
 ## ─────────────────────────────────────────────────────────────────────────────
-##  DROP-IN REPLACEMENT  —  convert_excel_to_pdf
+##  PDF RENDERER  —  render_timetable_pdfs
+##
+##  • Reads the program x semester records of build_timetable_sheets (the
+##    same pivots save_to_excel writes), never the workbook itself.
 ##
 ##  • School of Business Management  &  Pravin Dalal School of …
 ##    → Portrait A4, 4 columns: DAY & DATE | TIMING & SUBJECT (×3)
@@ -2173,8 +1692,26 @@ def calculate_end_time(start_time, duration_hours):
 ##  • All other colleges → existing Landscape Legal logic (unchanged).
 ## ─────────────────────────────────────────────────────────────────────────────
 
-def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6, declaration_date=None):
-    import uuid
+def render_timetable_pdfs(sheets, declaration_date=None, max_workers=None, errors=None):
+    """
+    Render the timetable PDFs straight from build_timetable_sheets records.
+
+    Program, semester and sheet kind come from the records, so nothing is
+    decoded from sheet names and no workbook is written or read. Business
+    schools' per-program documents are rendered in a process pool when there
+    are enough of them (see timetable_pdf).
+
+    Args:
+        sheets (list): build_timetable_sheets records
+        declaration_date (date): Printed in each header, or None
+        max_workers (int): Render processes; 1 renders here, None uses all CPUs
+        errors (list): When given, per-sheet problems are appended to it
+                       instead of being shown with st.warning
+
+    Returns:
+        dict: PDF file name -> bytes (one per program and trimester for
+              business schools, a single Timetable.pdf otherwise)
+    """
     current_college_context = st.session_state.get('selected_college', '')
     IS_LAW_SCHOOL   = "Law" in current_college_context
     IS_BUSINESS_SCH = (
@@ -2194,30 +1731,11 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
 
     SOL_MERGED_BRANCH = "B.A., LL.B. (Hons.) / B.B.A., LL.B. (Hons.)"
 
-    time_slots_dict = st.session_state.get('time_slots', {
-        1: {"start": "10:00 AM", "end": "1:00 PM"},
-        2: {"start": "2:00 PM",  "end": "5:00 PM"}
-    })
-
-    try:
-        df_dict = pd.read_excel(excel_path, sheet_name=None)
-    except Exception as e:
-        st.error(f"Error reading Excel file: {e}")
-        return {}
+    time_slots_dict = st.session_state.get('time_slots') or college_time_slots(st.session_state.get('selected_college', ''))
 
     def get_header_time_for_semester(sem_str):
         try:
-            s = str(sem_str).strip().upper()
-            sem_int = 1
-            romans = {'I':1,'II':2,'III':3,'IV':4,'V':5,'VI':6,
-                      'VII':7,'VIII':8,'IX':9,'X':10,'XI':11,'XII':12}
-            found = False
-            for r_key, r_val in romans.items():
-                if s == r_key or s.endswith(f" {r_key}") or s.endswith(f"_{r_key}"):
-                    sem_int = r_val; found = True; break
-            if not found:
-                digits = re.findall(r'\d+', s)
-                if digits: sem_int = int(digits[0])
+            sem_int = extract_numeric_sem(sem_str)
             slot_indicator = ((sem_int + 1) // 2) % 2
             slot_num = 1 if slot_indicator == 1 else 2
             slot_cfg = time_slots_dict.get(slot_num, time_slots_dict.get(1))
@@ -2228,6 +1746,31 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
     sheets_processed = 0
     pdf_outputs = {}
 
+    def report(message):
+        if errors is not None: errors.append(message)
+        else: st.warning(message)
+
+    def add_output(filename, data):
+        base_filename = filename
+        counter = 1
+        while filename in pdf_outputs:
+            filename = f"{base_filename.replace('.pdf', '')}_{counter}.pdf"
+            counter += 1
+        pdf_outputs[filename] = data
+
+    # Business schools: one document per sheet, so the sheets can be rendered in parallel
+    if IS_BUSINESS_SCH and max_workers != 1:
+        jobs = [s for s in sheets if not s['frame'].empty and s['kind'] != "elective"]
+        workers = pdf_workers(len(jobs), max_workers)
+        if workers > 1:
+            context = {k: st.session_state[k] for k in PDF_CONTEXT_KEYS if k in st.session_state}
+            for outputs, problems in render_sheets_parallel(jobs, declaration_date, context, workers):
+                for message in problems: report(message)
+                for filename, data in outputs: add_output(filename, data)
+            if not pdf_outputs and errors is None:
+                st.error("No valid sheets generated in PDF.")
+            return pdf_outputs
+
     # ══════════════════════════════════════════════════════════════════════════
     #  BRANCH A — School of Business Management / Pravin Dalal (MULTIPLE PDFs)
     # ══════════════════════════════════════════════════════════════════════════
@@ -2321,14 +1864,15 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
             pdf_obj.set_xy(pdf_obj.w - 10 - tw, pdf_obj.h - footer_height + 5)
             pdf_obj.cell(tw, 5, page_text, 0, 0, 'R')
 
+        sbm_logo      = "logo_sbm.png"
+        sbm_logo_file = sbm_logo if os.path.exists(sbm_logo) else LOGO_PATH
+
         def render_header_sbm(pdf_obj, header_content, declaration_date):
             pdf_obj.set_y(0)
             logo_w    = 45
             logo_y    = 3
-            sbm_logo  = "logo_sbm.png"
-            logo_file = sbm_logo if os.path.exists(sbm_logo) else LOGO_PATH
-            if os.path.exists(logo_file):
-                pdf_obj.image(logo_file, x=(pdf_obj.w - logo_w) / 2, y=logo_y, w=logo_w)
+            if os.path.exists(sbm_logo_file):
+                pdf_obj.image(sbm_logo_file, x=(pdf_obj.w - logo_w) / 2, y=logo_y, w=logo_w)
 
             text_y  = logo_y + 42
             F_COLLEGE, F_TITLE, F_PROG, F_YEAR, LINE_GAP = 10, 8.5, 8.5, 8.5, 1
@@ -2491,21 +2035,13 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
             pdf_obj.set_xy(x0, y0 + row_h)
             return row_h
 
-        for sheet_name, sheet_df in df_dict.items():
+        for sheet in sheets:
+            sheet_name, sheet_df = sheet['sheet_name'], sheet['frame']
             try:
-                if sheet_df.empty or sheet_name in ["No_Data","Daily_Statistics","Summary","Verification","Empty"]: continue
-                if re.search(r'_Ele(\d*)$', sheet_name): continue
+                if sheet_df.empty or sheet['kind'] == "elective": continue
 
-                main_branch_full = ""
-                for col in ("Program", "MainBranch"):
-                    if col in sheet_df.columns and not sheet_df[col].dropna().empty:
-                        main_branch_full = str(sheet_df[col].dropna().iloc[0])
-                        break
-                if not main_branch_full or "Unnamed" in main_branch_full:
-                    if '_|_' in sheet_name: main_branch_full = sheet_name.split('_|_')[0]
-                    else: main_branch_full = sheet_name
-
-                semester_raw = sheet_name.split('_|_')[1] if '_|_' in sheet_name else sheet_name
+                main_branch_full = str(sheet['program']) or sheet_name
+                semester_raw = sheet['semester']
                 display_sem = semester_raw.strip()
                 for prefix in ("trimester", "semester", "sem", "tri"):
                     if display_sem.lower().startswith(prefix):
@@ -2534,7 +2070,7 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
                         dv = roman_map2.get(disp_check) or (int(re.search(r'\d+', disp_check).group()) if re.search(r'\d+', disp_check) else None)
                         if sv != dv: continue
 
-                    matched = sem_df[sem_df['MainBranch'].astype(str) == main_branch_full].copy()
+                    matched = sem_df[sem_df['MainBranch'].astype(str) == main_branch_full]
                     if not matched.empty: rows_for_sheet.append(matched)
 
                 slot_pivot = {}
@@ -2593,6 +2129,7 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
                 if not slot_pivot: continue
 
                 pdf = FPDF(orientation='P', unit='mm', format='A4')
+                preload_image(pdf, sbm_logo_file)
                 pdf.set_auto_page_break(auto=False, margin=15)
                 pdf.alias_nb_pages()
 
@@ -2625,6 +2162,7 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
                 _table_bottom = pdf.h - footer_height - _instr_h - 4
 
                 pdf.set_font("Times", '', 9.5)
+                rows_on_page = 0
                 for d_str, slots in slot_pivot.items():
                     row_cells = [d_str]
                     for sn in active_slots:
@@ -2632,37 +2170,28 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
                         row_cells.append("\n".join(subj_list) if subj_list else "-------------------")
 
                     max_lines_est = max(len(_wrap_cell(pdf, txt, act_col_widths[i] - 2 * PAD, '', 9.5)) for i, txt in enumerate(row_cells))
-                    if pdf.get_y() + (LINE_H * max_lines_est) > _table_bottom:
+                    if rows_on_page and pdf.get_y() + (LINE_H * max_lines_est) > _table_bottom:
                         render_instructions_and_signature_sbm(pdf, pdf.get_y() + 2)
                         pdf.add_page()
                         render_footer_sbm(pdf)
                         render_header_sbm(pdf, header_content, declaration_date)
                         _draw_row(pdf, act_header_cells, act_col_widths, 'B', 9.5)
                         _draw_row(pdf, act_time_cells,   act_col_widths, 'B', 9)
+                        rows_on_page = 0
 
                     _draw_row(pdf, row_cells, act_col_widths, '', 9.5)
+                    rows_on_page += 1
 
                 render_instructions_and_signature_sbm(pdf, pdf.get_y() + 2)
 
                 clean_branch = re.sub(r'[^A-Za-z0-9_\- ]', '', main_branch_full).strip().replace(" ", "_")
                 clean_sem = re.sub(r'[^A-Za-z0-9_\- ]', '', display_sem).strip().replace(" ", "_")
                 filename = f"{clean_branch}_Trimester_{clean_sem}.pdf"
-                
-                base_filename = filename
-                counter = 1
-                while filename in pdf_outputs:
-                    filename = f"{base_filename.replace('.pdf', '')}_{counter}.pdf"
-                    counter += 1
-                
-                temp_path = f"temp_{uuid.uuid4().hex}.pdf"
-                pdf.output(temp_path)
-                with open(temp_path, "rb") as f:
-                    pdf_outputs[filename] = f.read()
-                os.remove(temp_path)
+                add_output(filename, pdf_to_bytes(pdf))
                 sheets_processed += 1
 
             except Exception as e:
-                st.warning(f"Error processing sheet {sheet_name}: {e}")
+                report(f"Error processing sheet {sheet_name}: {e}")
                 continue
 
     # ══════════════════════════════════════════════════════════════════════════
@@ -2673,20 +2202,15 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
         pdf.set_auto_page_break(auto=False, margin=15)
         pdf.alias_nb_pages()
 
-        for sheet_name, sheet_df in df_dict.items():
+        for sheet in sheets:
+            sheet_name, sheet_df = sheet['sheet_name'], sheet['frame']
             try:
                 if sheet_df.empty: continue
-                if hasattr(sheet_df, 'index') and len(sheet_df.index.names) > 1: sheet_df = sheet_df.reset_index()
 
-                main_branch_full = ""
-                for col in ("Program", "MainBranch"):
-                    if col in sheet_df.columns and not sheet_df[col].dropna().empty:
-                        main_branch_full = str(sheet_df[col].dropna().iloc[0])
-                        break
-                if not main_branch_full or "Unnamed" in main_branch_full:
-                    if '_|_' in sheet_name: main_branch_full = sheet_name.split('_|_')[0]
+                main_branch_full = str(sheet['program'])
 
-                rename_cols = {col: main_branch_full for col in sheet_df.columns if str(col).startswith("Unnamed:")}
+                # A stream with no name is shown under the program's name
+                rename_cols = {col: main_branch_full for col in sheet_df.columns if str(col) == ""}
                 if rename_cols: sheet_df = sheet_df.rename(columns=rename_cols)
 
                 sheet_college_name = st.session_state.get('selected_college', "SVKM's NMIMS University")
@@ -2695,14 +2219,9 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
                     if "LL.M" in prog_upper or "MASTER OF LAW" in prog_upper: sheet_college_name = "Kirit P. Mehta School of Law"
                     else: sheet_college_name = "Kirit P. Mehta School of Law / School of Law"
 
-                semester_raw = sheet_name.split('_|_')[1] if '_|_' in sheet_name else (sheet_name if not main_branch_full else "General")
-                if sheet_name in ["No_Data","Daily_Statistics","Summary","Verification","Empty"]: continue
+                semester_raw = sheet['semester']
                 if not main_branch_full: main_branch_full = sheet_name
-
-                is_elective = False
-                if re.search(r'_Ele(\d*)$', semester_raw):
-                    semester_raw = re.sub(r'_Ele\d*$', '', semester_raw)
-                    is_elective  = True
+                is_elective = sheet['kind'] == "elective"
 
                 if IS_LAW_SCHOOL and is_elective: continue
 
@@ -2726,7 +2245,7 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
                     for start in range(0, len(sub_branch_cols), cols_per_page):
                         chunk        = sub_branch_cols[start:start + cols_per_page]
                         cols_to_print = fixed_cols + chunk
-                        chunk_df     = sheet_df[cols_to_print].copy()
+                        chunk_df     = sheet_df[cols_to_print]
 
                         subset     = chunk_df[chunk].astype(str).apply(lambda x: x.str.strip())
                         mask       = ((subset != "") & (subset != "nan") & (subset != "---")).any(axis=1)
@@ -2742,18 +2261,17 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
                         num_sub        = max(len(chunk), 1)
                         col_widths_lp  = [date_col_width] + [(page_w - date_col_width) / num_sub] * len(chunk)
 
-                        pdf.add_page()
                         original_college = st.session_state.get('selected_college')
                         st.session_state['selected_college'] = sheet_college_name
 
-                        print_table_custom(pdf, chunk_df, cols_to_print, col_widths_lp, line_height=5, header_content=header_content, Programs=chunk, time_slot=header_exam_time, declaration_date=declaration_date)
+                        printed = print_table_custom(pdf, chunk_df, cols_to_print, col_widths_lp, line_height=5, header_content=header_content, Programs=chunk, time_slot=header_exam_time, declaration_date=declaration_date)
 
                         if original_college: st.session_state['selected_college'] = original_college
-                        sheets_processed += 1
+                        if printed: sheets_processed += 1
 
                 else:
                     if ('Subjects' in sheet_df.columns and 'Open Elective (All Applicable Streams)' not in sheet_df.columns):
-                        sheet_df.rename(columns={'Subjects': 'Open Elective (All Applicable Streams)'}, inplace=True)
+                        sheet_df = sheet_df.rename(columns={'Subjects': 'Open Elective (All Applicable Streams)'})
 
                     target_cols    = ['Exam Date','OE Type', 'Open Elective (All Applicable Streams)']
                     available_cols = [c for c in target_cols if c in sheet_df.columns]
@@ -2766,20 +2284,19 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
                             sheet_df["Exam Date"] = pd.to_datetime(sheet_df["Exam Date"], format="%d-%m-%Y", errors='coerce').dt.strftime("%A, %d %B, %Y")
                         except: pass
 
-                        pdf.add_page()
                         col_widths_oe = [30, 25]
                         col_widths_oe.append(pdf.w - 2 * pdf.l_margin - sum(col_widths_oe))
 
                         original_college = st.session_state.get('selected_college')
                         st.session_state['selected_college'] = sheet_college_name
 
-                        print_table_custom(pdf, sheet_df, available_cols, col_widths_oe, line_height=5, header_content=header_content, Programs=["Electives"], time_slot=header_exam_time, declaration_date=declaration_date)
+                        printed = print_table_custom(pdf, sheet_df, available_cols, col_widths_oe, line_height=5, header_content=header_content, Programs=["Electives"], time_slot=header_exam_time, declaration_date=declaration_date)
 
                         if original_college: st.session_state['selected_college'] = original_college
-                        sheets_processed += 1
+                        if printed: sheets_processed += 1
 
             except Exception as e:
-                st.warning(f"Error processing PDF sheet {sheet_name}: {e}")
+                report(f"Error processing PDF sheet {sheet_name}: {e}")
                 continue
 
         if sheets_processed > 0:
@@ -2819,45 +2336,36 @@ def convert_excel_to_pdf(excel_path, pdf_path=None, sub_branch_cols_per_page=6,
                     pdf.ln(2)
             except Exception: pass
 
-            temp_path = f"temp_{uuid.uuid4().hex}.pdf"
-            pdf.output(temp_path)
-            with open(temp_path, "rb") as f:
-                pdf_outputs["Timetable.pdf"] = f.read()
-            os.remove(temp_path)
+            pdf_outputs["Timetable.pdf"] = pdf_to_bytes(pdf)
 
     if sheets_processed == 0:
-        st.error("No valid sheets generated in PDF.")
+        if errors is None: st.error("No valid sheets generated in PDF.")
         return {}
 
     return pdf_outputs
         
-def generate_pdf_timetable(semester_wise_timetable, output_pdf, declaration_date=None):
+def generate_pdf_timetable(semester_wise_timetable, output_pdf, declaration_date=None, sheets=None):
+    """
+    Render the timetable PDF(s) into st.session_state.pdf_data (a ZIP when
+    there are several).
+
+    sheets, when given, are the build_timetable_sheets records already made
+    for save_to_excel; the PDF is drawn from them without a workbook round trip.
+    """
     import zipfile
-    temp_excel = os.path.join(os.path.dirname(output_pdf), "temp_timetable.xlsx")
-    excel_data = save_to_excel(semester_wise_timetable)
-    
-    if excel_data:
-        try:
-            with open(temp_excel, "wb") as f:
-                f.write(excel_data.getvalue())
-        except Exception as e:
-            st.error(f"❌ Error saving temporary Excel file: {e}")
-            return
-            
-        try:
-            # We now receive a DICTIONARY of PDFs from the converter
-            pdf_dict = convert_excel_to_pdf(temp_excel, declaration_date=declaration_date)
-        except Exception as e:
-            st.error(f"❌ Error during Excel to PDF conversion: {e}")
-            import traceback
-            st.error(f"Traceback: {traceback.format_exc()}")
-            return
-        
-        try:
-            if os.path.exists(temp_excel): os.remove(temp_excel)
-        except Exception as e: pass
-    else:
-        st.error("❌ No Excel data generated - cannot create PDF")
+    if not semester_wise_timetable:
+        st.error("❌ No timetable data - cannot create PDF")
+        return
+
+    try:
+        if sheets is None:
+            sheets = build_timetable_sheets(semester_wise_timetable)
+        # We now receive a DICTIONARY of PDFs from the renderer
+        pdf_dict = render_timetable_pdfs(sheets, declaration_date=declaration_date)
+    except Exception as e:
+        st.error(f"❌ Error during PDF generation: {e}")
+        import traceback
+        st.error(f"Traceback: {traceback.format_exc()}")
         return
     
     if not pdf_dict:
@@ -2865,33 +2373,8 @@ def generate_pdf_timetable(semester_wise_timetable, output_pdf, declaration_date
         return
 
     try:
-        final_pdfs = {}
-        page_number_pattern = re.compile(r'^[\s\n]*(?:Page\s*)?\d+[\s\n]*$')
-
-        # Post-process every PDF in the dictionary to remove blank pages
-        for filename, pdf_bytes in pdf_dict.items():
-            reader = PdfReader(io.BytesIO(pdf_bytes))
-            writer = PdfWriter()
-            
-            pages_kept = 0
-            for page in reader.pages:
-                try: text = page.extract_text() if page else ""
-                except: text = ""
-                cleaned_text = text.strip() if text else ""
-                is_blank = (not cleaned_text or page_number_pattern.match(cleaned_text) or len(cleaned_text) <= 10)
-                
-                if not is_blank:
-                    writer.add_page(page)
-                    pages_kept += 1
-                    
-            if pages_kept > 0:
-                out_buffer = io.BytesIO()
-                writer.write(out_buffer)
-                final_pdfs[filename] = out_buffer.getvalue()
-        
-        if not final_pdfs:
-            st.error("❌ All PDF pages were blank after processing.")
-            return
+        # The renderer only adds pages it puts rows on, so the PDFs are final as drawn
+        final_pdfs = pdf_dict
 
         # Check if we need to ZIP or just return a single PDF
         if len(final_pdfs) == 1:
@@ -2909,7 +2392,7 @@ def generate_pdf_timetable(semester_wise_timetable, output_pdf, declaration_date
             st.success(f"🎉 Generated {len(final_pdfs)} individual PDFs bundled into a ZIP file!")
             
     except Exception as e:
-        st.error(f"❌ Error during PDF post-processing/Zipping: {str(e)}")
+        st.error(f"❌ Error during PDF Zipping: {str(e)}")
         import traceback
         st.error(f"Traceback: {traceback.format_exc()}")
         
@@ -2919,10 +2402,7 @@ def save_verification_excel(original_df, semester_wise_timetable):
         return None
 
     # Get time slots configuration
-    time_slots_dict = st.session_state.get('time_slots', {
-        1: {"start": "10:00 AM", "end": "1:00 PM"},
-        2: {"start": "2:00 PM", "end": "5:00 PM"}
-    })
+    time_slots_dict = st.session_state.get('time_slots') or college_time_slots(st.session_state.get('selected_college', ''))
 
     # Combine all scheduled data first
     scheduled_data = pd.concat(semester_wise_timetable.values(), ignore_index=True)
@@ -2975,7 +2455,7 @@ def save_verification_excel(original_df, semester_wise_timetable):
     
     # Create verification dataframe with available columns
     columns_to_include = list(actual_columns.values())
-    verification_df = original_df[columns_to_include].copy()
+    verification_df = original_df[columns_to_include]
     
     # Standardize column names
     reverse_mapping = {v: k for k, v in actual_columns.items()}
@@ -3122,7 +2602,7 @@ def save_verification_excel(original_df, semester_wise_timetable):
     # STATISTICS & ANALYSIS GENERATION
     # ---------------------------------------------------------
     
-    scheduled_subjects = verification_df[verification_df["Scheduling Status"] == "Scheduled"].copy()
+    scheduled_subjects = verification_df[verification_df["Scheduling Status"] == "Scheduled"]
     
     # 1. Clean Student Count
     if 'Student count' in scheduled_subjects.columns:
@@ -3137,7 +2617,7 @@ def save_verification_excel(original_df, semester_wise_timetable):
     daily_stats = []
     if not scheduled_subjects.empty:
         campuses = scheduled_subjects['Campus'].unique()
-        for exam_date, day_group in scheduled_subjects.groupby('Exam Date'):
+        for exam_date, day_group in scheduled_subjects.groupby('Exam Date', observed=True):
             if pd.isna(exam_date) or str(exam_date).strip() == "": continue
                 
             unique_subjects_count = len(day_group['Module Abbreviation'].unique())
@@ -3164,7 +2644,7 @@ def save_verification_excel(original_df, semester_wise_timetable):
             'Exam Date', 'Exam Slot Number', 'Time Slot', 'Campus', 
             'Module Abbreviation', 'Module Description', 'Program', 'Stream', 
             'Student Count Clean', 'Is Common Status'
-        ]].copy()
+        ]]
         detailed_schedule_df.rename(columns={'Student Count Clean': 'Student Count'}, inplace=True)
         detailed_schedule_df = detailed_schedule_df.sort_values(['Exam Date', 'Exam Slot Number', 'Campus', 'Module Abbreviation'])
 
@@ -3173,7 +2653,7 @@ def save_verification_excel(original_df, semester_wise_timetable):
         utilization_data = []
         overload_data = []
         
-        grp = scheduled_subjects.groupby(['Exam Date', 'Exam Slot Number', 'Time Slot', 'Campus'])
+        grp = scheduled_subjects.groupby(['Exam Date', 'Exam Slot Number', 'Time Slot', 'Campus'], observed=True)
         for (date, slot_num, time, campus), inner_df in grp:
             total_studs = int(inner_df['Student Count Clean'].sum())
             subj_count = len(inner_df)
@@ -3273,7 +2753,7 @@ def save_verification_excel(original_df, semester_wise_timetable):
         
         unmatched_subjects = verification_df[verification_df["Scheduling Status"] == "Not Scheduled"]
         if not unmatched_subjects.empty:
-            unmatched_export = unmatched_subjects[final_cols].copy()
+            unmatched_export = unmatched_subjects[final_cols]
             unmatched_export.to_excel(writer, sheet_name="Unmatched_Subjects", index=False)
 
     output.seek(0)
@@ -3284,31 +2764,25 @@ def convert_semester_to_number(semester_value):
     """Convert semester string to number with better error handling"""
     if pd.isna(semester_value):
         return 0
-    
-    semester_str = str(semester_value).strip()
-    
-    semester_map = {
-        "Sem I": 1, "Sem II": 2, "Sem III": 3, "Sem IV": 4,
-        "Sem V": 5, "Sem VI": 6, "Sem VII": 7, "Sem VIII": 8,
-        "Sem IX": 9, "Sem X": 10, "Sem XI": 11,
-        "1": 1, "2": 2, "3": 3, "4": 4, "5": 5, "6": 6, "7": 7, "8": 8, "9": 9, "10": 10, "11": 11
-    }
-    
-    return semester_map.get(semester_str, 0)
+    return extract_numeric_sem(semester_value, default=0)
 
-def save_to_excel(semester_wise_timetable):
+def build_timetable_sheets(semester_wise_timetable):
     """
-    Safely generates Excel with STRICT 31-char limit for sheet names.
-    Aggregates Electives into a clean summary table without Time Slot (as it's in header).
-    Uses Robust Roman Numeral Parsing to correctly determine Standard Slots.
+    The timetable as program x semester pivots: one record per Excel sheet,
+    shared by save_to_excel and the PDF renderer.
+
+    Sheet names keep a STRICT 31-char limit. Electives are aggregated into a
+    clean summary table without Time Slot (as it's in header). Uses Robust Roman
+    Numeral Parsing to correctly determine Standard Slots.
 
     SOL: B.A., LL.B. (Hons.) and B.B.A., LL.B. (Hons.) rows are merged under
     one combined sheet per semester. Open Electives are folded inline (no separate sheet).
-    """
-    if not semester_wise_timetable:
-        st.warning("No timetable data to save")
-        return None
 
+    Returns:
+        list: One dict per sheet with sheet_name, program, semester (as in the
+              timetable's keys), kind ("core", "elective" or "empty") and frame
+              (the pivot or elective summary, exactly as written to Excel)
+    """
     # SOL detection
     current_college_context = st.session_state.get('selected_college', '')
     IS_LAW_SCHOOL = "Law" in current_college_context
@@ -3357,7 +2831,7 @@ def save_to_excel(semester_wise_timetable):
         if df_input.empty:
             return df_input
 
-        df_out = df_input.copy()
+        df_out = df_input.copy(deep=False)
         mask = df_out['MainBranch'].apply(_is_ba_bba_llb)
         if not mask.any():
             return df_out
@@ -3381,10 +2855,7 @@ def save_to_excel(semester_wise_timetable):
         df_out.loc[mask, 'MainBranch'] = SOL_MERGED_BRANCH
         return df_out
 
-    time_slots_dict = st.session_state.get('time_slots', {
-        1: {"start": "10:00 AM", "end": "1:00 PM"},
-        2: {"start": "2:00 PM", "end": "5:00 PM"}
-    })
+    time_slots_dict = st.session_state.get('time_slots') or college_time_slots(st.session_state.get('selected_college', ''))
 
     def normalize_time(t_str):
         if not isinstance(t_str, str): return ""
@@ -3421,183 +2892,189 @@ def save_to_excel(semester_wise_timetable):
         existing_sheet_names.add(candidate.lower())
         return candidate
 
+    sheets = []
+    for sem, df_sem in semester_wise_timetable.items():
+        if df_sem.empty: continue
+
+        raw_sem_str = str(sem).strip()
+
+        sem_num = extract_numeric_sem(raw_sem_str)
+
+        slot_indicator = ((sem_num + 1) // 2) % 2
+        primary_slot_num = 1 if slot_indicator == 1 else 2
+        primary_slot_config = time_slots_dict.get(primary_slot_num, time_slots_dict.get(1))
+        primary_slot_str = f"{primary_slot_config['start']} - {primary_slot_config['end']}"
+        primary_slot_norm = normalize_time(primary_slot_str)
+
+        # ── SOL MERGE: run before iterating main_branch ──────────────
+        df_sem_working = _apply_sol_merge(df_sem, sem_num=sem_num) if IS_LAW_SCHOOL else df_sem
+
+        for main_branch in df_sem_working["MainBranch"].unique():
+            df_mb = df_sem_working[df_sem_working["MainBranch"] == main_branch]
+            if df_mb.empty: continue
+
+            # ── SOL: fold OE rows inline; suppress separate elective sheet ──
+            if IS_LAW_SCHOOL and main_branch == SOL_MERGED_BRANCH:
+                # Treat ALL rows as core for this merged branch
+                df_non_elec = df_mb.copy(deep=False)
+                df_elec = pd.DataFrame()
+
+                # Tag OE rows so they are identifiable in the cell text
+                oe_mask = (
+                    df_non_elec['OE'].notna() &
+                    (df_non_elec['OE'].astype(str).str.strip() != "")
+                )
+                if oe_mask.any():
+                    df_non_elec.loc[oe_mask, 'Subject'] = (
+                        "[OE: " +
+                        df_non_elec.loc[oe_mask, 'OE'].astype(str).str.strip() +
+                        "] " +
+                        df_non_elec.loc[oe_mask, 'Subject'].astype(str)
+                    )
+            else:
+                df_non_elec = df_mb[df_mb['OE'].isna() | (df_mb['OE'].str.strip() == "")]
+                df_elec = df_mb[df_mb['OE'].notna() & (df_mb['OE'].str.strip() != "")]
+
+            suffix = f"_|_{raw_sem_str}"
+            sheet_name = get_safe_sheet_name(main_branch, suffix)
+
+            if not df_non_elec.empty:
+                df_processed = df_non_elec.reset_index(drop=True)
+                subject_displays = []
+                for idx in range(len(df_processed)):
+                    row = df_processed.iloc[idx]
+                    base_subject = str(row.get('Subject', ''))
+                    assigned_slot_str = str(row.get('Time Slot', '')).strip()
+
+                    if is_business_school:
+                        # Only treat duration as "real" when it was actually
+                        # provided for this subject. If blank, fall back to the
+                        # assigned slot's own width (no artificial mismatch,
+                        # so no bracket gets shown for subjects with no
+                        # explicit Exam Duration in the input).
+                        _raw_duration = row.get('Exam Duration', None)
+                        duration_provided = pd.notna(_raw_duration) and str(_raw_duration).strip() not in ('', 'nan')
+                        if duration_provided:
+                            try:
+                                duration = float(_raw_duration)
+                            except:
+                                duration_provided = False
+                                duration = None
+                        if not duration_provided:
+                            duration = None
+                            try:
+                                if assigned_slot_str and " - " in assigned_slot_str:
+                                    _s, _e = assigned_slot_str.split(" - ")
+                                    _sd = datetime.strptime(_s.strip(), "%I:%M %p")
+                                    _ed = datetime.strptime(_e.strip(), "%I:%M %p")
+                                    duration = (_ed - _sd).total_seconds() / 3600.0
+                            except:
+                                pass
+                    else:
+                        duration = float(row.get('Exam Duration', 3.0))
+
+                    calculated_time_str = assigned_slot_str
+                    try:
+                        if assigned_slot_str and " - " in assigned_slot_str and duration is not None:
+                            start_time_part = assigned_slot_str.split(" - ")[0].strip()
+                            end_time_calc = calculate_end_time(start_time_part, duration)
+                            calculated_time_str = f"{start_time_part} - {end_time_calc}"
+                    except: pass
+
+                    subj_time_norm = normalize_time(calculated_time_str)
+
+                    if subj_time_norm != primary_slot_norm and subj_time_norm != "":
+                        time_suffix = f" [{calculated_time_str}]" 
+                    else:
+                        time_suffix = ""
+
+                    subject_displays.append(base_subject + time_suffix)
+
+                df_processed["SubjectDisplay"] = subject_displays
+                df_processed["Exam Date"] = pd.to_datetime(df_processed["Exam Date"], format="%d-%m-%Y", dayfirst=True, errors='coerce')
+                df_processed = df_processed.sort_values(by="Exam Date", ascending=True)
+
+                grouped = df_processed.groupby(['Exam Date', 'SubBranch'], observed=True).agg({
+                    'SubjectDisplay': lambda x: " <hr> ".join(dict.fromkeys(str(i) for i in x))
+                }).reset_index()
+
+                try:
+                    pivot_df = grouped.pivot_table(index="Exam Date", columns="SubBranch", values="SubjectDisplay", aggfunc='first').fillna("---")
+                    pivot_df = pivot_df.sort_index(ascending=True).reset_index()
+                    pivot_df['Exam Date'] = pivot_df['Exam Date'].apply(lambda x: x.strftime("%d-%m-%Y") if pd.notna(x) else "")
+
+                    pivot_df['Program'] = main_branch
+                    pivot_df['Semester'] = raw_sem_str
+
+                    sheets.append({'sheet_name': sheet_name, 'program': main_branch, 'semester': raw_sem_str,
+                                   'kind': "core", 'frame': pivot_df})
+                except: pass
+            else:
+                sheets.append({'sheet_name': sheet_name, 'program': main_branch, 'semester': raw_sem_str,
+                               'kind': "empty",
+                               'frame': pd.DataFrame({'Exam Date': ['No exams'], 'Note': ['No core subjects']})})
+
+            if not df_elec.empty:
+                suffix_elec = f"_|_{raw_sem_str}_Ele"
+                sheet_name_elec = get_safe_sheet_name(main_branch, suffix_elec)
+
+                try:
+                    df_elec_scheduled = df_elec[df_elec['Exam Date'].notna() & (df_elec['Exam Date'] != "") & (df_elec['Exam Date'] != "Not Scheduled")]
+
+                    if not df_elec_scheduled.empty:
+                        df_elec_scheduled['DisplaySubject'] = df_elec_scheduled['Subject']
+
+                        summary_df = df_elec_scheduled.groupby(['Exam Date', 'Time Slot', 'OE'], observed=True).agg({
+                            'DisplaySubject': lambda x: ", ".join(sorted(set(x)))
+                        }).reset_index()
+
+                        summary_df.rename(columns={'DisplaySubject': 'Open Elective (All Applicable Streams)', 'OE': 'OE Type'}, inplace=True)
+
+                        summary_df['DateObj'] = pd.to_datetime(summary_df['Exam Date'], format="%d-%m-%Y", errors='coerce')
+                        summary_df = summary_df.sort_values('DateObj').drop('DateObj', axis=1)
+
+                        if 'Time Slot' in summary_df.columns:
+                            summary_df = summary_df.drop('Time Slot', axis=1)
+
+                        summary_df['Program'] = main_branch
+                        summary_df['Semester'] = raw_sem_str
+
+                        sheets.append({'sheet_name': sheet_name_elec, 'program': main_branch, 'semester': raw_sem_str,
+                                       'kind': "elective", 'frame': summary_df})
+                except Exception as e:
+                    pass
+
+    return sheets
+
+
+def save_to_excel(semester_wise_timetable, sheets=None):
+    """
+    Write the timetable workbook: one sheet per build_timetable_sheets record.
+
+    Args:
+        semester_wise_timetable (dict): Semester -> scheduled rows
+        sheets (list): Records already built from it, to skip building them again
+
+    Returns:
+        BytesIO or None: The .xlsx file
+    """
+    if not semester_wise_timetable:
+        st.warning("No timetable data to save")
+        return None
+
     output = io.BytesIO()
    
     try:
+        if sheets is None:
+            sheets = build_timetable_sheets(semester_wise_timetable)
         with pd.ExcelWriter(output, engine='openpyxl') as writer:
             sheets_created = 0
-           
-            for sem, df_sem in semester_wise_timetable.items():
-                if df_sem.empty: continue
-                
-                raw_sem_str = str(sem).strip()
-                
-                sem_num = 1
+            for sheet in sheets:
                 try:
-                    s_upper = raw_sem_str.upper()
-                    romans = {
-                        'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 
-                        'VI': 6, 'VII': 7, 'VIII': 8, 'IX': 9, 'X': 10, 
-                        'XI': 11, 'XII': 12
-                    }
-                    found_roman = False
-                    for r_key, r_val in romans.items():
-                        if s_upper == r_key or s_upper.endswith(f" {r_key}") or s_upper.endswith(f"_{r_key}"):
-                            sem_num = r_val
-                            found_roman = True
-                            break
-                    
-                    if not found_roman:
-                        import re
-                        digits = re.findall(r'\d+', raw_sem_str)
-                        if digits: sem_num = int(digits[0])
-                except:
-                    sem_num = 1
-
-                slot_indicator = ((sem_num + 1) // 2) % 2
-                primary_slot_num = 1 if slot_indicator == 1 else 2
-                primary_slot_config = time_slots_dict.get(primary_slot_num, time_slots_dict.get(1))
-                primary_slot_str = f"{primary_slot_config['start']} - {primary_slot_config['end']}"
-                primary_slot_norm = normalize_time(primary_slot_str)
-
-                # ── SOL MERGE: run before iterating main_branch ──────────────
-                df_sem_working = _apply_sol_merge(df_sem, sem_num=sem_num) if IS_LAW_SCHOOL else df_sem
-
-                for main_branch in df_sem_working["MainBranch"].unique():
-                    df_mb = df_sem_working[df_sem_working["MainBranch"] == main_branch].copy()
-                    if df_mb.empty: continue
-
-                    # ── SOL: fold OE rows inline; suppress separate elective sheet ──
-                    if IS_LAW_SCHOOL and main_branch == SOL_MERGED_BRANCH:
-                        # Treat ALL rows as core for this merged branch
-                        df_non_elec = df_mb.copy()
-                        df_elec = pd.DataFrame()
-
-                        # Tag OE rows so they are identifiable in the cell text
-                        oe_mask = (
-                            df_non_elec['OE'].notna() &
-                            (df_non_elec['OE'].astype(str).str.strip() != "")
-                        )
-                        if oe_mask.any():
-                            df_non_elec.loc[oe_mask, 'Subject'] = (
-                                "[OE: " +
-                                df_non_elec.loc[oe_mask, 'OE'].astype(str).str.strip() +
-                                "] " +
-                                df_non_elec.loc[oe_mask, 'Subject'].astype(str)
-                            )
-                    else:
-                        df_non_elec = df_mb[df_mb['OE'].isna() | (df_mb['OE'].str.strip() == "")].copy()
-                        df_elec = df_mb[df_mb['OE'].notna() & (df_mb['OE'].str.strip() != "")].copy()
-                   
-                    suffix = f"_|_{raw_sem_str}"
-                    sheet_name = get_safe_sheet_name(main_branch, suffix)
-                   
-                    if not df_non_elec.empty:
-                        df_processed = df_non_elec.copy().reset_index(drop=True)
-                        subject_displays = []
-                        for idx in range(len(df_processed)):
-                            row = df_processed.iloc[idx]
-                            base_subject = str(row.get('Subject', ''))
-                            assigned_slot_str = str(row.get('Time Slot', '')).strip()
-
-                            if is_business_school:
-                                # Only treat duration as "real" when it was actually
-                                # provided for this subject. If blank, fall back to the
-                                # assigned slot's own width (no artificial mismatch,
-                                # so no bracket gets shown for subjects with no
-                                # explicit Exam Duration in the input).
-                                _raw_duration = row.get('Exam Duration', None)
-                                duration_provided = pd.notna(_raw_duration) and str(_raw_duration).strip() not in ('', 'nan')
-                                if duration_provided:
-                                    try:
-                                        duration = float(_raw_duration)
-                                    except:
-                                        duration_provided = False
-                                        duration = None
-                                if not duration_provided:
-                                    duration = None
-                                    try:
-                                        if assigned_slot_str and " - " in assigned_slot_str:
-                                            _s, _e = assigned_slot_str.split(" - ")
-                                            _sd = datetime.strptime(_s.strip(), "%I:%M %p")
-                                            _ed = datetime.strptime(_e.strip(), "%I:%M %p")
-                                            duration = (_ed - _sd).total_seconds() / 3600.0
-                                    except:
-                                        pass
-                            else:
-                                duration = float(row.get('Exam Duration', 3.0))
-
-                            calculated_time_str = assigned_slot_str
-                            try:
-                                if assigned_slot_str and " - " in assigned_slot_str and duration is not None:
-                                    start_time_part = assigned_slot_str.split(" - ")[0].strip()
-                                    end_time_calc = calculate_end_time(start_time_part, duration)
-                                    calculated_time_str = f"{start_time_part} - {end_time_calc}"
-                            except: pass
-
-                            subj_time_norm = normalize_time(calculated_time_str)
-                            
-                            if subj_time_norm != primary_slot_norm and subj_time_norm != "":
-                                time_suffix = f" [{calculated_time_str}]" 
-                            else:
-                                time_suffix = ""
-                                
-                            subject_displays.append(base_subject + time_suffix)
-                       
-                        df_processed["SubjectDisplay"] = subject_displays
-                        df_processed["Exam Date"] = pd.to_datetime(df_processed["Exam Date"], format="%d-%m-%Y", dayfirst=True, errors='coerce')
-                        df_processed = df_processed.sort_values(by="Exam Date", ascending=True)
-                        
-                        grouped = df_processed.groupby(['Exam Date', 'SubBranch']).agg({
-                            'SubjectDisplay': lambda x: " <hr> ".join(dict.fromkeys(str(i) for i in x))
-                        }).reset_index()
-                        
-                        try:
-                            pivot_df = grouped.pivot_table(index="Exam Date", columns="SubBranch", values="SubjectDisplay", aggfunc='first').fillna("---")
-                            pivot_df = pivot_df.sort_index(ascending=True).reset_index()
-                            pivot_df['Exam Date'] = pivot_df['Exam Date'].apply(lambda x: x.strftime("%d-%m-%Y") if pd.notna(x) else "")
-                            
-                            pivot_df['Program'] = main_branch
-                            pivot_df['Semester'] = raw_sem_str
-                            
-                            pivot_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                            sheets_created += 1
-                        except: pass
-                    else:
-                        try:
-                            pd.DataFrame({'Exam Date': ['No exams'], 'Note': ['No core subjects']}).to_excel(writer, sheet_name=sheet_name, index=False)
-                            sheets_created += 1
-                        except: pass
-
-                    if not df_elec.empty:
-                        suffix_elec = f"_|_{raw_sem_str}_Ele"
-                        sheet_name_elec = get_safe_sheet_name(main_branch, suffix_elec)
-                        
-                        try:
-                            df_elec_scheduled = df_elec[df_elec['Exam Date'].notna() & (df_elec['Exam Date'] != "") & (df_elec['Exam Date'] != "Not Scheduled")].copy()
-                            
-                            if not df_elec_scheduled.empty:
-                                df_elec_scheduled['DisplaySubject'] = df_elec_scheduled['Subject']
-                                
-                                summary_df = df_elec_scheduled.groupby(['Exam Date', 'Time Slot', 'OE']).agg({
-                                    'DisplaySubject': lambda x: ", ".join(sorted(set(x)))
-                                }).reset_index()
-                                
-                                summary_df.rename(columns={'DisplaySubject': 'Open Elective (All Applicable Streams)', 'OE': 'OE Type'}, inplace=True)
-                                
-                                summary_df['DateObj'] = pd.to_datetime(summary_df['Exam Date'], format="%d-%m-%Y", errors='coerce')
-                                summary_df = summary_df.sort_values('DateObj').drop('DateObj', axis=1)
-                                
-                                if 'Time Slot' in summary_df.columns:
-                                    summary_df = summary_df.drop('Time Slot', axis=1)
-                                
-                                summary_df['Program'] = main_branch
-                                summary_df['Semester'] = raw_sem_str
-                                
-                                summary_df.to_excel(writer, sheet_name=sheet_name_elec, index=False)
-                                sheets_created += 1
-                        except Exception as e:
-                            pass
+                    sheet['frame'].to_excel(writer, sheet_name=sheet['sheet_name'], index=False)
+                    sheets_created += 1
+                except Exception:
+                    pass
 
             if sheets_created == 0:
                 pd.DataFrame({'Message': ['No data available']}).to_excel(writer, sheet_name="No_Data", index=False)
@@ -3612,13 +3089,7 @@ def save_to_excel(semester_wise_timetable):
 
 def find_next_valid_day_for_electives(start_day, holidays):
     """Find the next valid day for scheduling electives (skip weekends and holidays)"""
-    day = start_day
-    while True:
-        day_date = day.date()
-        if day.weekday() == 6 or day_date in holidays:
-            day += timedelta(days=1)
-            continue
-        return day
+    return get_first_valid_days(start_day, 1, holidays).days[0]
 
 def schedule_electives_globally(df_ele, max_non_elec_date, holidays_set):
     """
@@ -3629,283 +3100,291 @@ def schedule_electives_globally(df_ele, max_non_elec_date, holidays_set):
         return df_ele
     
     st.info("🎓 Scheduling electives (Targeting Reserved OE Days)...")
-    
-    # 1. Identify Unique OE Groups
-    unique_oes = df_ele['OE'].unique()
-    unique_oes = [oe for oe in unique_oes if pd.notna(oe) and str(oe).strip() != ""]
-    unique_oes.sort() # Ensure consistent order
-    
-    if not unique_oes:
-        return df_ele
-
-    # Determine Start Date for OE
-    # We prefer the date passed as 'max_non_elec_date' which should ideally be the start of the reserved block
-    # However, we calculate strictly next valid day to be safe.
-    
-    # In the main flow, we should pass the START of the reserved block as max_non_elec_date.
-    # Let's verify we find valid days from there.
-    
-    current_date = datetime.combine(max_non_elec_date, datetime.min.time())
-    # If max_non_elec_date was the last core exam, we start checking from next day
-    # But if the main function logic worked, max_non_elec_date IS the first reserved day.
-    # Let's assume current_date is the first candidate.
-    
-    scheduled_count = 0
-    
-    # Time slot settings (Default Electives to Morning/Slot 1)
-    time_slots_dict = st.session_state.get('time_slots', {
-        1: {"start": "10:00 AM", "end": "1:00 PM"}
-    })
-    slot_1 = time_slots_dict[1]['start'] + " - " + time_slots_dict[1]['end']
-
-    for oe_group in unique_oes:
-        # Find next valid day
-        while current_date.date() in holidays_set or current_date.weekday() == 6: # Skip Sundays/Holidays
-            current_date += timedelta(days=1)
-            
-        exam_day_str = current_date.strftime("%d-%m-%Y")
-        
-        # Apply schedule
-        mask = df_ele['OE'] == oe_group
-        df_ele.loc[mask, 'Exam Date'] = exam_day_str
-        df_ele.loc[mask, 'Time Slot'] = slot_1
-        df_ele.loc[mask, 'ExamSlotNumber'] = 1
-        
-        # Move to next day for next OE group
-        current_date += timedelta(days=1)
-        scheduled_count += 1
-        
-    st.success(f"✅ Scheduled {scheduled_count} OE groups.")
-    
+    time_slots_dict = st.session_state.get('time_slots') or college_time_slots(st.session_state.get('selected_college', ''))
+    df_ele, scheduled_count = schedule_oe_groups(df_ele, max_non_elec_date, holidays_set, time_slots_dict)
+    if scheduled_count:
+        st.success(f"✅ Scheduled {scheduled_count} OE groups.")
     return df_ele
 
-def optimize_schedule_by_filling_gaps(sem_dict, holidays, base_date, end_date):
+def show_gap_fill_notice(profile):
+    if profile['is_business_school']:
+        st.info("💼 Skipping backward gap-fill to maintain an even spread across the full date range for Business School.")
+    else:
+        st.info("🎯 Optimizing schedule by filling gaps (Capacity Aware & CM Group Safe)...")
+
+def optimize_schedule_by_filling_gaps(sem_dict, holidays, base_date, end_date, ledger=None):
     """
     Attempts to move exams from the end of the schedule to earlier 'gaps' (empty slots),
     STRICTLY respecting Campus Capacity Constraints (For Mumbai Only) and SKIPPING only CM Groups.
+
+    ledger (CapacityLedger), when given, must hold the loads of sem_dict and is
+    updated in place with every move (see timetable_pipeline.fill_schedule_gaps).
     """
-    st.info("🎯 Optimizing schedule by filling gaps (Capacity Aware & CM Group Safe)...")
-    
-    current_college = st.session_state.get('selected_college', '')
-    IS_LAW_SCHOOL = "Law" in current_college or "Law" in current_college
-    is_business_school = (
-        "School of Business Management" in current_college
-        or "Pravin Dalal" in current_college
-        or "School of Economics" in current_college
-        or "Sarla Anil Modi" in current_college
-        or "School of Liberal Arts" in current_college
-        or "Jyoti Dalal" in current_college
-        or "School of Branding and Advertising" in current_college
-        or "School of Science" in current_college
-        or "Sunandan Divatia" in current_college
-        or "School of Commerce" in current_college
-        or "Anil Surendra Modi" in current_college
-        or "Diploma in Textile Technology" in current_college
-    )
-    
-    # SBM requested an even spread across the entire date range.
-    # Gap-filling moves exams backwards to compress the schedule, which completely undoes the even spread.
-    if is_business_school:
-        st.info("💼 Skipping backward gap-fill to maintain an even spread across the full date range for Business School.")
+    profile = get_college_profile(st.session_state.get('selected_college', ''))
+    show_gap_fill_notice(profile)
+    if ledger is None:
+        ledger = CapacityLedger.from_frame(sem_dict, st.session_state.get('capacity_slider', 1250))
+    return fill_schedule_gaps(sem_dict, holidays, ledger, profile)
+
+
+def optimize_oe_subjects_after_scheduling(sem_dict, holidays, ledger=None):
+    """
+    Optimizes OE subject placement ensuring NO CAMPUS CAPACITY OVERLOAD.
+
+    OE groups are only moved in local-search mode: each group moves as a block
+    between the days and slots already used for OE, with every other exam held
+    in place. Otherwise the main scheduler's placement is kept as it is.
+    ledger (CapacityLedger), when given, is updated for the moved rows.
+    """
+    mode, time_limit = selected_placement_mode()
+    if mode != "search":
         return sem_dict, 0, []
-        
-    moves_made = 0
-    optimization_log = []
-    
-    # Get capacity limit from session state
-    MAX_CAPACITY = st.session_state.get('capacity_slider', 1250)
-    
-    # Pre-calculate campus loads for all currently scheduled slots
-    schedule_load_map = {}
-    
-    def refresh_load_map():
-        schedule_load_map.clear()
-        for s, df in sem_dict.items():
-            scheduled = df[
-                (df['Exam Date'].notna()) & 
-                (df['Exam Date'] != "") & 
-                (df['Exam Date'] != "Not Scheduled")
-            ]
-            for _, row in scheduled.iterrows():
-                d = str(row['Exam Date']).strip()
-                t = str(row['Time Slot']).strip()
-                c = str(row.get('Campus', 'Unknown')).strip().upper()
-                cnt = int(row.get('StudentCount', 0))
-                
-                if d not in schedule_load_map: schedule_load_map[d] = {}
-                if t not in schedule_load_map[d]: schedule_load_map[d][t] = {}
-                
-                schedule_load_map[d][t][c] = schedule_load_map[d][t].get(c, 0) + cnt
 
-    # Initial build
-    refresh_load_map()
+    profile = get_college_profile(st.session_state.get('selected_college', ''))
+    return improve_oe_placement(sem_dict, st.session_state.get('time_slots', profile['default_time_slots']),
+                                st.session_state.get('capacity_slider', 1250), profile,
+                                enforce_cap=st.session_state.get('applied_capacity_mode') != "YES",
+                                time_budget=min(OE_SEARCH_BUDGET, time_limit), ledger=ledger)
 
-    # Iterate through semesters to find gaps
-    for sem, df in sem_dict.items():
-        scheduled_dates = pd.to_datetime(df[df['Exam Date'].notna()]['Exam Date'], format="%d-%m-%Y", errors='coerce').dropna()
-        if scheduled_dates.empty:
-            continue
-            
-        sem_start = min(scheduled_dates)
-        
-        # Ensure CMGroup column handles nans/empty strings correctly for boolean indexing
-        cm_col = df['CMGroup'].fillna("").astype(str).str.strip().replace(["0", "0.0", "nan"], "")
-        
-        candidates = df[
-            (df['Exam Date'].notna()) & 
-            (df['Category'] != 'INTD') & 
-            (df['OE'].isna() | (df['OE'] == "")) &
-            (cm_col == "") & # Only move subjects that do NOT have a CM Group
-            (pd.to_datetime(df['Exam Date'], format="%d-%m-%Y") > sem_start)
-        ].sort_values('Exam Date', ascending=False)
-        
-        for idx, subject in candidates.iterrows():
-            current_date_str = subject['Exam Date']
-            current_date_obj = datetime.strptime(current_date_str, "%d-%m-%Y")
 
-            # ── 2-credit detection (Difficulty == 0) ─────────────────────────
-            # 2-credit subjects bypass the alternate-day rule during gap-filling too.
-            diff_val = subject.get('Difficulty', -1)
-            try:
-                is_two_credit = (float(diff_val) == 0.0)
-            except (TypeError, ValueError):
-                is_two_credit = False
-            
-            # Try to find an earlier gap
-            check_date = sem_start
-            while check_date < current_date_obj:
-                check_date_str = check_date.strftime("%d-%m-%Y")
-                
-                # SKIP if check_date is a holiday OR SUNDAY
-                if check_date.date() in holidays or check_date.weekday() == 6:
-                    check_date += timedelta(days=1)
-                    continue
+# ═══════════════════════════════════════════════════════════════════════════════
+# MULTI-SCHOOL BATCH MODE
+# ═══════════════════════════════════════════════════════════════════════════════
 
-                # Check student conflict (Same Branch Same Day)
-                sub_branch = subject['SubBranch']
-                busy_on_date = df[
-                    (df['Exam Date'] == check_date_str) & 
-                    (df['SubBranch'] == sub_branch)
-                ]
-                
-                conflict_found = not busy_on_date.empty
-                
-                # --- LAW SCHOOL ALTERNATE DAY CHECK FOR GAP FILLING ---
-                # Skipped entirely for 2-credit subjects (Difficulty == 0).
-                if not conflict_found and IS_LAW_SCHOOL and not is_two_credit:
-                    prev_date_str = (check_date - timedelta(days=1)).strftime("%d-%m-%Y")
-                    next_date_str = (check_date + timedelta(days=1)).strftime("%d-%m-%Y")
-                    
-                    busy_prev = not df[(df['Exam Date'] == prev_date_str) & (df['SubBranch'] == sub_branch)].empty
-                    busy_next = not df[(df['Exam Date'] == next_date_str) & (df['SubBranch'] == sub_branch)].empty
-                    
-                    if busy_prev or busy_next:
-                        conflict_found = True
-                
-                if not conflict_found:
-                    # Check CAPACITY Constraints per Campus (ONLY FOR MUMBAI)
-                    target_time_slot = subject['Time Slot']
-                    campus = str(subject.get('Campus', 'Unknown')).strip().upper()
-                    student_count = int(subject.get('StudentCount', 0))
-                    
-                    current_load = schedule_load_map.get(check_date_str, {}).get(target_time_slot, {}).get(campus, 0)
-                    
-                    if "MUMBAI" not in campus or (current_load + student_count) <= MAX_CAPACITY:
-                        # VALID MOVE!
-                        # 1. Update DataFrame
-                        sem_dict[sem].at[idx, 'Exam Date'] = check_date_str
-                        
-                        # 2. Update Load Map
-                        old_load = schedule_load_map[current_date_str][target_time_slot][campus]
-                        schedule_load_map[current_date_str][target_time_slot][campus] = old_load - student_count
-                        
-                        if check_date_str not in schedule_load_map: schedule_load_map[check_date_str] = {}
-                        if target_time_slot not in schedule_load_map[check_date_str]: schedule_load_map[check_date_str][target_time_slot] = {}
-                        schedule_load_map[check_date_str][target_time_slot][campus] = current_load + student_count
-                        
-                        moves_made += 1
-                        optimization_log.append(f"Moved {subject['Subject']} from {current_date_str} to {check_date_str}")
-                        break
-                
-                check_date += timedelta(days=1)
+BATCH_MODE = "__batch__"
 
-    return sem_dict, moves_made, optimization_log
 
+def college_time_slots(college_name):
+    """Time slots the sidebar starts from for a college; a fresh dict the user may edit."""
+    return copy.deepcopy(get_college_profile(college_name)['default_time_slots'])
 
-def optimize_oe_subjects_after_scheduling(sem_dict, holidays):
+
+def run_batch_schedule(uploads, colleges, holidays_set, base_date, end_date, max_capacity, allow_overload):
     """
-    Optimizes OE subject placement ensuring NO CAMPUS CAPACITY OVERLOAD.
+    Schedule several schools against one shared Mumbai capacity ledger.
+
+    Workbooks are parsed in parallel (timetable_batch.prepare_schools); the
+    schools are then run through timetable_pipeline.generate_timetable one
+    after another in upload order, each with the seats already taken by the
+    schools before it as base_ledger and the time slots the sidebar would
+    start from for that school.
+
+    Returns:
+        tuple: (list of per-school result dicts, shared CapacityLedger)
     """
-    moves_made = 0
-    log = []
-    
-    # Get capacity limit
-    MAX_CAPACITY = st.session_state.get('capacity_slider', 1250)
-    
-    # 1. Collect all OE subjects from all semesters
-    all_oes = []
-    for sem, df in sem_dict.items():
-        oes = df[df['OE'].notna() & (df['OE'] != "")].copy()
-        if not oes.empty:
-            oes['OriginSem'] = sem
-            all_oes.append(oes)
-    
-    if not all_oes:
-        return sem_dict, 0, []
-        
-    combined_oes = pd.concat(all_oes)
-    
-    # 2. Build Load Map (Global view of current schedule)
-    schedule_load_map = {}
-    for s, df in sem_dict.items():
-        scheduled = df[
-            (df['Exam Date'].notna()) & 
-            (df['Exam Date'] != "") & 
-            (df['Exam Date'] != "Not Scheduled")
-        ]
-        for _, row in scheduled.iterrows():
-            d = str(row['Exam Date']).strip()
-            t = str(row['Time Slot']).strip()
-            c = str(row.get('Campus', 'Unknown')).strip().upper()
-            cnt = int(row.get('StudentCount', 0))
-            
-            if d not in schedule_load_map: schedule_load_map[d] = {}
-            if t not in schedule_load_map[d]: schedule_load_map[d][t] = {}
-            schedule_load_map[d][t][c] = schedule_load_map[d][t].get(c, 0) + cnt
-
-    # 3. Group by OE Type (e.g., "OE-1") to move them as a block
-    for oe_type, group in combined_oes.groupby('OE'):
-        # Check current placement
-        current_dates = group['Exam Date'].unique()
-        if len(current_dates) != 1: continue # Skip if split across days (complex case)
-        
-        current_date_str = current_dates[0]
-        current_slot = group['Time Slot'].iloc[0]
-        
-        # Calculate total students per campus for this OE Group
-        # We need to ensure the NEW slot can handle these
-        campus_requirements = group.groupby('Campus')['StudentCount'].sum().to_dict()
-        
-        # Try to find a better slot (e.g., earlier?)
-        # For OEs, usually "Optimization" means ensuring they don't clash or are compacted.
-        # If they are already scheduled validly, we might just validate capacity here 
-        # or leave them be. 
-        # Assuming this function is meant to compress schedule:
-        
-        # (Simplified: Just ensure existing placement respects capacity. 
-        # If we wanted to move them, we'd replicate the logic from fill_gaps.
-        # Given the prompt, let's just return current dict as the Main Scheduler
-        # usually places OEs at the end safely. Moving them earlier is risky 
-        # for student conflicts. We will just return to avoid breaking things).
-        
-        pass 
+    schools = [(f.name, college, f.getvalue()) for f, college in zip(uploads, colleges)]
+    with st.spinner(f"⏳ Reading {len(schools)} workbooks in parallel..."):
+        prepared = prepare_schools(schools)
+    mode, time_limit = selected_placement_mode()
+    _, _, mode_note = selected_placement_pass()
+    if mode_note:
+        st.info(mode_note)
+
+    ledger = CapacityLedger(max_capacity)
+    results = []
+    saved_state = {k: st.session_state.get(k)
+                   for k in ('selected_college', 'time_slots', 'timetable_data', 'pdf_data', 'is_zip_download')}
+    try:
+        for school in prepared:
+            result = {'name': school['name'], 'college': school['college'], 'error': school['error'],
+                      'timetable': {}, 'unscheduled': 0, 'mode': None,
+                      'excel_data': None, 'pdf_data': None, 'is_zip': False, 'verification_data': None}
+            results.append(result)
+            if school['error']:
+                continue
+
+            with st.expander(f"📄 {school['name']} — {school['college']}"):
+                profile = school['profile']
+                time_slots = college_time_slots(school['college'])
+                generated = generate_timetable(
+                    school['df_non'], school['df_ele'], holidays_set, base_date, end_date, time_slots,
+                    max_capacity, profile, mode=mode, time_limit=time_limit, allow_overload=allow_overload,
+                    base_ledger=ledger, units=school['units']
+                )
+                result['unscheduled'], result['mode'] = len(generated['unscheduled']), generated['capacity_mode']
+                if generated['unscheduled']:
+                    st.warning(f"⚠️ {len(generated['unscheduled'])} subject groups could not be placed within the shared capacity.")
+                if generated['oe_groups']:
+                    st.success(f"✅ Scheduled {generated['oe_groups']} OE groups.")
+
+                sem_dict = generated['sem_dict']
+                if not sem_dict:
+                    st.warning("No subjects could be scheduled within the specified date range.")
+                    continue
+                show_gap_fill_notice(profile)
+                if generated['oe_moves'] > 0:
+                    st.info(f"📈 OE Optimizations: {generated['oe_moves']}")
+                if generated['gap_moves'] > 0:
+                    st.info(f"📉 Gap Fill Optimizations: {generated['gap_moves']}")
+
+                # Every school after this one fits around its seats
+                ledger.add_ledger(generated['ledger'])
+                result['timetable'] = sem_dict
+
+                # The output writers read the college, time slots and timetable
+                # from session state; they are restored after the batch.
+                st.session_state['selected_college'] = school['college']
+                st.session_state['time_slots'] = time_slots
+                st.session_state['timetable_data'] = sem_dict
+                sheets = build_timetable_sheets(sem_dict)
+                excel_data = save_to_excel(sem_dict, sheets=sheets)
+                result['excel_data'] = excel_data.getvalue() if excel_data else None
+                verification_data = save_verification_excel(school['original_df'], sem_dict)
+                result['verification_data'] = verification_data.getvalue() if verification_data else None
+                st.session_state.pdf_data = None
+                generate_pdf_timetable(sem_dict, "temp_timetable.pdf", sheets=sheets)
+                result['pdf_data'] = st.session_state.get('pdf_data')
+                result['is_zip'] = st.session_state.get('is_zip_download', False)
+    finally:
+        for key, value in saved_state.items():
+            if value is None:
+                st.session_state.pop(key, None)
+            else:
+                st.session_state[key] = value
+
+    return results, ledger
 
-    # Since OE optimization is complex and risky with capacity constraints 
-    # (moving a massive OE block can easily trigger overload), 
-    # we effectively disable the *moves* but keep the function signature.
-    # The Main Scheduler's placement is usually safest for OEs.
-    
-    return sem_dict, 0, []
+
+def batch_outputs_zip(results):
+    """All per-school outputs in one ZIP, one folder per school."""
+    import zipfile
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for result in results:
+            folder = os.path.splitext(result['name'])[0]
+            if result['excel_data']:
+                zf.writestr(f"{folder}/timetable.xlsx", result['excel_data'])
+            if result['verification_data']:
+                zf.writestr(f"{folder}/verification.xlsx", result['verification_data'])
+            if result['pdf_data']:
+                zf.writestr(f"{folder}/timetable.{'zip' if result['is_zip'] else 'pdf'}", result['pdf_data'])
+    return buffer.getvalue()
+
+
+def show_batch_mode():
+    """Multi-school page: several workbooks, one shared Mumbai capacity."""
+    with st.sidebar:
+        if st.button("🔙 Change School", use_container_width=True):
+            for key in list(st.session_state.keys()):
+                del st.session_state[key]
+            st.session_state.selected_college = None
+            st.rerun()
+
+        st.markdown("---")
+        st.markdown("### ⚙️ Configuration")
+        col1, col2 = st.columns(2)
+        with col1:
+            base_date = datetime.combine(st.date_input("📆 Start Date", value=datetime.today()), datetime.min.time())
+        with col2:
+            end_date = datetime.combine(st.date_input("📆 End Date", value=datetime.today() + timedelta(days=10)),
+                                        datetime.min.time())
+        if end_date <= base_date:
+            st.error("⚠️ End date must be after start date!")
+            end_date = base_date + timedelta(days=30)
+            st.warning(f"⚠️ Auto-corrected end date to: {end_date.strftime('%Y-%m-%d')}")
+
+        holidays_text = st.text_area("🗓️ Holidays (dd-mm-yyyy, one per line)", value="")
+        holidays_set = set()
+        for line in holidays_text.splitlines():
+            if line.strip():
+                try:
+                    holidays_set.add(datetime.strptime(line.strip(), "%d-%m-%Y").date())
+                except ValueError:
+                    st.warning(f"⚠️ Ignoring holiday '{line.strip()}' (expected dd-mm-yyyy)")
+
+        max_capacity = st.number_input("🏫 Mumbai seats per session (all schools together)",
+                                       min_value=1, value=1250, step=50)
+        allow_overload = st.checkbox("Exceed capacity when strict scheduling leaves subjects out", value=False)
+
+        st.markdown("---")
+        show_scheduling_engine_controls()
+
+    st.markdown("""
+    <div class="main-header">
+        <h1>📚 Multi-School Batch</h1>
+        <p>Several schools, one shared Mumbai campus capacity</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    st.markdown("Schools are scheduled in upload order; each one fits around the Mumbai seats already "
+                "taken by the schools above it.")
+    uploads = st.file_uploader("Upload one input workbook per school", type=['xlsx', 'xls'],
+                               accept_multiple_files=True)
+    if not uploads:
+        return
+
+    college_names = [c['name'] for c in COLLEGES]
+    colleges = []
+    for i, upload in enumerate(uploads):
+        colleges.append(st.selectbox(f"🏫 School for **{upload.name}**", college_names, key=f"batch_college_{i}"))
+
+    if st.button("🔄 Generate All Timetables", type="primary", use_container_width=True):
+        try:
+            results, ledger = run_batch_schedule(uploads, colleges, holidays_set, base_date, end_date,
+                                                 max_capacity, allow_overload)
+            st.session_state.batch_results = results
+            st.session_state.batch_capacity = capacity_by_school(
+                {r['name']: r['timetable'] for r in results}, max_capacity)
+            st.session_state.batch_violations = ledger.violations()
+        except Exception as e:
+            st.error(f"❌ Batch scheduling failed: {get_friendly_error_message(e)}")
+            with st.expander("Show Technical Error (For Developers)"):
+                import traceback
+                st.code(traceback.format_exc())
+
+    results = st.session_state.get('batch_results')
+    if not results:
+        return
+
+    st.markdown("---")
+    st.markdown("### 📊 Batch Summary")
+    mode_labels = {"NATURAL_FIT": "✅ Fits", "NO": "🔒 Strict", "YES": "⚠️ Over capacity", None: "—"}
+    summary = pd.DataFrame([{
+        'School': r['college'],
+        'File': r['name'],
+        'Exams': sum(len(df) for df in r['timetable'].values()),
+        'Unscheduled Groups': r['unscheduled'],
+        'Capacity': mode_labels[r['mode']],
+        'Status': f"❌ {r['error']}" if r['error'] else "✅",
+    } for r in results])
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+
+    violations = st.session_state.get('batch_violations') or []
+    if violations:
+        st.error(f"⚠️ {len(violations)} shared Mumbai session(s) exceed capacity across schools")
+    else:
+        st.success("✅ Every shared Mumbai session is within capacity")
+
+    shared = st.session_state.get('batch_capacity')
+    if shared is not None and not shared.empty:
+        with st.expander(f"🏫 Shared Mumbai Sessions ({int((shared['Schools'] > 1).sum())} used by more than one school)"):
+            st.dataframe(shared, use_container_width=True, hide_index=True)
+
+    st.markdown("### 📥 Downloads")
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    st.download_button("📦 All Outputs (ZIP)", data=batch_outputs_zip(results), file_name=f"Batch_{stamp}.zip",
+                       mime="application/zip", use_container_width=True, key="batch_zip")
+    for i, r in enumerate(results):
+        if r['error'] or not r['timetable']:
+            continue
+        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+        col1.markdown(f"**{r['name']}**")
+        with col2:
+            if r['excel_data']:
+                st.download_button("📊 Excel", data=r['excel_data'], file_name=f"timetable_{i + 1}_{stamp}.xlsx",
+                                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                   use_container_width=True, key=f"batch_excel_{i}")
+        with col3:
+            if r['pdf_data']:
+                ext, mime = ("zip", "application/zip") if r['is_zip'] else ("pdf", "application/pdf")
+                st.download_button("📄 PDF", data=r['pdf_data'], file_name=f"timetable_{i + 1}_{stamp}.{ext}",
+                                   mime=mime, use_container_width=True, key=f"batch_pdf_{i}")
+        with col4:
+            if r['verification_data']:
+                st.download_button("📋 Verify", data=r['verification_data'],
+                                   file_name=f"verification_{i + 1}_{stamp}.xlsx",
+                                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                   use_container_width=True, key=f"batch_verify_{i}")
 
 
 def main():
@@ -3913,6 +3392,9 @@ def main():
     if st.session_state.selected_college is None:
         show_college_selector()
         return
+    if st.session_state.selected_college == BATCH_MODE:
+        show_batch_mode()
+        return
     
     # -----------------------------------------------------------
     # 1. DETECT COLLEGE CONTEXT
@@ -3952,7 +3434,9 @@ def main():
         'unique_exam_days': 0,
         'capacity_slider': 1250 if IS_MPSTME else (449 if IS_LAW_SCHOOL else 2000), # Default capacity switching
         'holidays_set': set(),
-        'original_df': None
+        'original_df': None,
+        'capacity_ledger': None,
+        'capacity_report': None
     }
 
     # Initialize any missing session state variables
@@ -3993,6 +3477,12 @@ def main():
             end_date = base_date + timedelta(days=30)
             st.warning(f"⚠️ Auto-corrected end date to: {end_date.strftime('%Y-%m-%d')}")
 
+        auto_end_date = st.checkbox(
+            "🔎 Auto End Date", key="auto_end_date",
+            help="Treat the end date as the latest allowed day and finish on the earliest date that fits every "
+                 "subject within capacity."
+        )
+
         # Declaration Date Selector
         st.markdown("")
         declaration_date = st.date_input(
@@ -4080,23 +3570,7 @@ def main():
 
         # Initialize session state for time slots with College Specific Defaults
         if 'time_slots' not in st.session_state:
-            if IS_LAW_SCHOOL:
-                st.session_state.time_slots = {
-                    1: {"start": "11:00 AM", "end": "01:00 PM"},
-                    2: {"start": "02:30 PM", "end": "04:30 PM"}
-                }
-            elif is_business_school:
-                # NEW STRICT PRIORITY SLOTS FOR SBM & PDSE
-                st.session_state.time_slots = {
-                    1: {"start": "11:30 AM", "end": "01:30 PM"},
-                    2: {"start": "03:00 PM", "end": "05:00 PM"},
-                    3: {"start": "08:30 AM", "end": "10:30 AM"}
-                }
-            else:
-                st.session_state.time_slots = {
-                    1: {"start": "10:00 AM", "end": "01:00 PM"},
-                    2: {"start": "02:00 PM", "end": "05:00 PM"}
-                }
+            st.session_state.time_slots = college_time_slots(current_college)
     
         # Number of time slots
         num_slots = st.number_input(
@@ -4111,7 +3585,7 @@ def main():
         # Adjust time slots dictionary if number changed
         if num_slots > len(st.session_state.time_slots):
             for i in range(len(st.session_state.time_slots) + 1, num_slots + 1):
-                st.session_state.time_slots[i] = {"start": "10:00 AM", "end": "1:00 PM"}
+                st.session_state.time_slots[i] = dict(DEFAULT_TIME_SLOTS[1])
         elif num_slots < len(st.session_state.time_slots):
             keys_to_remove = [k for k in st.session_state.time_slots.keys() if k > num_slots]
             for k in keys_to_remove:
@@ -4178,6 +3652,9 @@ def main():
 
         st.session_state['capacity_slider'] = st.session_state.capacity_val
         st.info(f"📊 **Current Capacity:** {st.session_state.capacity_slider} students per session")
+
+        st.markdown("---")
+        show_scheduling_engine_controls()
         
     
         st.markdown("---")
@@ -4319,10 +3796,16 @@ def main():
             st.success("✅ **Active Scheduling Mode:** All subjects fit naturally within capacity limits")
         # -------------------------------------------------------------
 
+        with st.expander("🧪 What-If Sweep (end date × capacity × slots)"):
+            show_what_if_sweep(uploaded_file, base_date, end_date, st.session_state.get('holidays_set', set()))
+
         if generate_btn or resume_processing:
             with st.spinner("⏳ Processing your timetable... Please wait..."):
                 try:
                     holidays_set = st.session_state.get('holidays_set', set())
+
+                    if auto_end_date:
+                        end_date = find_auto_end_date(uploaded_file, holidays_set, base_date, end_date)
                     
                     date_range_days = (end_date - base_date).days + 1
                     valid_exam_days = len(get_valid_dates_in_range(base_date, end_date, holidays_set))
@@ -4337,10 +3820,10 @@ def main():
                         
                         sem_dict_temp = {}
                         for s in sorted(df_scheduled["Semester"].unique()):
-                            sem_data = df_scheduled[df_scheduled["Semester"] == s].copy()
+                            sem_data = df_scheduled[df_scheduled["Semester"] == s]
                             sem_dict_temp[s] = sem_data    
 
-                        is_valid, violations = validate_capacity_constraints(
+                        is_valid, violations, _ = validate_capacity_constraints(
                             sem_dict_temp, 
                             max_capacity=st.session_state.capacity_slider
                         )
@@ -4356,37 +3839,19 @@ def main():
                                     f"{v['subjects_count']} subjects)"
                                 )
 
-                        if df_ele is not None and not df_ele.empty:
-                            all_valid = get_valid_dates_in_range(base_date, end_date, holidays_set)
-                            
-                            all_valid_objs = []
-                            for d_str in all_valid:
-                                try:
-                                    all_valid_objs.append(datetime.strptime(d_str, "%d-%m-%Y").date())
-                                except:
-                                    pass
-                            all_valid_objs.sort()
-
-                            if len(all_valid_objs) >= 2:
-                                oe_start_date = all_valid_objs[-2]
-                            elif len(all_valid_objs) == 1:
-                                oe_start_date = all_valid_objs[0]
-                            else:
-                                oe_start_date = end_date.date()
-                            
-                            df_ele_scheduled = schedule_electives_globally(df_ele, oe_start_date, holidays_set)
-                            all_scheduled_subjects = pd.concat([df_scheduled, df_ele_scheduled], ignore_index=True)
-                        else:
-                            all_scheduled_subjects = df_scheduled
-                        
-                        successfully_scheduled = all_scheduled_subjects[
-                            (all_scheduled_subjects['Exam Date'] != "") & 
-                            (all_scheduled_subjects['Exam Date'] != "Out of Range")
-                        ].copy()
+                        profile = get_college_profile(st.session_state.get('selected_college', ''))
+                        mode, time_limit = selected_placement_mode()
+                        result = generate_timetable(
+                            df_non_elec, df_ele, holidays_set, base_date, end_date,
+                            st.session_state.get('time_slots', profile['default_time_slots']),
+                            st.session_state.capacity_slider, profile, mode=mode, time_limit=time_limit,
+                            scheduled=df_scheduled, capacity_mode=st.session_state.get('applied_capacity_mode')
+                        )
+                        if result['oe_groups']:
+                            st.info("🎓 Scheduling electives (Targeting Reserved OE Days)...")
+                            st.success(f"✅ Scheduled {result['oe_groups']} OE groups.")
                         
-                        out_of_range_subjects = all_scheduled_subjects[
-                            all_scheduled_subjects['Exam Date'] == "Out of Range"
-                        ]
+                        out_of_range_subjects = result['out_of_range']
                         
                         if not out_of_range_subjects.empty:
                             st.warning(f"⚠️ {len(out_of_range_subjects)} subjects could not be scheduled within the specified date range")
@@ -4396,33 +3861,22 @@ def main():
                                     for branch in sorted(sem_subjects['Branch'].unique()):
                                         branch_subjects = sem_subjects[sem_subjects['Branch'] == branch]
                         
-                        if not successfully_scheduled.empty:
-                            successfully_scheduled = successfully_scheduled.sort_values(["Semester", "Exam Date"], ascending=True)
-                            
-                            sem_dict = {}
-                            for s in sorted(successfully_scheduled["Semester"].unique()):
-                                sem_data = successfully_scheduled[successfully_scheduled["Semester"] == s].copy()
-                                sem_dict[s] = sem_data
-                            
-                            sem_dict, gap_moves_made, gap_optimization_log = optimize_schedule_by_filling_gaps(
-                                sem_dict, holidays_set, base_date, end_date
-                            )
-
-                            if df_ele is not None and not df_ele.empty:
-                                sem_dict, oe_moves_made, oe_optimization_log = optimize_oe_subjects_after_scheduling(sem_dict, holidays_set)        
-                            else:
-                                oe_moves_made = 0
-                                oe_optimization_log = []
+                        if result['sem_dict']:
+                            sem_dict, capacity_ledger = result['sem_dict'], result['ledger']
+                            show_gap_fill_notice(profile)
+                            gap_moves_made, oe_moves_made = result['gap_moves'], result['oe_moves']
 
-                            total_optimizations = (oe_moves_made if df_ele is not None and not df_ele.empty else 0) + gap_moves_made
+                            total_optimizations = oe_moves_made + gap_moves_made
                             if total_optimizations > 0:
                                 st.success(f"🎯 Total Optimizations Made: {total_optimizations}")
-                            if df_ele is not None and not df_ele.empty and oe_moves_made > 0:
+                            if oe_moves_made > 0:
                                 st.info(f"📈 OE Optimizations: {oe_moves_made}")
                             if gap_moves_made > 0:
                                 st.info(f"📉 Gap Fill Optimizations: {gap_moves_made}")
 
                             st.session_state.timetable_data = sem_dict
+                            st.session_state.capacity_ledger = capacity_ledger
+                            st.session_state.capacity_report = result['report']
                             st.session_state.original_df = original_df
                             st.session_state.processing_complete = True
 
@@ -4441,8 +3895,11 @@ def main():
                             st.session_state.overall_date_range = overall_date_range
                             st.session_state.unique_exam_days = unique_exam_days
 
+                            # One set of program x semester pivots feeds both the Excel and the PDF
+                            timetable_sheets = None
                             try:
-                                excel_data = save_to_excel(sem_dict)
+                                timetable_sheets = build_timetable_sheets(sem_dict)
+                                excel_data = save_to_excel(sem_dict, sheets=timetable_sheets)
                                 if excel_data:
                                     st.session_state.excel_data = excel_data.getvalue()
                                     st.success("✅ Excel file generated successfully")
@@ -4468,7 +3925,8 @@ def main():
                             try:
                                 if sem_dict:
                                     # The updated generate_pdf_timetable handles ZIPs and Session State natively in-memory!
-                                    generate_pdf_timetable(sem_dict, "temp_timetable.pdf", declaration_date=declaration_date)
+                                    generate_pdf_timetable(sem_dict, "temp_timetable.pdf", declaration_date=declaration_date,
+                                                           sheets=timetable_sheets)
                                     
                                     # Verify if the function successfully populated the session state
                                     if not st.session_state.get('pdf_data'):
@@ -4502,7 +3960,7 @@ def main():
                                     (final_all_data['CommonAcrossSems'] == False) & 
                                     (final_all_data['Category'].isin(['COMP', 'ELEC']))
                                 ]
-                                common_within_sem_groups = common_within_sem.groupby(['Semester', 'ModuleCode'])['Branch'].nunique()
+                                common_within_sem_groups = common_within_sem.groupby(['Semester', 'ModuleCode'], observed=True)['Branch'].nunique()
                                 common_within_count = len(common_within_sem[
                                     common_within_sem.set_index(['Semester', 'ModuleCode']).index.map(
                                         lambda x: common_within_sem_groups.get(x, 1) > 1
@@ -4615,6 +4073,8 @@ def main():
                 st.session_state.excel_data = None
                 st.session_state.pdf_data = None
                 st.session_state.verification_data = None
+                st.session_state.capacity_ledger = None
+                st.session_state.capacity_report = None
                 st.session_state.total_exams = 0
                 st.session_state.total_semesters = 0
                 st.session_state.total_branches = 0
@@ -4700,7 +4160,7 @@ def main():
                 show_span_breakdown(final_stats_df, st.session_state.get('holidays_set', set()))
 
         if st.session_state.timetable_data:
-            final_all_data_calc = pd.concat(st.session_state.timetable_data.values(), ignore_index=True)
+            final_all_data_calc = final_stats_df
             
             non_elective_data = final_all_data_calc[~(final_all_data_calc['OE'].notna() & (final_all_data_calc['OE'].str.strip() != ""))]
             ne_count = len(non_elective_data)
@@ -4807,6 +4267,18 @@ def main():
         else:
             st.warning(f"🔍 **Slot Utilization:** {slot_utilization:.1f}% (Room for improvement)")
 
+        # Per-session headroom from the report kept at generation time, so a
+        # rerun does not regroup the whole timetable
+        capacity_report = st.session_state.get('capacity_report')
+        if capacity_report is not None and capacity_report['Capped'].any():
+            capped_sessions = capacity_report[capacity_report['Capped']]
+            tightest = capped_sessions['Headroom'].min()
+            with st.expander(f"🏫 Mumbai Session Capacity (tightest headroom: {int(tightest)} seats)"):
+                st.dataframe(
+                    capped_sessions.drop(columns=['Capped']).astype({'Students': int, 'Headroom': int}),
+                    hide_index=True, use_container_width=True
+                )
+
         st.markdown("---")
         st.markdown("""
         <div class="results-section">
@@ -4821,10 +4293,7 @@ def main():
             is_common = row.get('CommonAcrossSems', False)
             exam_slot_number = row.get('ExamSlotNumber', 1)
 
-            time_slots_dict = st.session_state.get('time_slots', {
-                1: {"start": "10:00 AM", "end": "1:00 PM"},
-                2: {"start": "2:00 PM", "end": "5:00 PM"}
-            })
+            time_slots_dict = st.session_state.get('time_slots') or college_time_slots(st.session_state.get('selected_college', ''))
     
             preferred_slot = get_time_slot_from_number(exam_slot_number, time_slots_dict)
 
@@ -4862,11 +4331,11 @@ def main():
 
             for main_branch in df_sem["MainBranch"].unique():
                 main_branch_full = BRANCH_FULL_FORM.get(main_branch, main_branch)
-                df_mb = df_sem[df_sem["MainBranch"] == main_branch].copy()
+                df_mb = df_sem[df_sem["MainBranch"] == main_branch]
 
                 if not df_mb.empty:
-                    df_non_elec = df_mb[df_mb['OE'].isna() | (df_mb['OE'].str.strip() == "")].copy()
-                    df_elec = df_mb[df_mb['OE'].notna() & (df_mb['OE'].str.strip() != "")].copy()
+                    df_non_elec = df_mb[df_mb['OE'].isna() | (df_mb['OE'].str.strip() == "")]
+                    df_elec = df_mb[df_mb['OE'].notna() & (df_mb['OE'].str.strip() != "")]
 
                     if not df_non_elec.empty:
                         st.markdown(f"#### {main_branch_full} - Core Subjects")
@@ -4877,7 +4346,7 @@ def main():
                             df_non_elec = df_non_elec.sort_values(by="Exam Date", ascending=True)
                             
                             display_data = []
-                            for date, group in df_non_elec.groupby('Exam Date'):
+                            for date, group in df_non_elec.groupby('Exam Date', observed=True):
                                 date_str = date.strftime("%d-%m-%Y") if pd.notna(date) else "Unknown Date"
                                 row_data = {'Exam Date': date_str}
                                 
@@ -4909,7 +4378,7 @@ def main():
                             df_elec = df_elec.sort_values(by="Exam Date", ascending=True)
                             
                             elec_display_data = []
-                            for (oe_type, date), group in df_elec.groupby(['OE', 'Exam Date']):
+                            for (oe_type, date), group in df_elec.groupby(['OE', 'Exam Date'], observed=True):
                                 date_str = date.strftime("%d-%m-%Y") if pd.notna(date) else "Unknown Date"
                                 subjects = ", ".join(group['SubjectDisplay'].tolist())
                                 elec_display_data.append({
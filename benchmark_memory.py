@@ -0,0 +1,73 @@
+"""
+Memory Benchmark
+================
+Peak resident memory of one timetable generation, measured outside Streamlit.
+
+• Every generation runs in a fresh spawned process, so the peak RSS reported
+  for it is not inflated by earlier runs in the same interpreter.
+• A generation is one timetable_cli.generate() run, the same chain main()
+  runs on "Generate": read_timetable, core scheduling, Open Electives, gap
+  filling, then the Excel, verification and PDF outputs.
+• The "import" column is the RSS after the app modules are loaded and before
+  the workbook is read; "peak" minus "import" is what one session costs.
+
+Usage:
+    python benchmark_memory.py "Final Exam Input Data.xlsx" --college "School of Law" \\
+        --start 03-11-2025 --end 28-11-2025 --capacity 1250 --runs 3
+"""
+
+import argparse
+import importlib
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import warnings
+
+
+def _rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _generate(config):
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)  # Streamlit's bare-mode notices
+    importlib.import_module("app")  # imported before the baseline reading so it is not counted
+    from timetable_cli import generate
+
+    import_rss = _rss_mb()
+    summary = generate(config)
+    if summary['error']:
+        raise SystemExit(f"Generation failed: {summary['error']}")
+    return import_rss, _rss_mb(), summary['seconds']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure peak RSS of timetable generations")
+    parser.add_argument("workbook", help="Input workbook (.xlsx)")
+    parser.add_argument("--college", required=True, help="School name as shown in the app")
+    parser.add_argument("--start", required=True, help="First exam day, dd-mm-yyyy")
+    parser.add_argument("--end", required=True, help="Last exam day, dd-mm-yyyy")
+    parser.add_argument("--capacity", type=int, default=1250, help="Mumbai students per session")
+    parser.add_argument("--runs", type=int, default=3, help="Generations to measure")
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context("spawn")
+
+    print(f"{'run':>3} {'import MB':>10} {'peak MB':>10} {'session MB':>11} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as out_dir:
+        for run in range(1, args.runs + 1):
+            config = {'name': f"run{run}", 'workbook': os.path.abspath(args.workbook), 'college': args.college,
+                      'start': args.start, 'end': args.end, 'capacity': args.capacity, 'overload': True,
+                      'out_dir': out_dir}
+            with context.Pool(1) as pool:
+                import_rss, peak_rss, seconds = pool.apply(_generate, (config,))
+            print(f"{run:>3} {import_rss:>10.1f} {peak_rss:>10.1f} {peak_rss - import_rss:>11.1f} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
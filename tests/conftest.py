@@ -0,0 +1,86 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timetable_engine import DEFAULT_TIME_SLOTS, get_college_profile  # noqa: E402
+from timetable_io import parse_input  # noqa: E402
+
+MPSTME = "Mukesh Patel School of Technology Management & Engineering / School of Technology Management & Engineering"
+
+TEMPLATE_COLUMNS = ["School  Name", "Campus Name", "Program", "Stream", "Current Academic Year", "Current Session",
+                    "Module Abbreviation", "Module Description", "CM Group", "Common across sems",
+                    "Difficulty Score", "Is Common", "Category", "OE", "Exam mode", "Exam Duration",
+                    "Exam Slot Number", "Student count"]
+
+
+def workbook(rows):
+    """Input workbook bytes in the Template File layout, one row per dict of overrides."""
+    base = {"School  Name": "Mukesh Patel Schl of Tech Mgt & Engg-Mum", "Campus Name": "MUMBAI",
+            "Current Academic Year": 2025, "CM Group": 0, "Common across sems": 0, "Is Common": "No",
+            "Category": "COMP", "Exam mode": "WRIT", "Exam Duration": 3, "Exam Slot Number": 1}
+    frame = pd.DataFrame([dict(base, **row) for row in rows], columns=TEMPLATE_COLUMNS)
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def sample_rows(programs=3, streams=2, subjects=4, students=120):
+    """A few cohorts (program, stream, semester) with their own subjects each."""
+    rows = []
+    for p in range(programs):
+        for s in range(streams):
+            for sem, sem_name in enumerate(("Sem I", "Sem III")):
+                for k in range(subjects):
+                    rows.append({"Program": f"B TECH {p}", "Stream": f"Stream {s}", "Current Session": sem_name,
+                                 "Module Abbreviation": f"M{p}{s}{sem}{k}",
+                                 "Module Description": f"Subject {p}-{s}-{sem}-{k}",
+                                 "Student count": students + 10 * k})
+    return rows
+
+
+@pytest.fixture
+def sample_input():
+    """(df_non, df_ele, df) as read_timetable returns them for sample_rows()."""
+    return parse_input(io.BytesIO(workbook(sample_rows())))
+
+
+@pytest.fixture
+def profile():
+    return get_college_profile(MPSTME)
+
+
+@pytest.fixture
+def time_slots():
+    return DEFAULT_TIME_SLOTS
+
+
+@pytest.fixture
+def pass_setup(sample_input, profile, time_slots):
+    """Arguments of a placement pass (execute_pass, solve_pass, search_pass) over sample_rows() in 8 days."""
+    from datetime import datetime
+
+    from timetable_engine import build_scheduling_units, get_core_exam_dates
+
+    df = sample_input[0]
+    core_valid_dates, _ = get_core_exam_dates(df, datetime(2025, 11, 3), datetime(2025, 11, 11), set())
+    return df, build_scheduling_units(df, profile), core_valid_dates, time_slots
+
+
+@pytest.fixture
+def quality():
+    """placement_summary() of a pass result, as the passes themselves measure it."""
+    from timetable_engine import Calendar, base_session_load, placement_summary, unit_placements
+
+    def summarize(result, units, core_valid_dates, time_slots, max_capacity, base_ledger=None):
+        all_units = units['priority'] + units['normal'] + units['individual']
+        date_strs = Calendar(core_valid_dates).strs
+        base_load = base_session_load(base_ledger, date_strs, units['campuses'])
+        return placement_summary(all_units, unit_placements(result[0], all_units, date_strs), time_slots,
+                                 max_capacity, base_load=base_load)
+
+    return summarize
@@ -0,0 +1,51 @@
+from datetime import date, datetime
+
+from timetable_engine import Calendar, get_calendar, get_first_valid_days, get_valid_dates_in_range
+
+# 01-11-2025 is a Saturday; 02-11 and 09-11 are Sundays
+HOLIDAYS = {date(2025, 11, 5), date(2025, 11, 8)}
+
+
+def test_valid_days_skip_sundays_and_holidays():
+    assert get_valid_dates_in_range(datetime(2025, 11, 1), datetime(2025, 11, 11), HOLIDAYS) == [
+        "01-11-2025", "03-11-2025", "04-11-2025", "06-11-2025", "07-11-2025", "10-11-2025", "11-11-2025"]
+
+
+def test_first_valid_days_from_a_sunday():
+    days = get_first_valid_days(datetime(2025, 11, 2), 4, HOLIDAYS)
+    assert days.strs == ["03-11-2025", "04-11-2025", "06-11-2025", "07-11-2025"]
+
+
+def test_first_valid_days_span_long_holiday_runs():
+    holidays = {date(2025, 11, d) for d in range(3, 29)}
+    days = get_first_valid_days(date(2025, 11, 1), 3, holidays)
+    assert days.strs == ["01-11-2025", "29-11-2025", "01-12-2025"]
+
+
+def test_adjacency_breaks_at_holidays_and_sundays():
+    calendar = Calendar.for_range(date(2025, 11, 1), date(2025, 11, 11), HOLIDAYS)
+    day = calendar.index
+
+    assert calendar.prev_adjacent[day["03-11-2025"]] is None          # Sunday before
+    assert calendar.next_adjacent[day["03-11-2025"]] == day["04-11-2025"]
+    assert calendar.next_adjacent[day["04-11-2025"]] is None          # holiday after
+    assert calendar.next_adjacent[day["07-11-2025"]] is None
+    assert calendar.prev_adjacent[day["11-11-2025"]] == day["10-11-2025"]
+
+
+def test_nearest_valid_day_lookups():
+    calendar = Calendar.for_range(date(2025, 11, 1), date(2025, 11, 11), HOLIDAYS)
+    day = calendar.index
+
+    assert calendar.first_on_or_after(date(2025, 11, 5)) == day["06-11-2025"]
+    assert calendar.first_on_or_after(date(2025, 11, 8)) == day["10-11-2025"]
+    assert calendar.first_on_or_after(date(2025, 10, 20)) == 0
+    assert calendar.first_on_or_after(date(2025, 11, 12)) is None
+    assert calendar.last_on_or_before(date(2025, 11, 9)) == day["07-11-2025"]
+    assert calendar.last_on_or_before(date(2025, 10, 31)) is None
+
+
+def test_calendars_are_shared_per_range():
+    first = get_calendar(datetime(2025, 11, 1), datetime(2025, 11, 30), HOLIDAYS)
+    assert get_calendar(date(2025, 11, 1), date(2025, 11, 30), set(HOLIDAYS)) is first
+    assert get_calendar(date(2025, 11, 1), date(2025, 11, 30), set()) is not first
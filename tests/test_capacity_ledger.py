@@ -0,0 +1,111 @@
+import pandas as pd
+
+from timetable_engine import CapacityLedger
+
+SLOT = "10:00 AM - 1:00 PM"
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=['Exam Date', 'Time Slot', 'Campus', 'StudentCount'])
+
+
+def test_fits_only_limits_mumbai():
+    ledger = CapacityLedger(100)
+    ledger.add("03-11-2025", SLOT, "MUMBAI", 80)
+    ledger.add("03-11-2025", SLOT, "INDORE", 500)
+
+    assert ledger.fits("03-11-2025", SLOT, "MUMBAI", 20)
+    assert not ledger.fits("03-11-2025", SLOT, "MUMBAI", 21)
+    assert ledger.fits("03-11-2025", SLOT, "INDORE", 1000)
+    assert ledger.fits("04-11-2025", SLOT, "MUMBAI", 100)  # unseen session
+
+
+def test_move_shifts_students_and_exams():
+    ledger = CapacityLedger(100)
+    ledger.add("03-11-2025", SLOT, "MUMBAI", 60)
+    ledger.move("MUMBAI", 60, "03-11-2025", SLOT, "04-11-2025", SLOT)
+
+    assert ledger.load("03-11-2025", SLOT, "MUMBAI") == 0
+    assert ledger.load("04-11-2025", SLOT, "MUMBAI") == 60
+    report = ledger.to_frame()
+    assert list(report['Exam Date']) == ["04-11-2025"]
+    assert list(report['Exams']) == [1]
+
+
+def test_from_frame_skips_unscheduled_rows():
+    ledger = CapacityLedger.from_frame(frame([
+        ("03-11-2025", SLOT, "Mumbai ", 40),
+        ("03-11-2025", SLOT, "MUMBAI", 70),
+        ("", SLOT, "MUMBAI", 500),
+        ("Out of Range", SLOT, "MUMBAI", 500),
+    ]), 100)
+
+    assert ledger.load("03-11-2025", SLOT, "MUMBAI") == 110
+    assert ledger.campuses == ["MUMBAI"]
+
+
+def test_violations_report_mumbai_excess_only():
+    ledger = CapacityLedger.from_frame(frame([
+        ("03-11-2025", SLOT, "MUMBAI", 90),
+        ("03-11-2025", SLOT, "MUMBAI", 30),
+        ("03-11-2025", SLOT, "INDORE", 900),
+        ("04-11-2025", SLOT, "MUMBAI", 100),
+    ]), 100)
+
+    assert ledger.violations() == [{'date': "03-11-2025", 'time_slot': SLOT, 'campus': "MUMBAI",
+                                    'student_count': 120, 'subjects_count': 2, 'excess': 20}]
+    assert ledger.violations(max_capacity=150) == []
+
+
+def test_add_frame_with_negative_sign_undoes_it():
+    rows = frame([("03-11-2025", SLOT, "MUMBAI", 90), ("04-11-2025", SLOT, "MUMBAI", 30)])
+    ledger = CapacityLedger.from_frame(rows, 100)
+    ledger.add_frame(rows, sign=-1)
+
+    assert ledger.to_frame().empty
+
+
+def test_report_headroom_per_session():
+    ledger = CapacityLedger.from_frame(frame([
+        ("04-11-2025", SLOT, "MUMBAI", 130),
+        ("03-11-2025", "2:00 PM - 5:00 PM", "MUMBAI", 40),
+        ("03-11-2025", SLOT, "INDORE", 70),
+        ("03-11-2025", SLOT, "MUMBAI", 60),
+    ]), 100)
+    report = ledger.to_frame()
+
+    assert list(zip(report['Exam Date'], report['Time Slot'], report['Campus'])) == [
+        ("03-11-2025", "10:00 AM - 1:00 PM", "INDORE"),
+        ("03-11-2025", "10:00 AM - 1:00 PM", "MUMBAI"),
+        ("03-11-2025", "2:00 PM - 5:00 PM", "MUMBAI"),
+        ("04-11-2025", "10:00 AM - 1:00 PM", "MUMBAI"),
+    ]
+    assert list(report['Capped']) == [False, True, True, True]
+    assert pd.isna(report['Headroom'].iloc[0])
+    assert list(report['Headroom'].iloc[1:]) == [40, 60, -30]
+    assert list(ledger.to_frame(200)['Headroom'].iloc[1:]) == [140, 160, 70]
+
+
+def test_overlapping_sessions_share_seats():
+    law, business, afternoon = "11:00 AM - 01:00 PM", "11:30 AM - 01:30 PM", "01:00 PM - 03:00 PM"
+    ledger = CapacityLedger(100)
+    ledger.add("03-11-2025", SLOT, "MUMBAI", 60)
+
+    assert ledger.load("03-11-2025", law, "MUMBAI") == 60  # slot not in the ledger yet
+    assert not ledger.fits("03-11-2025", law, "MUMBAI", 41)
+    assert ledger.fits("03-11-2025", afternoon, "MUMBAI", 100)  # touches, does not overlap
+
+    ledger.add("03-11-2025", business, "MUMBAI", 50)
+    report = ledger.to_frame()
+    assert list(report['Students']) == [110, 110]
+    assert list(report['Exams']) == [1, 1]
+    assert [v['time_slot'] for v in ledger.violations()] == [SLOT, business]
+
+
+def test_overloaded_counts_overlapping_sessions():
+    ledger = CapacityLedger(100, dates=["03-11-2025"], time_slots=[SLOT, "11:00 AM - 01:00 PM"],
+                            campuses=["MUMBAI", "INDORE"])
+    ledger.add_unit("03-11-2025", SLOT, [0, 1], [70, 500])
+
+    assert ledger.overloaded("03-11-2025", "11:00 AM - 01:00 PM", [0], [31])
+    assert not ledger.overloaded("03-11-2025", "11:00 AM - 01:00 PM", [0], [30])
@@ -0,0 +1,88 @@
+from datetime import date
+
+import pandas as pd
+
+from timetable_engine import CapacityLedger, get_college_profile
+from timetable_pipeline import fill_schedule_gaps
+
+SLOT = "10:00 AM - 1:00 PM"
+HOLIDAYS = {date(2025, 11, 5)}
+
+
+def semester(rows):
+    frame = pd.DataFrame(rows, columns=['Subject', 'SubBranch', 'Exam Date', 'StudentCount', 'CMGroup'])
+    return frame.assign(**{'Time Slot': SLOT, 'Campus': "MUMBAI", 'Category': "COMP", 'OE': None,
+                           'Difficulty': None})
+
+
+def fill(sem_dict, capacity=1000, college="Mukesh Patel School of Technology Management & Engineering"):
+    ledger = CapacityLedger.from_frame(sem_dict, capacity)
+    sem_dict, moves, _ = fill_schedule_gaps(sem_dict, HOLIDAYS, ledger, get_college_profile(college))
+    return sem_dict, moves, ledger
+
+
+def test_moves_into_earliest_free_valid_day():
+    # 03-11 Mon, 04-11 Tue, 05-11 holiday, 06-11 Thu, 09-11 Sunday, 10-11 Mon
+    sem_dict, moves, ledger = fill({1: semester([
+        ("A", "CE", "03-11-2025", 50, ""),
+        ("B", "CE", "10-11-2025", 50, ""),
+        ("C", "ME", "03-11-2025", 50, ""),
+        ("D", "ME", "04-11-2025", 50, ""),
+        ("E", "ME", "10-11-2025", 50, ""),
+    ])})
+
+    dates = dict(zip(sem_dict[1]['Subject'], sem_dict[1]['Exam Date']))
+    assert moves == 2
+    assert dates == {"A": "03-11-2025", "B": "04-11-2025", "C": "03-11-2025", "D": "04-11-2025",
+                     "E": "06-11-2025"}
+    assert ledger.load("10-11-2025", SLOT, "MUMBAI") == 0
+    assert ledger.load("04-11-2025", SLOT, "MUMBAI") == 100
+
+
+def test_respects_capacity_and_cm_groups():
+    sem_dict, moves, _ = fill({1: semester([
+        ("A", "CE", "03-11-2025", 80, ""),
+        ("B", "ME", "04-11-2025", 60, ""),
+        ("C", "CE", "06-11-2025", 50, ""),   # 04-11 would hold 110 > 100
+        ("D", "EE", "06-11-2025", 10, "CM1"),
+    ])}, capacity=100)
+
+    dates = dict(zip(sem_dict[1]['Subject'], sem_dict[1]['Exam Date']))
+    assert moves == 0
+    assert dates["C"] == "06-11-2025" and dates["D"] == "06-11-2025"
+
+
+def test_law_school_keeps_a_day_between_exams():
+    sem_dict, moves, _ = fill({1: semester([
+        ("A", "LLB", "03-11-2025", 50, ""),
+        ("B", "LLB", "10-11-2025", 50, ""),
+    ])}, college="Kirit P. Mehta School of Law/School of Law")
+
+    # 04-11 is next to 03-11, 06-11 is the first valid day with no exam beside it
+    assert moves == 1
+    assert list(sem_dict[1]['Exam Date']) == ["03-11-2025", "06-11-2025"]
+
+
+def test_business_schools_are_left_alone():
+    sem_dict, moves, _ = fill({1: semester([
+        ("A", "MBA", "03-11-2025", 50, ""),
+        ("B", "MBA", "10-11-2025", 50, ""),
+    ])}, college="School of Business Management")
+
+    assert moves == 0
+    assert list(sem_dict[1]['Exam Date']) == ["03-11-2025", "10-11-2025"]
+
+
+def test_fractional_counts_move_out_of_the_ledger_whole():
+    sem_dict, moves, ledger = fill({1: semester([
+        ("A", "CE", "03-11-2025", 40, ""),
+        ("B", "ME", "04-11-2025", 59.6, ""),
+        ("C", "CE", "06-11-2025", 40.5, ""),  # 04-11 would hold 100.1 > 100
+        ("D", "EE", "06-11-2025", 12.5, ""),
+    ])}, capacity=100)
+
+    dates = dict(zip(sem_dict[1]['Subject'], sem_dict[1]['Exam Date']))
+    assert moves == 1
+    assert dates["C"] == "06-11-2025" and dates["D"] == "03-11-2025"
+    assert ledger.load("06-11-2025", SLOT, "MUMBAI") == 40.5
+    assert ledger.load("03-11-2025", SLOT, "MUMBAI") == 52.5
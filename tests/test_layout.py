@@ -0,0 +1,59 @@
+import pytest
+from fpdf import FPDF
+
+from timetable_layout import TIME_PATTERN, WrapCache, string_width, wrap_text
+
+TEXTS = ["", "Mathematics-I", "ELEMENTS OF BIOLOGY (701BS0C028)", "[10:00 AM - 1:00 PM]", "Zoë's café — 50%"]
+
+
+@pytest.mark.parametrize("family", ["times", "helvetica", "courier"])
+@pytest.mark.parametrize("style", ["", "B", "I", "BI"])
+@pytest.mark.parametrize("size", [7, 10, 16])
+def test_string_width_matches_fpdf(family, style, size):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font(family, style, size)
+    for text in TEXTS:
+        text = text.encode("latin-1", "replace").decode("latin-1")
+        assert string_width(text, pdf.font_family, pdf.font_style, pdf.font_size) == pytest.approx(
+            pdf.get_string_width(text))
+
+
+def test_wrap_cache_evicts_least_recently_used():
+    cache = WrapCache(max_entries=2)
+    cache.put("a", ["a"])
+    cache.put("b", ["b"])
+    assert cache.get("a") == ["a"]
+    cache.put("c", ["c"])
+
+    assert cache.get("b") is None
+    assert cache.get("c") == ["c"]
+    assert cache.stats() == {'entries': 2, 'max_entries': 2, 'hits': 2, 'misses': 1}
+
+
+def test_wrapped_lines_fit_and_keep_times_whole():
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("times", "", 9)
+    text = "Engineering Mathematics III [10:00 AM - 1:00 PM] <hr> Data Structures and Algorithms [2:00 PM - 5:00 PM]"
+    lines = wrap_text(pdf, text, 40)
+
+    assert "<hr>" in lines
+    assert "[10:00 AM - 1:00 PM]" in " ".join(lines) and "[2:00 PM - 5:00 PM]" in " ".join(lines)
+    for line in lines:
+        if line == "<hr>" or " " not in line:
+            continue
+        width = sum(string_width(part, "times", "B" if TIME_PATTERN.match(part) else "", pdf.font_size)
+                    for part in TIME_PATTERN.split(line) if part)
+        assert width <= 40
+
+
+def test_wrap_is_cached_per_font_size():
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("times", "", 9)
+    small = wrap_text(pdf, "Advanced Engineering Mathematics", 30)
+    pdf.set_font("times", "", 16)
+    large = wrap_text(pdf, "Advanced Engineering Mathematics", 30)
+
+    assert len(large) > len(small)
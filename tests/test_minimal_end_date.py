@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+from timetable_engine import get_valid_dates_in_range
+from timetable_pipeline import schedule_core
+from timetable_sweep import find_minimal_end_date
+
+START, LATEST = datetime(2025, 11, 3), datetime(2025, 11, 18)
+
+
+def unscheduled_by(df, profile, time_slots, end_str, capacity):
+    end = datetime.strptime(end_str, "%d-%m-%Y")
+    _, unscheduled, _ = schedule_core(df, set(), START, end, time_slots, capacity, profile)
+    return len(unscheduled)
+
+
+@pytest.mark.parametrize("capacity", [2000, 600, 300])
+def test_matches_a_linear_scan(sample_input, profile, time_slots, capacity):
+    df = sample_input[0]
+    end, probes = find_minimal_end_date(df, profile, set(), START, LATEST, time_slots, capacity)
+    fits = [unscheduled_by(df, profile, time_slots, d, capacity) == 0
+            for d in get_valid_dates_in_range(START, LATEST, set())]
+
+    # Feasibility only improves with more days, and the search finds the first feasible one
+    assert fits == sorted(fits)
+    assert end == datetime.strptime(get_valid_dates_in_range(START, LATEST, set())[fits.index(True)], "%d-%m-%Y")
+    assert len(probes) < len(fits)
+
+
+def test_more_capacity_never_ends_later(sample_input, profile, time_slots):
+    ends = [find_minimal_end_date(sample_input[0], profile, set(), START, LATEST, time_slots, capacity)[0]
+            for capacity in (300, 450, 600, 2000)]
+    assert ends == sorted(ends, reverse=True)
+
+
+def test_reuses_probes_from_the_memo(sample_input, profile, time_slots):
+    memo = {}
+    first, _ = find_minimal_end_date(sample_input[0], profile, set(), START, LATEST, time_slots, 600, memo=memo)
+    runs = dict(memo)
+    again, probes = find_minimal_end_date(sample_input[0], profile, set(), START, LATEST, time_slots, 600, memo=memo)
+
+    assert again == first
+    assert memo == runs
+    assert all(memo[end_str] == count for end_str, count in probes)
+
+
+def test_none_when_even_the_latest_day_does_not_fit(sample_input, profile, time_slots):
+    end, probes = find_minimal_end_date(sample_input[0], profile, set(), START, datetime(2025, 11, 6), time_slots,
+                                        300)
+    assert end is None
+    assert probes == [("06-11-2025", 32)]
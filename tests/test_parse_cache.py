@@ -0,0 +1,67 @@
+import io
+import threading
+
+import pandas as pd
+
+from timetable_io import ParseCache
+
+
+def frames(n):
+    return pd.DataFrame({'Subject': [f"S{n}"], 'StudentCount': [n]}), None, pd.DataFrame({'n': [n]})
+
+
+def test_key_depends_on_bytes_and_context():
+    assert ParseCache.key(io.BytesIO(b"abc"), "Law") == ParseCache.key(io.BytesIO(b"abc"), "Law")
+    assert ParseCache.key(io.BytesIO(b"abc"), "Law") != ParseCache.key(io.BytesIO(b"abd"), "Law")
+    assert ParseCache.key(io.BytesIO(b"abc"), "Law") != ParseCache.key(io.BytesIO(b"abc"), "SBM")
+
+
+def test_hit_and_miss_counts():
+    cache = ParseCache()
+    assert cache.get("a") is None
+    cache.put("a", frames(1))
+    hit = cache.get("a")
+
+    assert hit[0]['Subject'].tolist() == ["S1"] and hit[1] is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used():
+    cache = ParseCache(max_entries=2)
+    cache.put("a", frames(1))
+    cache.put("b", frames(2))
+    cache.get("a")
+    cache.put("c", frames(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a")[0]['StudentCount'].tolist() == [1]
+    assert cache.get("c")[0]['StudentCount'].tolist() == [3]
+
+
+def test_edits_to_a_handout_do_not_reach_the_entry():
+    cache = ParseCache()
+    mine = cache.put("a", frames(1))[0]
+    mine.loc[0, 'StudentCount'] = 99
+    mine['Extra'] = 1
+    theirs = cache.get("a")[0]
+    theirs['StudentCount'] = theirs['StudentCount'] + 1
+
+    assert cache.get("a")[0].equals(frames(1)[0])
+
+
+def test_concurrent_puts_keep_the_bound():
+    cache = ParseCache(max_entries=4)
+
+    def fill(offset):
+        for n in range(200):
+            cache.put(f"{offset}-{n}", frames(n))
+            cache.get(f"{offset}-{n - 1}")
+
+    threads = [threading.Thread(target=fill, args=(t,)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(cache._entries) == 4
+    assert cache.hits + cache.misses == 800
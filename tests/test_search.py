@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from timetable_engine import CapacityLedger, Calendar, execute_pass, no_worse_than, unit_placements
+from timetable_search import movable_slots, run_local_search, search_pass
+
+
+@pytest.mark.parametrize("enforce_cap", [True, False])
+@pytest.mark.parametrize("capacity", [0, 300, 600])
+def test_never_worse_than_greedy(pass_setup, profile, quality, enforce_cap, capacity):
+    df, units, dates, slots = pass_setup
+    args = (df, units, dates, slots, capacity, profile, enforce_cap)
+    greedy = quality(execute_pass(*args), units, dates, slots, capacity)
+    searched = search_pass(*args, time_budget=0.3)
+
+    assert no_worse_than(quality(searched, units, dates, slots, capacity), greedy)
+    assert searched[0].attrs['local_search']['kept_greedy'] in (True, False)
+
+
+def test_counts_seats_held_by_other_schools(pass_setup, profile, quality):
+    df, units, dates, slots = pass_setup
+    held = CapacityLedger(600)
+    for date_str in ("03-11-2025", "04-11-2025", "06-11-2025"):
+        for slot in slots.values():
+            held.add(date_str, f"{slot['start']} - {slot['end']}", "MUMBAI", 500)
+    args = (df, units, dates, slots, 600, profile, True)
+    greedy = quality(execute_pass(*args, base_ledger=held), units, dates, slots, 600, base_ledger=held)
+    searched = quality(search_pass(*args, base_ledger=held, time_budget=0.3), units, dates, slots, 600,
+                       base_ledger=held)
+
+    assert no_worse_than(searched, greedy)
+    assert searched['overload'] == 0
+
+
+def test_fixed_slot_units_stay_where_greedy_could_put_them(pass_setup, profile):
+    df, units, dates, slots = pass_setup
+    all_units = units['priority'] + units['normal'] + units['individual']
+    date_strs = Calendar(dates).strs
+    args = (df, units, dates, slots, 600, profile, False)
+    greedy = unit_placements(execute_pass(*args)[0], all_units, date_strs)
+    searched = unit_placements(search_pass(*args, time_budget=0.3)[0], all_units, date_strs)
+
+    for unit, before, after in zip(all_units, greedy, searched):
+        if after is not None:
+            assert after[1] in movable_slots(unit, sorted(slots), before and before[1])
+
+
+def test_movable_slots():
+    assert movable_slots({'fixed_slot': 0}, [1, 2, 3]) == [1, 2, 3]
+    assert movable_slots({'fixed_slot': 4}, [1, 2, 3]) == [1, 2, 3]
+    assert movable_slots({'fixed_slot': 2}, [1, 2, 3]) == [2]
+    assert movable_slots({'fixed_slot': 2}, [1, 2, 3], placed_slot=3) == [2, 3]
+
+
+@pytest.mark.parametrize("is_business, span_cost", [(True, 0.0), (False, 4.0)])
+def test_span_is_free_for_business_schools(profile, time_slots, is_business, span_cost):
+    unit = {'type': 'INDIVIDUAL', 'branch_sems': ["B_1"], 'capped_idx': np.array([0]),
+            'capped_demand': np.array([10.0])}
+    days = [datetime(2025, 11, d) for d in (3, 4, 6, 7)]
+    weights = {'span': 1.0, 'headroom': 0.0, 'back_to_back': 0.0, 'slot_balance': 0.0}
+    _, stats = run_local_search([unit], [(3, 1)], days, time_slots, 100, dict(profile, is_business_school=is_business),
+                                True, time_budget=0, weights=weights)
+
+    assert stats['initial_cost'] == span_cost
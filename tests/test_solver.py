@@ -0,0 +1,65 @@
+import pytest
+
+from timetable_engine import (
+    BUSINESS_SCHOOL_TIME_SLOTS, CapacityLedger, build_scheduling_units, execute_pass, get_college_profile,
+    no_worse_than, quality_keys
+)
+
+pytest.importorskip("ortools")
+from timetable_solver import solve_pass  # noqa: E402
+
+
+@pytest.mark.parametrize("enforce_cap", [True, False])
+@pytest.mark.parametrize("capacity", [300, 600])
+def test_never_worse_than_greedy(pass_setup, profile, quality, enforce_cap, capacity):
+    df, units, dates, slots = pass_setup
+    args = (df, units, dates, slots, capacity, profile, enforce_cap)
+    greedy = quality(execute_pass(*args), units, dates, slots, capacity)
+    solved = solve_pass(*args, time_limit=2, num_workers=1)
+
+    assert no_worse_than(quality(solved, units, dates, slots, capacity), greedy)
+    assert solved[0].attrs['solver']['status']
+
+
+def test_counts_seats_held_by_other_schools(pass_setup, profile, quality):
+    df, units, dates, slots = pass_setup
+    held = CapacityLedger(600)
+    for date_str in ("03-11-2025", "04-11-2025", "06-11-2025"):
+        for slot in slots.values():
+            held.add(date_str, f"{slot['start']} - {slot['end']}", "MUMBAI", 500)
+    args = (df, units, dates, slots, 600, profile, True)
+    greedy = quality(execute_pass(*args, base_ledger=held), units, dates, slots, 600, base_ledger=held)
+    solved = quality(solve_pass(*args, base_ledger=held, time_limit=2, num_workers=1), units, dates, slots, 600,
+                     base_ledger=held)
+
+    assert no_worse_than(solved, greedy)
+    assert solved['overload'] == 0
+
+
+def test_keeps_greedy_when_the_solver_runs_out_of_time(pass_setup, profile):
+    df, units, dates, slots = pass_setup
+    args = (df, units, dates, slots, 300, profile, True)
+    greedy_df, greedy_unscheduled = execute_pass(*args)
+    solved_df, solved_unscheduled = solve_pass(*args, time_limit=0.001, num_workers=1)
+
+    info = solved_df.attrs['solver']
+    assert info['objective'] is not None or info['fallback'] == "greedy"
+    if info['fallback']:
+        assert solved_df[['Exam Date', 'Time Slot']].equals(greedy_df[['Exam Date', 'Time Slot']])
+        assert len(solved_unscheduled) == len(greedy_unscheduled)
+
+
+def test_business_schools_are_not_compressed(pass_setup, quality):
+    df, _, dates, _ = pass_setup
+    profile = get_college_profile("School of Business Management")
+    slots = BUSINESS_SCHOOL_TIME_SLOTS
+    units = build_scheduling_units(df, profile)
+    args = (df, units, dates, slots, 600, profile, True)
+    greedy = quality(execute_pass(*args), units, dates, slots, 600)
+    solved = solve_pass(*args, time_limit=2, num_workers=1)
+
+    # With everything placed and no overload there is nothing left to minimise
+    assert greedy['unscheduled'] == 0
+    assert solved[0].attrs['solver']['objective'] == 0
+    assert solved[0].attrs['solver']['fallback'] is None
+    assert no_worse_than(quality(solved, units, dates, slots, 600), greedy, quality_keys(profile))
@@ -0,0 +1,118 @@
+"""
+Multi-School Batch Scheduling
+=============================
+Schedules several schools' workbooks against one shared campus capacity
+ledger, so schools that sit exams in the same Mumbai sessions see each
+other's students instead of each assuming the whole hall is theirs.
+
+• Pre-processing (parsing the workbook and building the scheduling units) is
+  independent per school and runs in a process pool. Nothing here touches
+  Streamlit, so the workers do not import the app.
+• Scheduling is sequential: schools are placed in the order given, each one
+  by timetable_pipeline.generate_timetable() with the shared ledger as its
+  base_ledger, so it fits around the seats the earlier schools already hold.
+  The caller adds every finished timetable to the shared ledger before
+  moving to the next school.
+• Seats are shared between sessions that overlap in time, so a school sitting
+  "11:00 AM - 01:00 PM" competes with one sitting "10:00 AM - 01:00 PM" (see
+  CapacityLedger).
+"""
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from timetable_engine import CapacityLedger, build_scheduling_units, get_college_profile
+from timetable_io import parse_input
+
+
+def prepare_school(name, college, data):
+    """
+    Parse one school's workbook and build its scheduling units.
+
+    Args:
+        name (str): Label for the school's results (usually the file name)
+        college (str): School/college name as listed in the app's selector
+        data (bytes): Workbook contents
+
+    Returns:
+        dict: name, college, profile, df_non, df_ele, original_df, units and
+              error (None, or why the workbook could not be read)
+    """
+    school = {'name': name, 'college': college, 'profile': get_college_profile(college),
+              'df_non': None, 'df_ele': None, 'original_df': None, 'units': None, 'error': None}
+    try:
+        df_non, df_ele, df = parse_input(io.BytesIO(data))
+    except Exception as e:
+        school['error'] = str(e)
+        return school
+
+    school.update(df_non=df_non, df_ele=df_ele, original_df=df,
+                  units=build_scheduling_units(df_non, school['profile']))
+    return school
+
+
+def prepare_schools(schools, max_workers=None):
+    """
+    Run prepare_school for every school, in parallel when there are several.
+
+    Args:
+        schools (list): (name, college, workbook bytes) tuples
+        max_workers (int): Worker processes; one per school up to the CPU
+                           count when not given
+
+    Returns:
+        list: prepare_school results, in the order of schools
+    """
+    workers = max_workers or min(len(schools), os.cpu_count() or 1)
+    if len(schools) <= 1 or workers <= 1:
+        return [prepare_school(*school) for school in schools]
+
+    # Spawned rather than forked: the Streamlit server runs threads, which a
+    # forked child would inherit in an undefined state.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(prepare_school, *zip(*schools)))
+
+
+def capacity_by_school(timetables, max_capacity):
+    """
+    Students each school seats during every Mumbai session of the batch.
+
+    A school's column counts its students in every session overlapping the
+    row's, so schools on different slot grids add up in the sessions they
+    share.
+
+    Args:
+        timetables (dict): School name -> semester-wise timetable dict
+        max_capacity (int): Mumbai student limit per date/slot
+
+    Returns:
+        DataFrame: Exam Date, Time Slot, Campus, one column per school, then
+                   Schools (how many share the session), Students and
+                   Headroom; in date order, tightest sessions first per day
+    """
+    keys = ['Exam Date', 'Time Slot', 'Campus']
+    ledgers = {name: CapacityLedger.from_frame(sem_dict, max_capacity)
+               for name, sem_dict in timetables.items() if sem_dict}
+    sessions = pd.concat([ledger.to_frame()[keys + ['Capped']] for ledger in ledgers.values()] or
+                         [pd.DataFrame(columns=keys + ['Capped'])], ignore_index=True)
+    sessions = sessions[sessions['Capped'].astype(bool)].drop(columns='Capped').drop_duplicates()
+    if sessions.empty:
+        return pd.DataFrame(columns=keys + ['Schools', 'Students', 'Headroom'])
+
+    table = sessions.reset_index(drop=True)
+    schools = list(ledgers)
+    rows = list(zip(table['Exam Date'], table['Time Slot'], table['Campus']))
+    for name, ledger in ledgers.items():
+        table[name] = [ledger.load(*row) for row in rows]
+    table['Schools'] = (table[schools] > 0).sum(axis=1)
+    table['Students'] = table[schools].sum(axis=1)
+    table['Headroom'] = max_capacity - table['Students']
+
+    day = pd.to_datetime(table['Exam Date'], format="%d-%m-%Y", errors='coerce')
+    return table.assign(_day=day).sort_values(['_day', 'Headroom', 'Time Slot', 'Campus']).drop(
+        columns='_day').reset_index(drop=True)
@@ -0,0 +1,278 @@
+"""
+Command-Line Timetable Generation
+=================================
+Runs the final-exam pipeline without the Streamlit UI and writes every output
+to a directory.
+
+• One configuration is one "Generate" click: the workbook is parsed and
+  scheduled by timetable_pipeline.generate_timetable, the same steps the app
+  runs, then the Excel, verification and PDF files are written, plus
+  capacity.csv (the per-session Mumbai headroom report).
+• --overload answers the app's capacity popup up front: the relaxed pass
+  runs only when the strict one leaves subjects out.
+• With --auto-end, --end is the latest allowed day and the run finishes on
+  the earliest date that fits every subject within capacity.
+• Several configurations (more than one workbook, or a --config file) run in
+  parallel worker processes with --jobs; each writes to its own folder.
+• The app is imported in Streamlit's bare mode for its Excel and PDF writers,
+  so their on-screen messages are dropped; every run prints a one-line
+  summary instead.
+
+Usage:
+    python timetable_cli.py "Final Exam Input Data.xlsx" --college "Kirit P. Mehta School of Law/School of Law" \\
+        --start 03-11-2025 --end 28-11-2025 --holidays holidays.txt --capacity 449 \\
+        --slot "11:00 AM - 01:00 PM" --slot "02:30 PM - 04:30 PM" --out outputs
+
+    python timetable_cli.py --config runs.json --jobs 4 --out outputs
+
+A --config file is a JSON list of objects with any of the keys workbook,
+college, start, end, holidays, slots, capacity, overload, mode, time_limit,
+declaration, auto_end and name; keys left out take the command-line values.
+"""
+
+import argparse
+import copy
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+DATE_FORMAT = "%d-%m-%Y"
+CONFIG_KEYS = ("workbook", "college", "start", "end", "holidays", "slots", "capacity", "overload", "mode",
+               "time_limit", "declaration", "auto_end", "name")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ARGUMENT HELPERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def parse_date(value):
+    """dd-mm-yyyy string -> datetime (the format the app uses everywhere)."""
+    return datetime.strptime(str(value).strip(), DATE_FORMAT)
+
+
+def read_holidays(path):
+    """Holiday dates from a text file: one dd-mm-yyyy per line, '#' starts a comment."""
+    holidays = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                holidays.add(parse_date(line).date())
+    return holidays
+
+
+def parse_slots(slots):
+    """
+    Build the app's time slot dict from "10:00 AM - 01:00 PM" strings.
+
+    Returns:
+        dict: {1: {"start": "10:00 AM", "end": "01:00 PM"}, ...} in the order given
+    """
+    time_slots = {}
+    for number, slot in enumerate(slots, start=1):
+        start, sep, end = str(slot).partition("-")
+        if not sep:
+            raise ValueError(f"Time slot '{slot}' should look like '10:00 AM - 01:00 PM'")
+        start, end = start.strip(), end.strip()
+        for value in (start, end):
+            datetime.strptime(value, "%I:%M %p")
+        time_slots[number] = {"start": start, "end": end}
+    return time_slots
+
+
+def _run_name(config, index):
+    if config.get("name"):
+        return config["name"]
+    stem = os.path.splitext(os.path.basename(config["workbook"]))[0]
+    return f"{index + 1:02d}_{stem}"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PIPELINE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def generate(config):
+    """
+    Run one configuration end to end and write its outputs.
+
+    Args:
+        config (dict): workbook, college, start, end (dd-mm-yyyy), capacity,
+                       out_dir and optionally holidays (file path), slots
+                       (list of "start - end" strings), overload (bool),
+                       mode ("greedy", "search" or "solver"), time_limit
+                       (seconds per search/solver pass), declaration
+                       (dd-mm-yyyy) and auto_end (bool: search for the
+                       earliest end date up to end)
+
+    Returns:
+        dict: name, out_dir, end (last exam day used), exams, not_scheduled,
+              overloaded (Mumbai sessions over capacity), outputs (file
+              names), seconds and error (None on success)
+    """
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)  # Streamlit's bare-mode notices
+    import streamlit as st
+    import app
+    from timetable_engine import get_college_profile
+    from timetable_io import MissingColumnsError, parse_input
+    from timetable_pipeline import generate_timetable
+    from timetable_sweep import find_minimal_end_date
+
+    summary = {'name': config['name'], 'out_dir': config['out_dir'], 'end': config['end'], 'exams': 0,
+               'not_scheduled': 0,
+               'overloaded': 0, 'outputs': [], 'seconds': 0.0, 'error': None}
+    started = time.perf_counter()
+    try:
+        out_dir = config['out_dir']
+        os.makedirs(out_dir, exist_ok=True)
+        start, end = parse_date(config['start']), parse_date(config['end'])
+        holidays = read_holidays(config['holidays']) if config.get('holidays') else set()
+        capacity = int(config['capacity'])
+        profile = get_college_profile(config['college'])
+        time_slots = parse_slots(config['slots']) if config.get('slots') else copy.deepcopy(profile['default_time_slots'])
+
+        with open(config['workbook'], "rb") as f:
+            upload = io.BytesIO(f.read())
+        try:
+            df_non, df_ele, original_df = parse_input(upload)
+        except MissingColumnsError as e:
+            raise ValueError(f"{config['workbook']} is missing the columns {', '.join(e.columns)}")
+        if config.get('auto_end'):
+            found, _ = find_minimal_end_date(df_non, profile, holidays, start, end, time_slots, capacity)
+            end = found or end
+            summary['end'] = end.strftime(DATE_FORMAT)
+
+        result = generate_timetable(df_non, df_ele, holidays, start, end, time_slots, capacity, profile,
+                                    mode=config.get('mode') or "greedy", time_limit=config.get('time_limit'),
+                                    allow_overload=bool(config.get('overload')))
+        sem_dict = result['sem_dict']
+        summary['not_scheduled'] = len(result['scheduled']) - sum(len(df) for df in sem_dict.values())
+        if not sem_dict:
+            raise ValueError("No subjects could be scheduled within the specified date range")
+        summary['exams'] = sum(len(df) for df in sem_dict.values())
+
+        report = result['report']
+        summary['overloaded'] = int((report['Headroom'] < 0).sum())
+        report.to_csv(os.path.join(out_dir, "capacity.csv"), index=False)
+        summary['outputs'].append("capacity.csv")
+
+        def write(file_name, data):
+            if data:
+                with open(os.path.join(out_dir, file_name), "wb") as f:
+                    f.write(data)
+                summary['outputs'].append(file_name)
+
+        # The Excel and PDF writers read the school, slots, capacity and
+        # timetable from the session, as they do in the app
+        st.session_state.clear()
+        st.session_state.update(selected_college=config['college'], time_slots=time_slots,
+                                capacity_slider=capacity, timetable_data=sem_dict)
+        sheets = app.build_timetable_sheets(sem_dict)
+        excel_data = app.save_to_excel(sem_dict, sheets=sheets)
+        write("timetable.xlsx", excel_data.getvalue() if excel_data else None)
+        verification_data = app.save_verification_excel(original_df, sem_dict)
+        write("verification.xlsx", verification_data.getvalue() if verification_data else None)
+
+        declaration = parse_date(config['declaration']).date() if config.get('declaration') else None
+        app.generate_pdf_timetable(sem_dict, os.path.join(out_dir, "timetable.pdf"), declaration_date=declaration,
+                                   sheets=sheets)
+        pdf_name = "timetables.zip" if st.session_state.get('is_zip_download') else "timetable.pdf"
+        write(pdf_name, st.session_state.get('pdf_data'))
+    except Exception as e:
+        summary['error'] = f"{type(e).__name__}: {e}"
+
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+def run_configs(configs, jobs=1):
+    """
+    Run generate() for every configuration, in parallel processes when jobs > 1.
+
+    Returns:
+        list: generate() summaries, in the order of configs
+    """
+    if jobs <= 1 or len(configs) <= 1:
+        return [generate(config) for config in configs]
+    # Spawned workers each import the app once and then take runs off the queue
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(jobs, len(configs)), mp_context=context) as pool:
+        return list(pool.map(generate, configs))
+
+
+def build_configs(args):
+    """One configuration per workbook argument or --config entry, command-line values as defaults."""
+    defaults = {key: getattr(args, key, None) for key in CONFIG_KEYS}
+    defaults['slots'] = args.slot
+    entries = [dict(defaults, workbook=w) for w in args.workbooks]
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            entries += [dict(defaults, **entry) for entry in json.load(f)]
+
+    configs = []
+    for index, config in enumerate(entries):
+        missing = [key for key in ("workbook", "college", "start", "end") if not config.get(key)]
+        if missing:
+            raise ValueError(f"Configuration {index + 1} has no {', '.join(missing)}")
+        config['name'] = _run_name(config, index)
+        config['out_dir'] = os.path.join(args.out, config['name']) if len(entries) > 1 else args.out
+        configs.append(config)
+    return configs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate final exam timetables without the web UI")
+    parser.add_argument("workbooks", nargs="*", help="Input workbook(s) (.xlsx); one run each")
+    parser.add_argument("--config", help="JSON list of run configurations")
+    parser.add_argument("--college", help="School name as shown in the app")
+    parser.add_argument("--start", help="First exam day, dd-mm-yyyy")
+    parser.add_argument("--end", help="Last exam day, dd-mm-yyyy")
+    parser.add_argument("--holidays", help="Text file with one dd-mm-yyyy holiday per line")
+    parser.add_argument("--slot", action="append",
+                        help='Time slot such as "10:00 AM - 01:00 PM"; repeat for each slot '
+                             '(default: the school\'s usual slots)')
+    parser.add_argument("--capacity", type=int, default=1250, help="Mumbai students per session")
+    parser.add_argument("--overload", action="store_true",
+                        help="Exceed the Mumbai capacity when strict scheduling leaves subjects out")
+    parser.add_argument("--mode", choices=("greedy", "search", "solver"), default="greedy",
+                        help="Placement method")
+    parser.add_argument("--time-limit", type=int,
+                        help="Seconds per placement pass in search and solver modes (default: as in the app)")
+    parser.add_argument("--auto-end", action="store_true",
+                        help="Treat --end as the latest allowed day and finish on the earliest date that fits")
+    parser.add_argument("--declaration", help="Declaration date printed on the PDF, dd-mm-yyyy")
+    parser.add_argument("--out", default="timetable_output", help="Output directory")
+    parser.add_argument("--jobs", type=int, default=1, help="Configurations to run in parallel")
+    args = parser.parse_args(argv)
+
+    if not args.workbooks and not args.config:
+        parser.error("give at least one workbook or a --config file")
+    try:
+        configs = build_configs(args)
+        for config in configs:
+            parse_date(config['start']), parse_date(config['end'])
+            if config.get('slots'):
+                parse_slots(config['slots'])
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    summaries = run_configs(configs, args.jobs)
+    print(f"{'run':<28} {'end':>10} {'exams':>6} {'not sched':>9} {'overload':>8} {'seconds':>8}  outputs")
+    for s in summaries:
+        if s['error']:
+            print(f"{s['name']:<28} {'FAILED':>10}  {s['error']}")
+        else:
+            print(f"{s['name']:<28} {s['end']:>10} {s['exams']:>6} {s['not_scheduled']:>9} {s['overloaded']:>8} "
+                  f"{s['seconds']:>8.2f}  {s['out_dir']}")
+    return 1 if any(s['error'] for s in summaries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1299 @@
+"""
+Timetable Scheduling Engine
+===========================
+Headless core of the final-exam scheduler used by app.py.
+
+• No Streamlit imports: everything the engine needs (college profile, time slots,
+  capacity, holidays, date range) is passed in explicitly, so it can run from a
+  batch job, a worker process or a benchmark harness.
+• schedule_subjects() returns the scheduled frame plus the units that could not
+  be placed; deciding what to do with unscheduled units (capacity popup, rerun
+  with the limit relaxed) is left to the caller.
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Stages hand each other filtered frames without defensive .copy() calls and
+# rely on copy-on-write to keep their edits local. It is always on from
+# pandas 3.0; switch it on for 2.x.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION 1 — COLLEGE PROFILES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+BUSINESS_SCHOOL_MARKERS = (
+    "School of Business Management",
+    "Pravin Dalal",
+    "School of Economics",
+    "Sarla Anil Modi",
+    "School of Liberal Arts",
+    "Jyoti Dalal",
+    "School of Branding and Advertising",
+    "School of Science",
+    "Sunandan Divatia",
+    "School of Commerce",
+    "Anil Surendra Modi",
+    "Diploma in Textile Technology",
+)
+
+DEFAULT_TIME_SLOTS = {
+    1: {"start": "10:00 AM", "end": "01:00 PM"},
+    2: {"start": "02:00 PM", "end": "05:00 PM"}
+}
+
+LAW_SCHOOL_TIME_SLOTS = {
+    1: {"start": "11:00 AM", "end": "01:00 PM"},
+    2: {"start": "02:30 PM", "end": "04:30 PM"}
+}
+
+BUSINESS_SCHOOL_TIME_SLOTS = {
+    1: {"start": "11:30 AM", "end": "01:30 PM"},
+    2: {"start": "03:00 PM", "end": "05:00 PM"},
+    3: {"start": "08:30 AM", "end": "10:30 AM"}
+}
+
+
+def get_college_profile(college_name):
+    """
+    Build the scheduling profile for a college.
+
+    Args:
+        college_name (str): Name of the selected school/college
+
+    Returns:
+        dict: Flags that switch the engine's college-specific rules, plus the
+              time slots to use when none are configured
+    """
+    college_name = college_name or ""
+    is_business_school = any(marker in college_name for marker in BUSINESS_SCHOOL_MARKERS)
+    is_law_school = "Law" in college_name
+    if is_business_school:
+        default_time_slots = BUSINESS_SCHOOL_TIME_SLOTS
+    elif is_law_school:
+        default_time_slots = LAW_SCHOOL_TIME_SLOTS
+    else:
+        default_time_slots = DEFAULT_TIME_SLOTS
+    return {
+        'name': college_name,
+        'is_law_school': is_law_school,
+        'is_mpstme': "Mukesh Patel" in college_name or "Technology Management" in college_name,
+        'is_business_school': is_business_school,
+        'default_time_slots': default_time_slots,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION 2 — DATE & SLOT HELPERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+DATE_FORMAT = "%d-%m-%Y"
+
+
+def _as_date(day):
+    return day.date() if isinstance(day, datetime) else day
+
+
+class Calendar:
+    """
+    Valid exam days (not Sunday, not a holiday), numbered 0..n-1.
+
+    The engines work on these day indices; the date strings are formatted
+    once here and only looked up when a placement is written out.
+
+    • days / strs: the valid days as datetimes and as DD-MM-YYYY strings
+    • index: DD-MM-YYYY string -> day index
+    • position: date ordinal -> day index
+    • prev_adjacent / next_adjacent: index of the valid day one calendar day
+      before / after day i, or None (the alternate-day rules)
+    • first_on_or_after / last_on_or_before: next-valid / prev-valid lookups
+      for any calendar day, from tables over the calendar's span
+    """
+
+    def __init__(self, days):
+        self.days = [datetime(d.year, d.month, d.day) for d in days]
+        self.strs = [d.strftime(DATE_FORMAT) for d in self.days]
+        self.index = {s: i for i, s in enumerate(self.strs)}
+        ordinals = [d.toordinal() for d in self.days]
+        self.position = {o: i for i, o in enumerate(ordinals)}
+        self.prev_adjacent = [self.position.get(o - 1) for o in ordinals]
+        self.next_adjacent = [self.position.get(o + 1) for o in ordinals]
+
+        # _next_valid[k] / _prev_valid[k]: first valid day on or after / last
+        # valid day on or before the k-th calendar day of the span
+        self.first_ordinal = ordinals[0] if ordinals else 0
+        span = ordinals[-1] - self.first_ordinal + 1 if ordinals else 0
+        self._next_valid, self._prev_valid = [0] * span, [0] * span
+        i = 0
+        for k in range(span):
+            if ordinals[i] < self.first_ordinal + k:
+                i += 1
+            self._next_valid[k] = i
+            self._prev_valid[k] = i if ordinals[i] == self.first_ordinal + k else i - 1
+
+    @classmethod
+    def for_range(cls, start_date, end_date, holidays):
+        """Calendar of the valid days from start_date to end_date inclusive."""
+        start, end = _as_date(start_date), _as_date(end_date)
+        span = (start + timedelta(days=k) for k in range((end - start).days + 1))
+        return cls([d for d in span if d.weekday() != 6 and d not in holidays])
+
+    def __len__(self):
+        return len(self.days)
+
+    def head(self, count):
+        """Calendar of the first count valid days."""
+        return Calendar(self.days[:count])
+
+    def first_on_or_after(self, day):
+        """Index of the first valid day on or after day, or None past the end."""
+        k = _as_date(day).toordinal() - self.first_ordinal
+        if k >= len(self._next_valid):
+            return None
+        return self._next_valid[max(k, 0)]
+
+    def last_on_or_before(self, day):
+        """Index of the last valid day on or before day, or None before the start."""
+        k = _as_date(day).toordinal() - self.first_ordinal
+        if k < 0 or not self.days:
+            return None
+        return self._prev_valid[min(k, len(self._prev_valid) - 1)]
+
+
+@lru_cache(maxsize=64)
+def _cached_calendar(start, end, holidays):
+    return Calendar.for_range(start, end, holidays)
+
+
+def get_calendar(start_date, end_date, holidays_set):
+    """
+    The shared Calendar for a date range; built once per (range, holidays).
+
+    Callers must treat the returned object as read-only.
+    """
+    return _cached_calendar(_as_date(start_date), _as_date(end_date), frozenset(holidays_set))
+
+
+def get_first_valid_days(start_date, count, holidays_set):
+    """Calendar of the first count valid days from start_date."""
+    start = _as_date(start_date)
+    # At least 6 of every 7 days are not Sundays, so this span always holds
+    # count valid days whatever the holidays
+    span = (count + len(holidays_set)) * 7 // 6 + 7
+    return get_calendar(start, start + timedelta(days=span), holidays_set).head(count)
+
+
+def get_valid_dates_in_range(start_date, end_date, holidays_set):
+    """
+    Get all valid examination dates within the specified range.
+    Excludes weekends (Sundays) and holidays.
+
+    Args:
+        start_date (datetime): Start date for examinations
+        end_date (datetime): End date for examinations
+        holidays_set (set): Set of holiday dates
+
+    Returns:
+        list: List of valid date strings in DD-MM-YYYY format
+    """
+    return list(get_calendar(start_date, end_date, holidays_set).strs)
+
+def find_next_valid_day_in_range(start_date, end_date, holidays_set):
+    """
+    Find the next valid examination day within the specified range.
+
+    Args:
+        start_date (datetime): Start date to search from
+        end_date (datetime): End date limit
+        holidays_set (set): Set of holiday dates
+
+    Returns:
+        datetime or None: Next valid date or None if no valid date found in range
+    """
+    calendar = get_calendar(start_date, end_date, holidays_set)
+    return calendar.days[0] if calendar.days else None
+
+def get_time_slot_from_number(slot_number, time_slots_dict):
+    """
+    Get time slot string based on slot number from configuration
+
+    Args:
+        slot_number: The exam slot number (1, 2, 3, etc.)
+        time_slots_dict: Dictionary of configured time slots
+
+    Returns:
+        str: Time slot string in format "HH:MM AM - HH:MM PM"
+    """
+    # Default to slot 1 if invalid or missing
+    if pd.isna(slot_number) or slot_number == 0 or slot_number not in time_slots_dict:
+        slot_number = 1
+
+    slot_config = time_slots_dict.get(int(slot_number), time_slots_dict[1])
+    return f"{slot_config['start']} - {slot_config['end']}"
+
+@lru_cache(maxsize=256)
+def slot_interval(time_slot):
+    """
+    Minutes after midnight a "HH:MM AM - HH:MM PM" time slot starts and ends.
+
+    Returns:
+        tuple: (start, end), or None when the string is not a parseable slot
+    """
+    try:
+        start, end = (datetime.strptime(part.strip(), "%I:%M %p") for part in str(time_slot).split("-"))
+    except ValueError:
+        return None
+    return start.hour * 60 + start.minute, end.hour * 60 + end.minute
+
+
+def slots_overlap(slot_a, slot_b):
+    """
+    Whether two time slots share any minute. Slots that merely touch
+    (one ends as the other starts) do not overlap; unparseable slots only
+    overlap an identical string.
+    """
+    if slot_a == slot_b:
+        return True
+    a, b = slot_interval(slot_a), slot_interval(slot_b)
+    return a is not None and b is not None and a[0] < b[1] and b[0] < a[1]
+
+def get_time_slot_with_capacity(slot_number, date_str, session_capacity, student_count,
+                                 time_slots_dict, max_capacity=2000):
+    """
+    Get time slot considering capacity constraints and slot number
+
+    Args:
+        slot_number: Exam slot number from Excel
+        date_str: Date string in DD-MM-YYYY format
+        session_capacity: Dictionary tracking capacity per date/slot
+        student_count: Number of students for this exam
+        time_slots_dict: Dictionary of configured time slots
+        max_capacity: Maximum students per session
+
+    Returns:
+        str: Time slot string or None if no capacity available
+    """
+    # Get preferred time slot based on slot number
+    preferred_slot = get_time_slot_from_number(slot_number, time_slots_dict)
+
+    if date_str not in session_capacity:
+        return preferred_slot
+
+    # Get slot key for capacity tracking
+    slot_key = f"slot_{int(slot_number) if not pd.isna(slot_number) else 1}"
+    current_capacity = session_capacity[date_str].get(slot_key, 0)
+
+    if current_capacity + student_count <= max_capacity:
+        return preferred_slot
+
+    # Try other available slots
+    for alt_slot_num in sorted(time_slots_dict.keys()):
+        if alt_slot_num == slot_number:
+            continue
+
+        alt_slot = get_time_slot_from_number(alt_slot_num, time_slots_dict)
+        alt_slot_key = f"slot_{alt_slot_num}"
+        alt_capacity = session_capacity[date_str].get(alt_slot_key, 0)
+
+        if alt_capacity + student_count <= max_capacity:
+            return alt_slot
+
+    # If no slot fits, return None
+    return None
+
+ROMAN_NUMERALS = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6,
+                  'VII': 7, 'VIII': 8, 'IX': 9, 'X': 10, 'XI': 11, 'XII': 12}
+
+# Semester spellings seen in the registration exports, resolved up front;
+# anything else is parsed once by _parse_semester and remembered here.
+SEMESTER_LOOKUP = {}
+for _roman, _num in ROMAN_NUMERALS.items():
+    for _label in ("", "SEM ", "SEMESTER ", "SEM_", "SEMESTER_"):
+        SEMESTER_LOOKUP[_label + _roman] = _num
+        SEMESTER_LOOKUP[_label + str(_num)] = _num
+
+def _parse_semester(s):
+    for roman, num in ROMAN_NUMERALS.items():
+        if s == roman or s.endswith(f" {roman}") or s.endswith(f"_{roman}"):
+            return num
+    digits = re.findall(r'\d+', s)
+    return int(digits[0]) if digits else None
+
+def extract_numeric_sem(sem_val, default=1):
+    """Parse 'Sem VIII' / 'VIII' / 'SEM_VIII' / '8' style semester values to an int."""
+    s = str(sem_val).strip().upper()
+    if s not in SEMESTER_LOOKUP:
+        SEMESTER_LOOKUP[s] = _parse_semester(s)
+    num = SEMESTER_LOOKUP[s]
+    return default if num is None else num
+
+def has_open_electives(df):
+    """True when any row carries a non-empty OE tag."""
+    if 'OE' not in df.columns:
+        return False
+    return bool((df['OE'].notna() & (df['OE'].str.strip() != "")).any())
+
+def get_core_exam_dates(df, base_date, end_date, holidays):
+    """
+    Valid exam days for core (non-OE) subjects.
+
+    The last 2 valid days are held back for Open Electives when the input has any
+    and the range is long enough to spare them.
+
+    Returns:
+        tuple: (core_valid_dates, all_valid_dates) as lists of datetime objects
+    """
+    all_valid_dates = list(get_calendar(base_date, end_date, holidays).days)
+
+    if len(all_valid_dates) < 3 or not has_open_electives(df):
+        return all_valid_dates, all_valid_dates
+    return all_valid_dates[:-2], all_valid_dates
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION 3 — SCHEDULING UNITS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_sol_ba_bba_re = re.compile(r'^(B\.A\.|B\.B\.A\.)[,\s].*LL\.B', re.IGNORECASE)
+_sol_llm_re    = re.compile(r'(LL\.M|master\s+of\s+law|llm)', re.IGNORECASE)
+
+def _is_ba_bba_llb(val):
+    s = str(val).strip()
+    return (not _sol_llm_re.search(s)) and bool(_sol_ba_bba_re.match(s))
+
+def _all_two_credit(group_df):
+    if 'Difficulty' not in group_df.columns:
+        return False
+    return bool((group_df['Difficulty'].fillna(-1) == 0).all())
+
+def build_scheduling_units(df, profile):
+    """
+    Group the non-OE rows of df into the units the passes place as a whole.
+
+    CM groups (including the synthetic law-school and MBA Tech priority groups)
+    become COMMON units; every other module code becomes an INDIVIDUAL unit.
+
+    Returns:
+        dict or None: {'priority': [...], 'normal': [...], 'individual': [...],
+                      'cohort_ids': {branch_sem: bit}, 'campuses': [...]},
+                      or None when there is nothing to schedule
+    """
+    IS_LAW_SCHOOL = profile['is_law_school']
+    IS_MPSTME = profile['is_mpstme']
+
+    eligible_subjects = df[(~(df['OE'].notna() & (df['OE'].str.strip() != "")))]
+    if eligible_subjects.empty: return None
+
+    if IS_LAW_SCHOOL:
+        sem_upper = eligible_subjects['Semester'].astype(str).str.strip().str.upper()
+        is_elec = eligible_subjects['Category'] == 'ELEC'
+        sem8_elec_mask = is_elec & (sem_upper.str.endswith('VIII') | sem_upper.str.endswith(' 8') | (sem_upper == '8'))
+        if sem8_elec_mask.any():
+            eligible_subjects.loc[sem8_elec_mask, 'CMGroup'] = "LAW_SEM8_ELEC_GROUP"
+            eligible_subjects.loc[sem8_elec_mask, 'CMGroup_Clean'] = "LAW_SEM8_ELEC_GROUP"
+
+        sem6_elec_mask = is_elec & (sem_upper.str.endswith('VI') | sem_upper.str.endswith(' 6') | (sem_upper == '6'))
+        if sem6_elec_mask.any():
+            eligible_subjects.loc[sem6_elec_mask, 'CMGroup'] = ""
+            eligible_subjects.loc[sem6_elec_mask, 'CMGroup_Clean'] = ""
+
+    if 'CMGroup' in eligible_subjects.columns:
+        eligible_subjects['CMGroup_Clean'] = eligible_subjects['CMGroup'].fillna("").astype(str).str.strip().replace(["0", "0.0", "nan"], "")
+    else:
+        eligible_subjects['CMGroup_Clean'] = ""
+
+    if IS_LAW_SCHOOL:
+        no_cm_mask = eligible_subjects['CMGroup_Clean'] == ""
+        sol_mask   = eligible_subjects['Program'].apply(_is_ba_bba_llb)
+        pairing_pool = eligible_subjects[no_cm_mask & sol_mask]
+
+        if not pairing_pool.empty:
+            ba_rows  = pairing_pool[pairing_pool['Program'].str.match(r'^B\.A\.',   case=False, na=False)]
+            bba_rows = pairing_pool[pairing_pool['Program'].str.match(r'^B\.B\.A\.', case=False, na=False)]
+
+            for sem_val, ba_sem_group in ba_rows.groupby('Semester', observed=True):
+                bba_sem_group = bba_rows[bba_rows['Semester'] == sem_val]
+                if bba_sem_group.empty:
+                    continue
+
+                ba_sorted  = ba_sem_group.sort_values('ModuleCode').reset_index()
+                bba_sorted = bba_sem_group.sort_values('ModuleCode').reset_index()
+
+                pair_count = min(len(ba_sorted), len(bba_sorted))
+                for pair_idx in range(pair_count):
+                    ba_orig_idx  = ba_sorted.iloc[pair_idx]['index']
+                    bba_orig_idx = bba_sorted.iloc[pair_idx]['index']
+                    synthetic_cm = f"SOL_BABBBA_SEM{str(sem_val).strip().replace(' ','_')}_PAIR{pair_idx}"
+                    eligible_subjects.loc[ba_orig_idx,  'CMGroup_Clean'] = synthetic_cm
+                    eligible_subjects.loc[bba_orig_idx, 'CMGroup_Clean'] = synthetic_cm
+
+    mba_tech_common_within_ids = set()
+    if IS_MPSTME and 'IsCommon' in eligible_subjects.columns:
+        mba_mask = eligible_subjects['Program'].astype(str).str.upper().str.contains("MBA TECH", na=False)
+        sem_u = eligible_subjects['Semester'].astype(str).str.strip().str.upper()
+        target_sem = (
+            sem_u.str.endswith("VIII") | sem_u.str.endswith(" 8") | (sem_u == "8") |
+            sem_u.str.endswith("X")    | sem_u.str.endswith(" 10") | (sem_u == "10")
+        )
+        is_within = eligible_subjects['IsCommon'].astype(str).str.strip().str.upper() == "WITHIN"
+        mba_within_rows = eligible_subjects[mba_mask & target_sem & is_within]
+        mba_tech_common_within_ids = set(mba_within_rows['CMGroup_Clean'].unique()) - {""}
+
+    # "Branch_Semester" cohort of every row, built once for all units
+    row_cohort = eligible_subjects['Branch'].astype(str) + "_" + eligible_subjects['Semester'].astype(str)
+
+    df_common    = eligible_subjects[eligible_subjects['CMGroup_Clean'] != ""]
+    df_individual = eligible_subjects[eligible_subjects['CMGroup_Clean'] == ""]
+
+    common_units_priority, common_units_normal = [], []
+    if not df_common.empty:
+        for cm_id, group in df_common.groupby('CMGroup_Clean'):
+            unit = {
+                'type': 'COMMON', 'id': f"CM_{cm_id}", 'indices': group.index.tolist(),
+                'branch_sems': list(set(row_cohort.loc[group.index])),
+                'fixed_slot': group['ExamSlotNumber'].iloc[0],
+                'sem_raw': group['Semester'].iloc[0],
+                'student_count': group['StudentCount'].sum(),
+                'is_two_credit': _all_two_credit(group),
+            }
+            if cm_id in mba_tech_common_within_ids or "PRIORITY" in cm_id:
+                common_units_priority.append(unit)
+            else:
+                common_units_normal.append(unit)
+
+    individual_units = []
+    if not df_individual.empty:
+        for mod_code, group in df_individual.groupby('ModuleCode', observed=True):
+            unit = {
+                'type': 'INDIVIDUAL', 'id': f"MOD_{mod_code}", 'indices': group.index.tolist(),
+                'branch_sems': list(set(row_cohort.loc[group.index])),
+                'fixed_slot': group['ExamSlotNumber'].iloc[0],
+                'sem_raw': group['Semester'].iloc[0],
+                'student_count': group['StudentCount'].sum(),
+                'is_two_credit': _all_two_credit(group),
+            }
+            individual_units.append(unit)
+
+    # Intern "Branch_Semester" cohorts to bit positions; each unit carries the
+    # OR of its cohorts so the passes can test day/slot clashes with one AND.
+    all_units = common_units_priority + common_units_normal + individual_units
+    cohort_ids = {bs: i for i, bs in enumerate(sorted({bs for u in all_units for bs in u['branch_sems']}))}
+    for unit in all_units:
+        unit['cohort_mask'] = sum(1 << cohort_ids[bs] for bs in unit['branch_sems'])
+
+    # Campus demand per unit, computed once so capacity checks never go back to
+    # the frame. Only Mumbai campuses are capped.
+    row_campus = campus_keys(eligible_subjects)
+    campuses = sorted(row_campus.unique())
+    campus_ids = {c: i for i, c in enumerate(campuses)}
+    capped = np.array([is_capped_campus(c) for c in campuses], dtype=bool)
+    unit_rows = eligible_subjects.index.get_indexer([idx for unit in all_units for idx in unit['indices']])
+    row_unit = np.full(len(eligible_subjects), -1)
+    row_unit[unit_rows] = np.repeat(np.arange(len(all_units)), [len(unit['indices']) for unit in all_units])
+    row_unit = pd.Series(row_unit, index=eligible_subjects.index)
+    demand = eligible_subjects['StudentCount'].groupby([row_unit, row_campus.map(campus_ids)]).sum()
+    unit_pos = demand.index.get_level_values(0).to_numpy()
+    demand_campus = demand.index.get_level_values(1).to_numpy(dtype=np.intp)
+    demand_values = demand.to_numpy(dtype=float)
+    bounds = np.searchsorted(unit_pos, np.arange(len(all_units) + 1))
+    for pos, unit in enumerate(all_units):
+        unit['campus_idx'] = demand_campus[bounds[pos]:bounds[pos + 1]]
+        unit['campus_demand'] = demand_values[bounds[pos]:bounds[pos + 1]]
+        unit['capped_idx'] = unit['campus_idx'][capped[unit['campus_idx']]]
+        unit['capped_demand'] = unit['campus_demand'][capped[unit['campus_idx']]]
+
+    return {'priority': common_units_priority, 'normal': common_units_normal, 'individual': individual_units,
+            'cohort_ids': cohort_ids, 'campuses': campuses}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION 4 — CAPACITY LEDGER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+UNSCHEDULED_DATE_MARKERS = ("", "Out of Range", "Not Scheduled")
+
+
+def campus_keys(frame):
+    """Campus of every row as the ledger keys it: stripped, upper case, 'UNKNOWN' when missing."""
+    if 'Campus' not in frame.columns:
+        return pd.Series("UNKNOWN", index=frame.index)
+    return frame['Campus'].astype(str).str.strip().str.upper().where(frame['Campus'].notna(), "UNKNOWN")
+
+
+def is_capped_campus(campus):
+    """Only Mumbai campuses have a per-session seat limit."""
+    return "MUMBAI" in campus
+
+
+class CapacityLedger:
+    """
+    Students and exams seated per (exam date, time slot, campus).
+
+    Dates are "%d-%m-%Y" strings, slots are time strings ("10:00 AM - 01:00 PM",
+    as written to the 'Time Slot' column) and campuses are campus_keys()
+    values, so the scheduler, the post-processing passes and the validation all
+    look up the same cells. Keys not seen yet are added on first use.
+
+    Cells are stored per exact slot string, but every capacity read (load,
+    fits, overloaded and the reports) counts the students of all sessions
+    that overlap in time on the same date and campus. Schools with different
+    slot grids ("10:00 AM - 01:00 PM" against "11:00 AM - 01:00 PM") sharing
+    one ledger therefore compete for the same Mumbai seats.
+    """
+
+    def __init__(self, max_capacity, dates=(), time_slots=(), campuses=()):
+        self.max_capacity = max_capacity
+        self.date_pos, self.slot_pos, self.campus_pos = {}, {}, {}
+        self.loads = np.zeros((0, 0, 0))
+        self.counts = np.zeros((0, 0, 0), dtype=np.int64)
+        self._overlap_cache = {}
+        for axis, keys in enumerate((dates, time_slots, campuses)):
+            for key in keys:
+                self._position(axis, key)
+
+    @classmethod
+    def from_frame(cls, timetable, max_capacity, time_slots=(), campuses=()):
+        """
+        Build the ledger from scheduled rows with one groupby.
+
+        Args:
+            timetable (DataFrame or dict): Schedule frame, or a dict of
+                                           per-semester frames
+            max_capacity (int): Mumbai student limit per date/slot
+        """
+        ledger = cls(max_capacity, time_slots=time_slots, campuses=campuses)
+        ledger.add_frame(timetable)
+        return ledger
+
+    @property
+    def campuses(self):
+        return list(self.campus_pos)
+
+    def _position(self, axis, key):
+        index = (self.date_pos, self.slot_pos, self.campus_pos)[axis]
+        pos = index.get(key)
+        if pos is None:
+            pos = index[key] = len(index)
+            pad = [(0, 0)] * 3
+            pad[axis] = (0, 1)
+            self.loads = np.pad(self.loads, pad)
+            self.counts = np.pad(self.counts, pad)
+            if axis == 1:
+                self._overlap_cache.clear()
+        return pos
+
+    def _overlapping(self, time_slot):
+        """Positions of the known slots that overlap time_slot (itself included)."""
+        positions = self._overlap_cache.get(time_slot)
+        if positions is None:
+            positions = self._overlap_cache[time_slot] = [
+                pos for key, pos in self.slot_pos.items() if slots_overlap(key, time_slot)]
+        return positions
+
+    def _cell(self, date, time_slot, campus):
+        return (self._position(0, date), self._position(1, time_slot), self._position(2, campus))
+
+    # ── Key-based access (post-processing passes) ─────────────────────────────
+
+    def load(self, date, time_slot, campus):
+        """Students seated in one campus during a session, overlapping sessions included (0 for unknown keys)."""
+        try:
+            d, c = self.date_pos[date], self.campus_pos[campus]
+        except KeyError:
+            return 0.0
+        return float(self.loads[d, self._overlapping(time_slot), c].sum())
+
+    def fits(self, date, time_slot, campus, students):
+        """Whether adding students keeps the session within the Mumbai limit."""
+        return not is_capped_campus(campus) or self.load(date, time_slot, campus) + students <= self.max_capacity
+
+    def add(self, date, time_slot, campus, students, exams=1):
+        cell = self._cell(date, time_slot, campus)
+        self.loads[cell] += students
+        self.counts[cell] += exams
+
+    def move(self, campus, students, old_date, old_slot, new_date, new_slot, exams=1):
+        """Shift an exam's students from one session to another."""
+        self.add(old_date, old_slot, campus, -students, -exams)
+        self.add(new_date, new_slot, campus, students, exams)
+
+    def add_frame(self, timetable, sign=1):
+        """
+        Add (sign=1) or remove (sign=-1) every scheduled row of a frame.
+
+        Rows whose 'Exam Date' is blank, "Out of Range" or "Not Scheduled" are
+        ignored.
+        """
+        frame = pd.concat(timetable.values(), ignore_index=True) if isinstance(timetable, dict) else timetable
+        if frame is None or len(frame) == 0:
+            return
+        dates = frame['Exam Date']
+        scheduled = dates.notna() & ~dates.isin(UNSCHEDULED_DATE_MARKERS)
+        if not scheduled.any():
+            return
+        rows = frame[scheduled]
+        campus = campus_keys(rows)
+        totals = pd.DataFrame({
+            'date': rows['Exam Date'].astype(str).str.strip().to_numpy(),
+            'slot': rows['Time Slot'].astype(str).str.strip().to_numpy(),
+            'campus': campus.to_numpy(),
+            'students': pd.to_numeric(rows['StudentCount'], errors='coerce').fillna(0).to_numpy(dtype=float),
+        }).groupby(['date', 'slot', 'campus'], sort=False)['students'].agg(['sum', 'size'])
+
+        d_idx = [self._position(0, k) for k in totals.index.get_level_values(0)]
+        s_idx = [self._position(1, k) for k in totals.index.get_level_values(1)]
+        c_idx = [self._position(2, k) for k in totals.index.get_level_values(2)]
+        np.add.at(self.loads, (d_idx, s_idx, c_idx), sign * totals['sum'].to_numpy())
+        np.add.at(self.counts, (d_idx, s_idx, c_idx), sign * totals['size'].to_numpy())
+
+    def add_ledger(self, other, sign=1):
+        """Add (sign=1) or remove (sign=-1) every occupied session of another ledger."""
+        d, t, c = np.nonzero(other.counts)
+        if len(d) == 0:
+            return
+        dates, slots, campuses = list(other.date_pos), list(other.slot_pos), list(other.campus_pos)
+        d_idx = [self._position(0, dates[i]) for i in d]
+        s_idx = [self._position(1, slots[i]) for i in t]
+        c_idx = [self._position(2, campuses[i]) for i in c]
+        np.add.at(self.loads, (d_idx, s_idx, c_idx), sign * other.loads[d, t, c])
+        np.add.at(self.counts, (d_idx, s_idx, c_idx), sign * other.counts[d, t, c])
+
+    # ── Positional access (greedy passes; campus indices from the units) ─────
+
+    def overloaded(self, date, time_slot, campus_idx, students):
+        """Whether seating a unit's per-campus students would overload any campus."""
+        positions = self._overlapping(time_slot)
+        if len(positions) == 1:
+            current = self.loads[self.date_pos[date], positions[0], campus_idx]
+        else:
+            current = self.loads[self.date_pos[date], positions][:, campus_idx].sum(axis=0)
+        return bool(((current + students) > self.max_capacity).any())
+
+    def add_unit(self, date, time_slot, campus_idx, students):
+        cell = (self.date_pos[date], self.slot_pos[time_slot], campus_idx)
+        self.loads[cell] += students
+        self.counts[cell] += 1
+
+    # ── Reporting ─────────────────────────────────────────────────────────────
+
+    def to_frame(self, max_capacity=None):
+        """
+        One row per session that holds at least one exam, with its headroom.
+
+        Args:
+            max_capacity (int): Limit to report against; the ledger's own
+                                max_capacity when not given
+
+        Returns:
+            DataFrame: Exam Date, Time Slot, Campus, Students (seated during the
+                       session, overlapping sessions included), Exams (in this
+                       session only), Capped and Headroom (seats left; negative
+                       when overloaded, NaN for campuses without a limit),
+                       ordered by date, slot and campus
+        """
+        limit = self.max_capacity if max_capacity is None else max_capacity
+        d, s, c = np.nonzero(self.counts)
+        slot_keys = list(self.slot_pos)
+        overlap = np.array([[slots_overlap(a, b) for b in slot_keys] for a in slot_keys], dtype=float)
+        seated = np.einsum('st,dtc->dsc', overlap, self.loads) if slot_keys else self.loads
+        dates = np.array(list(self.date_pos), dtype=object)[d]
+        slots = np.array(list(self.slot_pos), dtype=object)[s]
+        campuses = np.array(list(self.campus_pos), dtype=object)[c]
+        order = np.lexsort((campuses.astype(str), slots.astype(str), dates.astype(str)))
+        loads = seated[d, s, c][order]
+        capped = np.array([is_capped_campus(k) for k in campuses[order]], dtype=bool)
+        return pd.DataFrame({
+            'Exam Date': dates[order],
+            'Time Slot': slots[order],
+            'Campus': campuses[order],
+            'Students': loads,
+            'Exams': self.counts[d, s, c][order],
+            'Capped': capped,
+            'Headroom': np.where(capped, limit - loads, np.nan),
+        })
+
+    def violations(self, max_capacity=None):
+        """
+        Mumbai sessions above the limit, ordered by date, slot and campus.
+
+        Args:
+            max_capacity (int): Limit to check against; the ledger's own
+                                max_capacity when not given
+
+        Returns:
+            list: One dict per session with date, time_slot, campus,
+                  student_count, subjects_count and excess
+        """
+        report = self.to_frame(max_capacity)
+        return violations_from_report(report)
+
+
+def violations_from_report(report):
+    """Overloaded sessions of a CapacityLedger.to_frame() report, as dicts."""
+    over = report[report['Headroom'] < 0]
+    return [
+        {'date': date, 'time_slot': slot, 'campus': campus, 'student_count': int(students),
+         'subjects_count': int(exams), 'excess': int(-headroom)}
+        for date, slot, campus, students, exams, headroom in zip(
+            over['Exam Date'], over['Time Slot'], over['Campus'], over['Students'], over['Exams'], over['Headroom'])
+    ]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION 5 — PLACEMENT PASSES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def preferred_slot(unit, time_slots_dict):
+    """
+    Slot a standard-college pass tries first for a unit: its fixed slot, else
+    slot 1 for odd study years and 2 for even ones, falling back to the lowest
+    configured slot when that one is not configured.
+    """
+    if unit['fixed_slot'] > 0:
+        return int(unit['fixed_slot'])
+    slot_num = 1 if ((extract_numeric_sem(unit['sem_raw']) + 1) // 2) % 2 == 1 else 2
+    return slot_num if slot_num in time_slots_dict else min(time_slots_dict)
+
+
+def write_assignments(df, assigned_units, assigned_dates, assigned_slots, assigned_overload, date_strs, time_slots_dict):
+    """
+    Copy df and fill in the placements chosen by a pass, one column at a time.
+
+    Args:
+        df (DataFrame): Frame the units were built from
+        assigned_units (list): Placed units
+        assigned_dates (list): Index into date_strs for each placed unit
+        assigned_slots (list): Slot number for each placed unit
+        assigned_overload (list): Whether each placement exceeded capacity
+        date_strs (list): Candidate exam days as DD-MM-YYYY strings
+        time_slots_dict (dict): Configured time slots
+
+    Returns:
+        DataFrame: Copy of df with Exam Date, Time Slot, ExamSlotNumber and
+                   Capacity_Exceeded_Flag set for every placed row
+    """
+    work_df = df.copy(deep=False)
+    work_df['Capacity_Exceeded_Flag'] = "No"
+    if not assigned_units:
+        return work_df
+
+    unit_sizes = [len(u['indices']) for u in assigned_units]
+    row_pos = work_df.index.get_indexer([idx for u in assigned_units for idx in u['indices']])
+    date_strs = np.array(date_strs, dtype=object)
+    slot_nums = np.repeat(np.array(assigned_slots), unit_sizes)
+    slot_strs = {s: get_time_slot_from_number(s, time_slots_dict) for s in set(assigned_slots)}
+
+    columns = {
+        'Exam Date': date_strs[np.repeat(np.array(assigned_dates), unit_sizes)],
+        'Time Slot': np.array([slot_strs[s] for s in slot_nums.tolist()], dtype=object),
+        'ExamSlotNumber': slot_nums,
+    }
+    for col, values in columns.items():
+        # Keep the column's own dtype (object text, int slot numbers)
+        full = work_df[col].to_numpy(copy=True) if col in work_df.columns else np.full(len(work_df), np.nan, dtype=object)
+        if full.dtype.kind not in "iuf" and full.dtype != object:
+            full = full.astype(object)
+        full[row_pos] = values
+        work_df[col] = pd.Series(full, index=work_df.index, dtype=full.dtype)
+
+    overloaded_rows = row_pos[np.repeat(np.array(assigned_overload, dtype=bool), unit_sizes)]
+    flag_col = work_df.columns.get_loc('Capacity_Exceeded_Flag')
+    work_df.iloc[overloaded_rows, flag_col] = "Yes"
+    return work_df
+
+
+def unit_placements(work_df, all_units, date_strs):
+    """
+    Read back where each unit landed in a scheduled frame.
+
+    Returns:
+        list: (day index into date_strs, slot number) per unit, or None for
+              units whose first row has no date in date_strs
+    """
+    if not all_units:
+        return []
+    date_pos = {d: i for i, d in enumerate(date_strs)}
+    first_rows = work_df.loc[[u['indices'][0] for u in all_units], ['Exam Date', 'ExamSlotNumber']]
+    placements = []
+    for exam_date, slot_num in first_rows.itertuples(index=False):
+        d = date_pos.get(exam_date)
+        placements.append(None if d is None else (d, int(slot_num)))
+    return placements
+
+def flag_overloaded_units(assigned_units, assigned_dates, assigned_slots, time_slots_dict, max_capacity,
+                          base_load=None):
+    """
+    True for every placed unit that sits in a Mumbai date/slot/campus session above max_capacity,
+    counting the seats base_load (see base_session_load) says are already held.
+    """
+    session_load = {}
+    slot_key = {s: get_time_slot_from_number(s, time_slots_dict) for s in set(assigned_slots)}
+    for unit, d, s in zip(assigned_units, assigned_dates, assigned_slots):
+        for c, demand in zip(unit['capped_idx'].tolist(), unit['capped_demand'].tolist()):
+            key = (d, slot_key[s], c)
+            if key not in session_load:
+                session_load[key] = base_load(*key) if base_load else 0.0
+            session_load[key] += demand
+    return [
+        any(session_load[(d, slot_key[s], c)] > max_capacity for c in unit['capped_idx'].tolist())
+        for unit, d, s in zip(assigned_units, assigned_dates, assigned_slots)
+    ]
+
+
+# Headline figures of a placement, all "lower is better"
+QUALITY_KEYS = ('unscheduled', 'overload', 'overloaded_sessions', 'span')
+
+
+def quality_keys(profile):
+    """
+    QUALITY_KEYS a pass is judged on for a college. Business schools spread
+    their exams over the whole date range on purpose, so span is left out.
+    """
+    if profile['is_business_school']:
+        return tuple(k for k in QUALITY_KEYS if k != 'span')
+    return QUALITY_KEYS
+
+
+def base_session_load(base_ledger, date_strs, campuses):
+    """
+    Seats another ledger already holds, looked up by a pass's own keys.
+
+    Args:
+        base_ledger (CapacityLedger): Seats taken by other timetables, or None
+        date_strs (list): The pass's day index -> DD-MM-YYYY string
+        campuses (list): The units' campus index -> campus key
+
+    Returns:
+        callable: (day index, time slot string, campus index) -> students,
+                  or None when there is no base_ledger
+    """
+    if base_ledger is None:
+        return None
+    return lambda d, time_slot, c: base_ledger.load(date_strs[d], time_slot, campuses[c])
+
+
+def placement_summary(all_units, placements, time_slots_dict, max_capacity, base_load=None):
+    """
+    Headline figures of a placement, for checking a pass against greedy.
+
+    Args:
+        all_units (list): Scheduling units
+        placements (list): (day index, slot number) or None per unit, as
+                           unit_placements() returns them
+        time_slots_dict (dict): Configured time slots
+        max_capacity (int): Mumbai student limit per date/slot
+        base_load (callable): Seats already held per session, from
+                              base_session_load() (batch mode)
+
+    Returns:
+        dict: unscheduled (units without a place), overload (students above
+              max_capacity, summed over the Mumbai sessions the units use),
+              overloaded_sessions and span (days up to the last day in use)
+    """
+    session_load = {}
+    slot_key = {}
+    unscheduled = span = 0
+    for unit, spot in zip(all_units, placements):
+        if spot is None:
+            unscheduled += 1
+            continue
+        d, s = spot
+        if s not in slot_key:
+            slot_key[s] = get_time_slot_from_number(s, time_slots_dict)
+        for c, demand in zip(unit['capped_idx'].tolist(), unit['capped_demand'].tolist()):
+            key = (d, slot_key[s], c)
+            if key not in session_load:
+                session_load[key] = base_load(*key) if base_load else 0.0
+            session_load[key] += demand
+        span = max(span, d + 1)
+    excess = [load - max_capacity for load in session_load.values() if load > max_capacity]
+    return {'unscheduled': unscheduled, 'overload': float(sum(excess)), 'overloaded_sessions': len(excess),
+            'span': span}
+
+
+def no_worse_than(candidate, baseline, keys=QUALITY_KEYS):
+    """Whether a placement_summary() is at most baseline's on every one of keys."""
+    return all(candidate[k] <= baseline[k] + 1e-9 for k in keys)
+
+
+def execute_pass(df, units, core_valid_dates, time_slots_dict, max_capacity, profile, enforce_cap,
+                 base_ledger=None):
+    """
+    Place every unit onto a (date, slot) in one greedy run.
+
+    Args:
+        df (DataFrame): Parsed non-OE frame (not modified)
+        units (dict): Output of build_scheduling_units()
+        core_valid_dates (list): Candidate exam days (datetime objects)
+        time_slots_dict (dict): Configured time slots
+        max_capacity (int): Mumbai student limit per date/slot
+        profile (dict): Output of get_college_profile()
+        enforce_cap (bool): Refuse placements that would overload Mumbai
+        base_ledger (CapacityLedger): Seats already taken by other timetables
+                                      (batch mode); not modified
+
+    Returns:
+        tuple: (scheduled DataFrame, list of units that could not be placed)
+    """
+    IS_LAW_SCHOOL = profile['is_law_school']
+    MAX_STUDENTS_PER_SESSION = max_capacity
+    common_units_priority = units['priority']
+    common_units_normal = units['normal']
+    individual_units = units['individual']
+
+    # Days are indices into the calendar of core_valid_dates; the date
+    # strings are only looked up for the ledger and the output frame.
+    calendar = Calendar(core_valid_dates)
+    date_strs = calendar.strs
+    num_days = len(calendar)
+
+    # Placements are recorded per unit and written to the frame once, in
+    # materialize_assignments(), instead of cell by cell.
+    assigned_units, assigned_dates, assigned_slots, assigned_overload = [], [], [], []
+
+    def record_assignment(unit, d, slot_num, overloaded):
+        assigned_units.append(unit)
+        assigned_dates.append(d)
+        assigned_slots.append(slot_num)
+        assigned_overload.append(overloaded)
+
+    def materialize_assignments():
+        return write_assignments(df, assigned_units, assigned_dates, assigned_slots, assigned_overload,
+                                 date_strs, time_slots_dict)
+
+    # Occupancy is kept as cohort bitmasks (see build_scheduling_units), so a
+    # conflict check is a single AND against the unit's cohort_mask.
+    daily_schedule_map = [0] * num_days
+    slot_schedule_map = [{s: 0 for s in time_slots_dict.keys()} for _ in range(num_days)]
+    date_load_tracker = [0] * num_days
+    daily_branch_count = [defaultdict(int) for _ in range(num_days)]
+    # Students seated per (date, time slot, campus). The ledger's campus axis
+    # follows units['campuses'], so each unit's campus_idx indexes it directly.
+    session_capacity = CapacityLedger(
+        MAX_STUDENTS_PER_SESSION, dates=date_strs,
+        time_slots=[get_time_slot_from_number(s, time_slots_dict) for s in time_slots_dict.keys()],
+        campuses=units['campuses'],
+    )
+    if base_ledger is not None:
+        session_capacity.add_ledger(base_ledger)
+
+    def check_campus_capacity(d, time_slot, unit):
+        is_overloaded = session_capacity.overloaded(date_strs[d], time_slot, unit['capped_idx'], unit['capped_demand'])
+
+        if enforce_cap and is_overloaded:
+            return False, False
+        return True, is_overloaded
+
+    def add_to_campus_capacity(d, time_slot, unit):
+        session_capacity.add_unit(date_strs[d], time_slot, unit['campus_idx'], unit['campus_demand'])
+
+    # ══════════════════════════════════════════════════════════════════
+    # CRITICAL REFACTOR: GLOBAL ARRAYS FOR BUSINESS SCHOOL PHASES
+    # ══════════════════════════════════════════════════════════════════
+    if profile['is_business_school']:
+        branch_sem_map = {}
+        all_units = common_units_priority + common_units_normal + individual_units
+        for unit in all_units:
+            unit.pop('scheduled', None)
+
+        for unit in all_units:
+            for bs in unit['branch_sems']:
+                if bs not in branch_sem_map:
+                    branch_sem_map[bs] = {'score': 0, 'common': [], 'individual': []}
+                if unit['type'] == 'COMMON':
+                    if unit not in branch_sem_map[bs]['common']: branch_sem_map[bs]['common'].append(unit)
+                else:
+                    if unit not in branch_sem_map[bs]['individual']: branch_sem_map[bs]['individual'].append(unit)
+                branch_sem_map[bs]['score'] += unit['student_count']
+
+        sorted_bsems = sorted(branch_sem_map.keys(), key=lambda x: branch_sem_map[x]['score'], reverse=True)
+        priority_ids = set(u['id'] for u in common_units_priority)
+
+        bs_units = []
+        registered_ids = set()
+        for bs in sorted_bsems:
+            branch_sem_map[bs]['common'].sort(key=lambda x: (1 if x['id'] in priority_ids else 0, x['student_count']), reverse=True)
+            for unit in branch_sem_map[bs]['common']:
+                if unit['id'] not in registered_ids:
+                    bs_units.append(unit)
+                    registered_ids.add(unit['id'])
+        for bs in sorted_bsems:
+            branch_sem_map[bs]['individual'].sort(key=lambda x: x['student_count'], reverse=True)
+            for unit in branch_sem_map[bs]['individual']:
+                if unit['id'] not in registered_ids:
+                    bs_units.append(unit)
+                    registered_ids.add(unit['id'])
+
+        cohort_exam_count = defaultdict(int)
+        cohort_unit_total = defaultdict(int)
+        for unit in bs_units:
+            for bs in unit['branch_sems']:
+                cohort_unit_total[bs] += 1
+
+        # ──── Pass 1: Slot 1 Consecutive Packing ────
+        for unit in bs_units:
+            current_exam_idx = max(cohort_exam_count[bs] for bs in unit['branch_sems']) if unit['branch_sems'] else 0
+            if current_exam_idx < num_days:
+                d = current_exam_idx
+                slot_num = 1
+                time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
+
+                if not unit['cohort_mask'] & slot_schedule_map[d][slot_num]:
+                    allowed, overloaded = check_campus_capacity(d, time_slot_str, unit)
+                    if allowed:
+                        record_assignment(unit, d, slot_num, overloaded)
+
+                        slot_schedule_map[d][slot_num] |= unit['cohort_mask']
+                        daily_schedule_map[d] |= unit['cohort_mask']
+                        date_load_tracker[d] += 1
+                        for bs in unit['branch_sems']:
+                            daily_branch_count[d][bs] += 1
+                            cohort_exam_count[bs] += 1
+                        add_to_campus_capacity(d, time_slot_str, unit)
+                        unit['scheduled'] = True
+
+        # ──── Pass 2: Slot 2 Isolated Spreading ────
+        # (passes 2 and 3 only run when that slot is configured)
+        for unit in (bs_units if 2 in time_slots_dict else []):
+            if unit.get('scheduled'): continue
+            current_exam_idx = max(cohort_exam_count[bs] for bs in unit['branch_sems']) if unit['branch_sems'] else 0
+
+            max_total_subjects = max([1] + [cohort_unit_total[bs] for bs in unit['branch_sems']])
+
+            remainder_count = max_total_subjects - num_days
+            r_idx = current_exam_idx - num_days
+            target_day_idx = int(r_idx * num_days / remainder_count) if remainder_count > 0 else 0
+            if target_day_idx >= num_days: target_day_idx = num_days - 1
+
+            valid_days = [d for d in range(num_days) if max(daily_branch_count[d][bs] for bs in unit['branch_sems']) < 2]
+            sorted_days = sorted(valid_days, key=lambda d: (
+                max(daily_branch_count[d][bs] for bs in unit['branch_sems']),
+                abs(d - target_day_idx),
+                date_load_tracker[d]
+            ))
+
+            slot_num = 2
+            time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
+            for d in sorted_days:
+                if not unit['cohort_mask'] & slot_schedule_map[d][slot_num]:
+                    allowed, overloaded = check_campus_capacity(d, time_slot_str, unit)
+                    if allowed:
+                        record_assignment(unit, d, slot_num, overloaded)
+
+                        slot_schedule_map[d][slot_num] |= unit['cohort_mask']
+                        daily_schedule_map[d] |= unit['cohort_mask']
+                        date_load_tracker[d] += 1
+                        for bs in unit['branch_sems']:
+                            daily_branch_count[d][bs] += 1
+                            cohort_exam_count[bs] += 1
+                        add_to_campus_capacity(d, time_slot_str, unit)
+                        unit['scheduled'] = True
+                        break
+
+        # ──── Pass 3: Slot 3 Isolated Exception Spreading ────
+        for unit in (bs_units if 3 in time_slots_dict else []):
+            if unit.get('scheduled'): continue
+            current_exam_idx = max(cohort_exam_count[bs] for bs in unit['branch_sems']) if unit['branch_sems'] else 0
+
+            max_total_subjects = max([1] + [cohort_unit_total[bs] for bs in unit['branch_sems']])
+
+            remainder_count = max_total_subjects - 2 * num_days
+            r_idx = current_exam_idx - 2 * num_days
+            target_day_idx = int(r_idx * num_days / remainder_count) if remainder_count > 0 else 0
+            if target_day_idx >= num_days: target_day_idx = num_days - 1
+
+            valid_days = [d for d in range(num_days) if max(daily_branch_count[d][bs] for bs in unit['branch_sems']) < 3]
+            sorted_days = sorted(valid_days, key=lambda d: (
+                max(daily_branch_count[d][bs] for bs in unit['branch_sems']),
+                abs(d - target_day_idx),
+                date_load_tracker[d]
+            ))
+
+            slot_num = 3
+            time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
+            for d in sorted_days:
+                if not unit['cohort_mask'] & slot_schedule_map[d][slot_num]:
+                    allowed, overloaded = check_campus_capacity(d, time_slot_str, unit)
+                    if allowed:
+                        record_assignment(unit, d, slot_num, overloaded)
+
+                        slot_schedule_map[d][slot_num] |= unit['cohort_mask']
+                        daily_schedule_map[d] |= unit['cohort_mask']
+                        date_load_tracker[d] += 1
+                        for bs in unit['branch_sems']:
+                            daily_branch_count[d][bs] += 1
+                            cohort_exam_count[bs] += 1
+                        add_to_campus_capacity(d, time_slot_str, unit)
+                        unit['scheduled'] = True
+                        break
+
+        # ──── Pass 4 & 5: Emergency Fallback Triggers ────
+        def get_cohort_daily_max(d):
+            """Returns the highest exam count already scheduled on day d
+            across any single branch-sem cohort (0 if none scheduled yet)."""
+            counts = daily_branch_count[d]
+            if not counts:
+                return 0
+            return max(counts.values())
+
+        for unit in bs_units:
+            if unit.get('scheduled'): continue
+            for pass_max in [3, 99]:
+                for slot_num in [s for s in (1, 2, 3) if s in time_slots_dict]:
+                    time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
+                    for d in range(num_days):
+                        if get_cohort_daily_max(d) < pass_max:
+                            if not unit['cohort_mask'] & slot_schedule_map[d][slot_num]:
+                                allowed, overloaded = check_campus_capacity(d, time_slot_str, unit)
+                                if allowed:
+                                    record_assignment(unit, d, slot_num, False)
+                                    slot_schedule_map[d][slot_num] |= unit['cohort_mask']
+                                    daily_schedule_map[d] |= unit['cohort_mask']
+                                    unit['scheduled'] = True
+                                    break
+                    if unit.get('scheduled'): break
+                if unit.get('scheduled'): break
+
+        unscheduled_groups = [u for u in bs_units if not u.get('scheduled')]
+        return materialize_assignments(), unscheduled_groups
+
+    # ══════════════════════════════════════════════════════════════════
+    # STANDARD COLLEGE GENERATION PARADIGM (UNCHANGED)
+    # ══════════════════════════════════════════════════════════════════
+    def attempt_schedule(unit, require_1_day_gap=False):
+        preferred_slot_num = preferred_slot(unit, time_slots_dict)
+        is_two_credit = unit.get('is_two_credit', False)
+        slots_to_try = [preferred_slot_num] + [s for s in sorted(time_slots_dict.keys()) if s != preferred_slot_num]
+
+        for d in range(num_days):
+            if unit['cohort_mask'] & daily_schedule_map[d]: continue
+
+            apply_gap = (IS_LAW_SCHOOL or require_1_day_gap) and not is_two_credit
+            if apply_gap:
+                prev_d, next_d = calendar.prev_adjacent[d], calendar.next_adjacent[d]
+                if prev_d is not None and unit['cohort_mask'] & daily_schedule_map[prev_d]: continue
+                if next_d is not None and unit['cohort_mask'] & daily_schedule_map[next_d]: continue
+
+            for slot_num in slots_to_try:
+                time_slot_str = get_time_slot_from_number(slot_num, time_slots_dict)
+                allowed, overloaded = check_campus_capacity(d, time_slot_str, unit)
+                if allowed:
+                    record_assignment(unit, d, slot_num, overloaded)
+                    daily_schedule_map[d] |= unit['cohort_mask']
+                    if slot_num in slot_schedule_map[d]:
+                        slot_schedule_map[d][slot_num] |= unit['cohort_mask']
+                    date_load_tracker[d] += 1
+                    for bs in unit['branch_sems']: daily_branch_count[d][bs] += 1
+                    add_to_campus_capacity(d, time_slot_str, unit)
+                    return True
+        return False
+
+    unscheduled_groups = []
+    scheduled_ids = set()
+    branch_sem_map = {}
+    all_units = common_units_priority + common_units_normal + individual_units
+
+    for unit in all_units:
+        for bs in unit['branch_sems']:
+            if bs not in branch_sem_map:
+                score = 0
+                if "MBA TECH" in bs.upper() and ("VIII" in bs.upper() or " 8" in bs or "X" in bs.upper() or " 10" in bs): score = 1000000
+                branch_sem_map[bs] = {'score': score, 'common': [], 'individual': []}
+            if unit['type'] == 'COMMON':
+                if unit not in branch_sem_map[bs]['common']: branch_sem_map[bs]['common'].append(unit)
+            else:
+                if unit not in branch_sem_map[bs]['individual']: branch_sem_map[bs]['individual'].append(unit)
+            branch_sem_map[bs]['score'] += unit['student_count']
+
+    sorted_bsems = sorted(branch_sem_map.keys(), key=lambda x: branch_sem_map[x]['score'], reverse=True)
+    priority_ids = set(u['id'] for u in common_units_priority)
+
+    for bs in sorted_bsems:
+        branch_sem_map[bs]['common'].sort(key=lambda x: (1 if x['id'] in priority_ids else 0, x['student_count']), reverse=True)
+        for unit in branch_sem_map[bs]['common']:
+            if unit['id'] not in scheduled_ids:
+                if not attempt_schedule(unit, require_1_day_gap=True): unscheduled_groups.append(unit)
+                scheduled_ids.add(unit['id'])
+
+    for bs in sorted_bsems:
+        branch_sem_map[bs]['individual'].sort(key=lambda x: x['student_count'], reverse=True)
+        for unit in branch_sem_map[bs]['individual']:
+            if unit['id'] not in scheduled_ids:
+                if not attempt_schedule(unit, require_1_day_gap=False): unscheduled_groups.append(unit)
+                scheduled_ids.add(unit['id'])
+
+    return materialize_assignments(), unscheduled_groups
+
+
+def schedule_subjects(df, holidays, base_date, end_date, time_slots_dict, max_capacity, profile, enforce_cap=True,
+                      run_pass=None):
+    """
+    Schedule every non-OE subject in df within [base_date, end_date].
+
+    Args:
+        df (DataFrame): Non-elective frame returned by read_timetable
+        holidays (set): Holiday dates (datetime.date)
+        base_date (datetime): First exam day
+        end_date (datetime): Last exam day
+        time_slots_dict (dict): Configured time slots
+        max_capacity (int): Mumbai student limit per date/slot
+        profile (dict): Output of get_college_profile()
+        enforce_cap (bool): Leave units unscheduled rather than overload Mumbai
+        run_pass (callable): Placement routine with execute_pass()'s signature;
+                             defaults to the greedy passes
+
+    Returns:
+        tuple: (scheduled DataFrame, list of unscheduled units)
+    """
+    run_pass = run_pass or execute_pass
+    core_valid_dates, _ = get_core_exam_dates(df, base_date, end_date, holidays)
+    units = build_scheduling_units(df, profile)
+    if units is None:
+        return df, []
+    return run_pass(df, units, core_valid_dates, time_slots_dict, max_capacity, profile, enforce_cap)
+
+
+def schedule_input_key(df, holidays, base_date, end_date, time_slots_dict, max_capacity, profile, mode="greedy"):
+    """Stable digest of everything that determines a schedule_subjects() result."""
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(repr((
+        list(df.columns), sorted(holidays), base_date, end_date,
+        sorted((k, v['start'], v['end']) for k, v in time_slots_dict.items()),
+        max_capacity, profile['name'], mode,
+    )).encode())
+    return digest.hexdigest()
+
+def probe_capacity_schedules(df, holidays, base_date, end_date, time_slots_dict, max_capacity, profile, run_pass=None):
+    """
+    Run the strict pass and, only if it leaves units behind, the relaxed pass too.
+
+    Both passes share one set of scheduling units, so the caller can ask the
+    user whether to exceed capacity and answer from the returned result
+    without scheduling again.
+
+    Returns:
+        dict: {'strict': (DataFrame, unscheduled units),
+               'relaxed': (DataFrame, unscheduled units) or None when the
+                          strict pass placed everything}
+    """
+    run_pass = run_pass or execute_pass
+    core_valid_dates, _ = get_core_exam_dates(df, base_date, end_date, holidays)
+    units = build_scheduling_units(df, profile)
+    if units is None:
+        return {'strict': (df, []), 'relaxed': None}
+
+    strict = run_pass(df, units, core_valid_dates, time_slots_dict, max_capacity, profile, enforce_cap=True)
+    relaxed = None
+    if strict[1]:
+        relaxed = run_pass(df, units, core_valid_dates, time_slots_dict, max_capacity, profile, enforce_cap=False)
+    return {'strict': strict, 'relaxed': relaxed}
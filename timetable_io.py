@@ -0,0 +1,383 @@
+"""
+Workbook Ingestion
+==================
+Fast loading of the registration workbook behind read_timetable.
+
+• python-calamine (pandas engine="calamine") is used when it is installed; it
+  parses a sheet several times faster than openpyxl.
+• Without it, openpyxl streams the first sheet in read-only mode, reading cell
+  values only.
+• Either way only the requested columns are materialized, and any failure
+  falls back to the plain pd.read_excel(engine="openpyxl") path.
+• parse_input turns the sheet into the scheduler's frames without touching
+  Streamlit, so batch mode can run it in worker processes.
+• ParseCache keeps recent parse results by content hash, so a rerun on the
+  same upload skips the workbook entirely. It is shared by every session of
+  the server process and hands out copy-on-write views of one stored copy.
+"""
+
+import hashlib
+import importlib.util
+import threading
+from collections import OrderedDict
+
+import openpyxl
+import pandas as pd
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WORKBOOK READER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+CALAMINE_AVAILABLE = importlib.util.find_spec("python_calamine") is not None
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _unique_headers(header):
+    """Header names as pd.read_excel would label them (Unnamed: n, X.1 for repeats)."""
+    names, seen = [], {}
+    for i, name in enumerate(header):
+        name = f"Unnamed: {i}" if name is None or name == "" else name
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _stream_openpyxl(source, wanted):
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        names = _unique_headers(header)
+        keep = [i for i, name in enumerate(names) if wanted is None or str(name).strip() in wanted]
+
+        records = []
+        for row in rows:
+            # Blank rows are skipped, as pd.read_excel does
+            if all(v is None or v == "" for v in row):
+                continue
+            records.append([None if i >= len(row) or row[i] == "" else row[i] for i in keep])
+    finally:
+        workbook.close()
+
+    frame = pd.DataFrame(records, columns=[names[i] for i in keep], dtype=object)
+    # Integral floats come back as ints, matching pandas' openpyxl reader
+    for col in frame.columns:
+        frame[col] = frame[col].map(lambda v: int(v) if isinstance(v, float) and v.is_integer() else v)
+    return frame.infer_objects()
+
+
+def read_input_sheet(source, keep_columns=None):
+    """
+    Read the first sheet of an .xlsx workbook.
+
+    Args:
+        source: File path or binary file object (e.g. a Streamlit upload)
+        keep_columns (iterable): Headers to keep, compared after stripping
+                                 whitespace; None keeps every column
+
+    Returns:
+        DataFrame: The kept columns under their original headers
+    """
+    wanted = None if keep_columns is None else {str(c).strip() for c in keep_columns}
+    readers = []
+    if CALAMINE_AVAILABLE:
+        usecols = None if wanted is None else (lambda name: str(name).strip() in wanted)
+        readers.append(lambda: pd.read_excel(source, engine="calamine", usecols=usecols))
+    readers.append(lambda: _stream_openpyxl(source, wanted))
+
+    for reader in readers:
+        _rewind(source)
+        try:
+            return reader()
+        except Exception:
+            continue
+
+    _rewind(source)
+    return pd.read_excel(source, engine="openpyxl")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INPUT PARSING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Workbook headers accepted for each internal column
+COLUMN_MAPPING = {
+    "Program": "Program", "Programme": "Program", 
+    "Stream": "Stream", "Specialization": "Stream", "Branch": "Stream",
+    "Current Session": "Semester", "Academic Session": "Semester", "Session": "Semester", "Semester": "Semester",
+    "Module Description": "SubjectName", "Subject Name": "SubjectName", "Subject Description": "SubjectName",
+    "Module Abbreviation": "ModuleCode", "Module Code": "ModuleCode", "Subject Code": "ModuleCode", "Code": "ModuleCode",
+    "Campus Name": "Campus", "Campus": "Campus", "School Name": "Campus", "Location": "Campus",
+    "Difficulty Score": "Difficulty", "Difficulty": "Difficulty",
+    "Exam Duration": "Exam Duration", "Duration": "Exam Duration",
+    "Student count": "StudentCount", "Student Count": "StudentCount", "Enrollment": "StudentCount", "Count": "StudentCount",
+    "CM group": "CMGroup", "CM Group": "CMGroup", "cm group": "CMGroup", 
+    "CMGroup": "CMGroup", "CM_Group": "CMGroup", "Common Module Group": "CMGroup",
+    "Exam Slot Number": "ExamSlotNumber", "exam slot number": "ExamSlotNumber",
+    "ExamSlotNumber": "ExamSlotNumber", "Exam_Slot_Number": "ExamSlotNumber", "Slot Number": "ExamSlotNumber",
+    "Common across sems": "CommonAcrossSems", "CommonAcrossSems": "CommonAcrossSems",
+    "Is Common": "IsCommon", "IsCommon": "IsCommon"
+}
+# Read as-is by the cleaning in parse_input or by save_verification_excel
+PASSTHROUGH_COLUMNS = ["Category", "OE", "Circuit", "Is_Circuit", "CircuitBranch",
+                       "Current Academic Session", "Exam_Duration", "Student_count", "School_Name"]
+# CM group given to each MBA Tech Sem VIII / X "within" subject
+PRIORITY_CM_PREFIX = "MBATECH_PRIORITY_"
+
+
+class MissingColumnsError(ValueError):
+    """The workbook lacks one or more of the columns scheduling cannot do without."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        super().__init__(f"Missing Required Columns: {', '.join(self.columns)}")
+
+
+def parse_input(source):
+    """
+    Read and clean a registration workbook into the frames the scheduler uses.
+
+    Has no Streamlit dependency, so it also runs in worker processes (see
+    timetable_batch); read_timetable wraps it with the parse cache and the
+    in-app messages.
+
+    Args:
+        source: File path or binary file object
+
+    Returns:
+        tuple: (non-OE frame, OE frame, full cleaned frame)
+
+    Raises:
+        MissingColumnsError: A required column is absent
+    """
+    # Only the columns used downstream are materialized
+    df = read_input_sheet(source, keep_columns=list(COLUMN_MAPPING) + PASSTHROUGH_COLUMNS)
+
+    # --- Clean Headers ---
+    df.columns = df.columns.str.strip()
+
+    df = df.rename(columns=COLUMN_MAPPING)
+
+    # 2. Check Required Cols
+    required_cols = ["Program", "Semester", "ModuleCode", "SubjectName"]
+    missing_required = [col for col in required_cols if col not in df.columns]
+    if missing_required:
+        raise MissingColumnsError(missing_required)
+
+    # --- CRITICAL FIX FOR MERGED CELLS ---
+    cols_to_fill = ["Program", "Semester"]
+    if "Stream" in df.columns: cols_to_fill.append("Stream")
+
+    for col in cols_to_fill:
+        if col in df.columns:
+            df[col] = df[col].ffill()
+
+    # 3. Clean Strings (Now removes non-breaking spaces \xa0)
+    string_columns = ["Program", "Stream", "SubjectName", "ModuleCode", "Campus", "Semester"]
+    for col in string_columns:
+        if col in df.columns:
+            df[col] = df[col].fillna("").astype(str).str.replace(r'\xa0', ' ', regex=True).str.strip()
+
+    # 4. Clean CMGroup (STRICT "0" HANDLING)
+    if "CMGroup" in df.columns:
+        df["CMGroup"] = df["CMGroup"].fillna("").astype(str).str.replace(r'(?s)\..*', '', regex=True).str.strip()
+        df.loc[df["CMGroup"].isin(["0", "nan", "NaN", "None", ""]), "CMGroup"] = ""
+    else:
+        df["CMGroup"] = ""
+
+    # 5. Clean Numerics
+    numeric_columns = ["Exam Duration", "StudentCount", "Difficulty"]
+    for col in numeric_columns:
+        if col in df.columns:
+            if col == "Exam Duration":
+                # Preserve whether the value was genuinely provided before the
+                # fallback fill below overwrites blanks. Additive column only —
+                # does not change existing fillna behavior for any college.
+                df["Exam Duration_WasProvided"] = pd.to_numeric(df[col], errors='coerce').notna()
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0 if col != "Exam Duration" else 3)
+
+    # 6. Branch Creation
+    # "Program - Stream", or just the program when the stream is blank or repeats it
+    if "Stream" in df.columns:
+        keep_program = (df["Stream"] == "") | (df["Stream"] == df["Program"])
+        df["Branch"] = df["Program"].where(keep_program, df["Program"] + " - " + df["Stream"])
+    else:
+        df["Branch"] = df["Program"]
+    df["Subject"] = df["SubjectName"] + " (" + df["ModuleCode"] + ")"
+
+    # Defaults
+    if "ExamSlotNumber" not in df.columns: df["ExamSlotNumber"] = 0
+    else: df["ExamSlotNumber"] = pd.to_numeric(df["ExamSlotNumber"], errors='coerce').fillna(0).astype(int)
+
+    if "Category" not in df.columns: df["Category"] = "COMP"
+
+    # 7. Clean OE Column
+    if "OE" not in df.columns: 
+        df["OE"] = ""
+    else: 
+        df["OE"] = df["OE"].fillna("").astype(str).replace(['nan', 'NaN', 'None'], '').str.strip()
+
+    # 8. Read and clean IsCommon column
+    if "IsCommon" not in df.columns:
+        df["IsCommon"] = "NO"
+    else:
+        df["IsCommon"] = df["IsCommon"].fillna("NO").astype(str).str.strip()
+
+    # Reset/Initialize CommonAcrossSems
+    if "CommonAcrossSems" not in df.columns:
+        df["CommonAcrossSems"] = False
+    else:
+        df["CommonAcrossSems"] = df["CommonAcrossSems"].fillna(False).astype(bool)
+
+    # ---------------------------------------------------------------
+    # MBA TECH SPECIAL LOGIC
+    # ---------------------------------------------------------------
+    sem_upper_series = df["Semester"].astype(str).str.strip().str.upper()
+    target_sem_mask = (
+        sem_upper_series.str.endswith("VIII") | sem_upper_series.str.endswith(" 8") | (sem_upper_series == "8") |
+        sem_upper_series.str.endswith("X")    | sem_upper_series.str.endswith(" 10") | (sem_upper_series == "10") |
+        (sem_upper_series == "SEM VIII") | (sem_upper_series == "SEM X")
+    )
+    is_common_within_mask = df["IsCommon"].astype(str).str.strip().str.upper() == "WITHIN"
+
+    priority_mask = target_sem_mask & is_common_within_mask
+
+    if priority_mask.any():
+        # One synthetic CM group per (Semester, ModuleCode)
+        df_priority_target = df.loc[priority_mask, ["Semester", "ModuleCode"]].astype(str)
+        df.loc[priority_mask, "CMGroup"] = (
+            PRIORITY_CM_PREFIX + df_priority_target["Semester"].str.strip().str.upper().str.replace(' ', '_')
+            + "_" + df_priority_target["ModuleCode"].str.strip()
+        )
+
+    is_true_oe_mask = (df["OE"] != "")
+
+    df_ele = df[is_true_oe_mask]
+    df_non = df[~is_true_oe_mask]
+
+    # Use raw Program/Stream for Main/Sub branch
+    for d in [df_non, df_ele]:
+        if not d.empty:
+            d["MainBranch"] = d["Program"]
+            d["SubBranch"] = d["Stream"]
+            d.loc[(d["SubBranch"] == "") | (d["SubBranch"].isna()) | (d["SubBranch"] == "nan"), "SubBranch"] = d["MainBranch"]
+
+    # Long, heavily repeated labels are kept as categoricals. Each column
+    # gets one sorted set of categories shared by all three frames, so
+    # df_non and df_ele concatenate without falling back to strings and
+    # groupby order stays alphabetical.
+    for col in ["Program", "Stream", "Branch", "Semester", "Campus", "ModuleCode"]:
+        if col in df.columns:
+            col_dtype = pd.CategoricalDtype(sorted(df[col].unique()))
+            for frame in (df, df_non, df_ele):
+                if col in frame.columns:
+                    frame[col] = frame[col].astype(col_dtype)
+
+    cols = ["MainBranch", "SubBranch", "Branch", "Semester", "Subject", "Category", "OE", 
+            "Exam Date", "Time Slot", "Exam Duration", "Exam Duration_WasProvided", "StudentCount", "ModuleCode", 
+            "CMGroup", "ExamSlotNumber", "Program", "CommonAcrossSems", "IsCommon", "Campus", "Difficulty"]
+
+    for c in cols:
+        if c not in df_non.columns: df_non[c] = None
+        if not df_ele.empty and c not in df_ele.columns: df_ele[c] = None
+
+    return df_non[cols], df_ele, df
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PARSE CACHE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _source_bytes(source):
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        source.seek(0)
+        data = source.read()
+        source.seek(0)
+        return data
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def _copy_on_write():
+    """Whether pandas copies shared frame data on first write (always, from pandas 3.0)."""
+    return int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+
+def _handout(frames):
+    """Copies of cached frames for a caller: shallow under copy-on-write, deep otherwise."""
+    deep = not _copy_on_write()
+    return tuple(None if f is None else f.copy(deep=deep) for f in frames)
+
+
+class ParseCache:
+    """
+    In-memory LRU of parsed workbooks, keyed by a hash of the file bytes.
+
+    Streamlit reruns the script on every click, so the same upload would
+    otherwise be parsed again for Generate, the capacity popup answer and
+    Regenerate. Entries are tuples of frames.
+
+    The cache is process-wide: sessions that upload the same bytes for the
+    same school share an entry, and a lock guards it against concurrent
+    sessions. put() and get() hand out shallow copies of the stored frames,
+    which copy-on-write keeps independent for ordinary pandas edits (column
+    assignment, .loc, in-place methods). Callers must not write into the
+    underlying NumPy arrays (.values, .to_numpy()), which would change the
+    entry for every session.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source, *context):
+        """SHA-256 of the workbook bytes plus anything else the parse depends on."""
+        digest = hashlib.sha256(_source_bytes(source))
+        digest.update(repr(context).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            frames = self._entries.get(key)
+            if frames is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return _handout(frames)
+
+    def put(self, key, frames):
+        """Store frames under key, evicting the least recently used entry when full; returns copies of frames."""
+        frames = tuple(frames)
+        with self._lock:
+            self._entries[key] = frames
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return _handout(frames)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Lives here rather than in app.py: Streamlit re-executes the app script on
+# every rerun, but imported modules (and this cache) persist in the process.
+PARSE_CACHE = ParseCache()
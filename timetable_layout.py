@@ -0,0 +1,151 @@
+"""
+PDF Text Layout
+===============
+Line wrapping for the PDF table cells of both apps, without asking FPDF to
+measure every candidate line.
+
+• Widths come from a per-font glyph-width table: the character widths FPDF
+  itself uses for its core fonts, loaded once per (family, style). A line's
+  width is plain arithmetic on those and equals what get_string_width would
+  return, without switching the document's font back and forth (FPDF writes
+  every switch into the open page).
+• Wrapped cells are kept in an LRU bounded to WRAP_CACHE_ENTRIES, with hit and
+  miss counts. It lives in this module so it is shared across Streamlit reruns
+  and sessions, but no longer grows for the life of the server.
+• The cache key holds the font family and size as well as the style, so a
+  text wrapped at one size is never reused at another.
+• Bracketed exam times such as "[10:00 AM - 1:00 PM]" stay whole and are
+  measured in bold, as print_row_custom draws them; "<hr>" is kept as its own
+  line, where the cell is divided between subjects.
+"""
+
+import re
+from collections import OrderedDict
+from functools import lru_cache
+
+from fpdf import FPDF
+
+TIME_PATTERN = re.compile(r'([\[\(]\s*\d{1,2}:\d{2}\s*[AP]M\s*-\s*\d{1,2}:\d{2}\s*[AP]M\s*[\]\)])', re.IGNORECASE)
+
+# A few thousand distinct cells make up even the full-university PDF
+WRAP_CACHE_ENTRIES = 20000
+
+
+@lru_cache(maxsize=None)
+def glyph_widths(family, style):
+    """
+    Character widths of an FPDF core font, in thousandths of the font size.
+
+    Args:
+        family (str): Font family as FPDF stores it (e.g. "times")
+        style (str): "", "B", "I" or "BI"
+
+    Returns:
+        dict: Character -> width, from FPDF's own font metrics
+    """
+    probe = FPDF()
+    probe.set_font(family, style)
+    return probe.current_font['cw']
+
+
+def string_width(text, family, style, font_size):
+    """Width of text in user units, exactly as pdf.get_string_width measures it at font_size (pdf.font_size)."""
+    widths = glyph_widths(family, style)
+    return sum(widths.get(ch, 0) for ch in text) * font_size / 1000.0
+
+
+class WrapCache:
+    """In-memory LRU of wrapped cell texts, with hit/miss counts."""
+
+    def __init__(self, max_entries=WRAP_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        lines = self._entries.get(key)
+        if lines is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return lines
+
+    def put(self, key, lines):
+        """Store lines under key, evicting the least recently used entry when full; returns lines."""
+        self._entries[key] = lines
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return lines
+
+    def stats(self):
+        """Entries held, the limit, and hits/misses since the process started."""
+        return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        self._entries.clear()
+
+
+WRAP_CACHE = WrapCache()
+
+
+def wrap_text(pdf, text, col_width):
+    """
+    Split a cell's text into lines that fit col_width in pdf's current font.
+
+    Args:
+        pdf (FPDF): Document whose current core font (family, style, size) is
+                    used; it is not modified
+        text (str): Cell text
+        col_width (float): Available width in user units
+
+    Returns:
+        list: Lines, with "<hr>" entries between subjects; callers must not
+              modify it (it is shared through WRAP_CACHE)
+    """
+    family, style, font_size = pdf.font_family, pdf.font_style, pdf.font_size
+    cache_key = (text, col_width, family, style, font_size)
+    lines = WRAP_CACHE.get(cache_key)
+    if lines is not None:
+        return lines
+
+    parts = TIME_PATTERN.split(str(text))
+    tokens = []
+    for i, p in enumerate(parts):
+        if i % 2 == 1:
+            tokens.append(p)
+        else:
+            p = p.replace("<hr>", " <hr> ")
+            tokens.extend(p.split())
+
+    lines = []
+    current_line = ""
+    for token in tokens:
+        if token == "<hr>":
+            if current_line:
+                lines.append(current_line)
+                current_line = ""
+            lines.append("<hr>")
+            continue
+
+        test_line = token if not current_line else current_line + " " + token
+
+        test_w = 0
+        for pt in TIME_PATTERN.split(test_line):
+            if not pt: continue
+            test_w += string_width(pt, family, 'B' if TIME_PATTERN.match(pt) else style, font_size)
+
+        if test_w <= col_width:
+            current_line = test_line
+        else:
+            if current_line:
+                lines.append(current_line)
+            current_line = token
+
+    if current_line:
+        lines.append(current_line)
+
+    return WRAP_CACHE.put(cache_key, lines)
@@ -0,0 +1,96 @@
+"""
+Parallel PDF Rendering
+======================
+Renders business-school timetables, one PDF document per program and
+trimester, in a process pool.
+
+• Each worker imports the app once and renders one sheet record per task with
+  app.render_timetable_pdfs, so every document is exactly what a serial run
+  draws. The caller merges the results in sheet order (file names are made
+  unique there, as in the serial loop) and ZIPs them as before.
+• The renderer reads a few Streamlit session values (college, time slots, the
+  full timetable for the DAY & DATE tables); they are copied into each worker
+  when it starts.
+• Problems a worker hits come back as messages for the caller to show, since
+  a worker's st.warning has no page to go to.
+• Landscape timetables are one document with "page N of M" numbering that runs
+  across every sheet, so they stay serial.
+"""
+
+import importlib
+import logging
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# Session values the PDF renderer reads
+PDF_CONTEXT_KEYS = ('selected_college', 'time_slots', 'timetable_data', 'academic_year_str', 'period_label')
+
+# A worker takes about 4s to start (importing the app, decoding the logo once)
+# and a program document about 0.04s to draw, so each worker needs this many
+# documents before it saves time
+MIN_PDFS_PER_WORKER = 120
+
+
+def pdf_workers(job_count, max_workers=None):
+    """
+    Worker processes worth starting for job_count documents.
+
+    Args:
+        job_count (int): Documents to render
+        max_workers (int): Upper limit; all CPUs when not given
+
+    Returns:
+        int: 1 (render serially) or the number of workers
+    """
+    if multiprocessing.current_process().daemon:
+        return 1  # daemonic pool workers (benchmark_memory) cannot start children
+    return max(1, min(max_workers or os.cpu_count() or 1, job_count // MIN_PDFS_PER_WORKER))
+
+
+def _init_worker(context):
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)  # Streamlit's bare-mode notices
+    import streamlit as st
+    importlib.import_module("app")  # loaded once per worker, before its first sheet
+
+    st.session_state.update(context)
+
+
+def render_sheet(sheet, declaration_date):
+    """
+    Render one build_timetable_sheets record in a worker.
+
+    Returns:
+        tuple: (list of (file name, PDF bytes), list of problem messages)
+    """
+    import app
+
+    problems = []
+    outputs = app.render_timetable_pdfs([sheet], declaration_date=declaration_date, max_workers=1,
+                                        errors=problems)
+    return list(outputs.items()), problems
+
+
+def render_sheets_parallel(sheets, declaration_date, context, workers):
+    """
+    Run render_sheet for every record in a spawned process pool.
+
+    Args:
+        sheets (list): build_timetable_sheets records to render
+        declaration_date (date): Printed in each header, or None
+        context (dict): Session values (PDF_CONTEXT_KEYS) for the workers
+        workers (int): Worker processes
+
+    Returns:
+        list: render_sheet results, in the order of sheets
+    """
+    # Spawned rather than forked: the Streamlit server runs threads, which a
+    # forked child would inherit in an undefined state.
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                             initializer=_init_worker, initargs=(context,)) as pool:
+        return list(pool.map(render_sheet, sheets, repeat(declaration_date),
+                             chunksize=max(1, len(sheets) // (4 * workers))))
@@ -0,0 +1,353 @@
+"""
+Timetable Pipeline
+==================
+Everything one "Generate" click does between reading the workbook and writing
+the outputs, without Streamlit, so the app and the command line run the very
+same steps.
+
+• generate_timetable() schedules the core subjects (strict first, relaxed only
+  when that leaves subjects out and overload is allowed), puts the Open
+  Electives on the reserved last days, splits the result by semester, fills
+  gaps and, in local-search mode, moves OE groups; one CapacityLedger follows
+  every step and gives the final Mumbai report.
+• The app asks the user before exceeding capacity, so it schedules the core
+  subjects itself and hands the result in; the command line and the
+  multi-school batch let generate_timetable() do it from the overload setting.
+• In a batch, base_ledger holds the seats of the schools scheduled earlier;
+  every step (placement, gap filling, OE moves) works around them.
+• Placement methods are named "greedy", "search" and "solver"; the per-pass
+  time limits default to the values the sidebar starts from.
+• Nothing is printed: counts and move logs come back in the result for the
+  caller to show.
+"""
+
+from datetime import datetime
+from functools import partial
+
+import pandas as pd
+
+from timetable_engine import (
+    CapacityLedger, DATE_FORMAT, build_scheduling_units, campus_keys, execute_pass, get_calendar,
+    get_core_exam_dates, get_first_valid_days, get_valid_dates_in_range
+)
+from timetable_search import improve_oe_groups, search_pass
+from timetable_solver import DEFAULT_TIME_LIMIT as SOLVER_TIME_LIMIT, SOLVER_AVAILABLE, solve_pass
+
+PLACEMENT_MODES = ("greedy", "search", "solver")
+
+# Seconds per placement pass (strict and relaxed each get this much)
+PASS_TIME_LIMITS = {"search": 10, "solver": SOLVER_TIME_LIMIT}
+
+# OE groups are few and only move within the OE days, so their search is capped
+OE_SEARCH_BUDGET = 5
+
+
+def placement_pass(mode="greedy", time_limit=None):
+    """
+    Placement routine for a named method.
+
+    Args:
+        mode (str): "greedy", "search" or "solver"; the solver falls back to
+                    greedy when OR-Tools is not installed
+        time_limit (int): Seconds per pass for search/solver; the
+                          PASS_TIME_LIMITS default when not given
+
+    Returns:
+        tuple: (run_pass for schedule_subjects / schedule_core, None for the
+               greedy passes; mode key "greedy", "search:<s>" or "solver:<s>")
+    """
+    if mode == "solver" and not SOLVER_AVAILABLE:
+        mode = "greedy"
+    if mode == "greedy":
+        return None, mode
+    time_limit = time_limit or PASS_TIME_LIMITS[mode]
+    if mode == "solver":
+        return partial(solve_pass, time_limit=time_limit), f"solver:{time_limit}"
+    return partial(search_pass, time_budget=time_limit), f"search:{time_limit}"
+
+
+def schedule_core(df_non, holidays, base_date, end_date, time_slots, max_capacity, profile,
+                  allow_overload=False, run_pass=None, base_ledger=None, units=None):
+    """
+    Schedule the non-OE subjects, relaxing capacity only when strict leaves units out.
+
+    base_ledger (seats taken by other timetables) is handed to every pass and
+    not modified; units, when already built from df_non, are reused.
+
+    Returns:
+        tuple: (scheduled DataFrame, list of unscheduled units, capacity mode
+               "NATURAL_FIT", "NO" or "YES" as the capacity popup records it)
+    """
+    run_pass = run_pass or execute_pass
+    core_valid_dates, _ = get_core_exam_dates(df_non, base_date, end_date, holidays)
+    if units is None:
+        units = build_scheduling_units(df_non, profile)
+    if units is None:
+        return df_non, [], "NATURAL_FIT"
+
+    pass_args = (df_non, units, core_valid_dates, time_slots, max_capacity, profile)
+    scheduled, unscheduled = run_pass(*pass_args, enforce_cap=True, base_ledger=base_ledger)
+    if not unscheduled:
+        return scheduled, [], "NATURAL_FIT"
+    if not allow_overload:
+        return scheduled, unscheduled, "NO"
+    scheduled, unscheduled = run_pass(*pass_args, enforce_cap=False, base_ledger=base_ledger)
+    return scheduled, unscheduled, "YES"
+
+
+def oe_start_date(base_date, end_date, holidays):
+    """First of the last two valid days of the period, where Open Electives go."""
+    valid = get_valid_dates_in_range(base_date, end_date, holidays)
+    if not valid:
+        return end_date.date()
+    return datetime.strptime(valid[-2] if len(valid) >= 2 else valid[0], DATE_FORMAT).date()
+
+
+def schedule_oe_groups(df_ele, first_day, holidays, time_slots):
+    """
+    Give each OE group its own valid day from first_day on, in the first slot.
+
+    Args:
+        df_ele (DataFrame): Elective frame returned by read_timetable; updated
+                            in place
+        first_day (date): First candidate day (see oe_start_date)
+        holidays (set): Holiday dates (datetime.date)
+        time_slots (dict): Configured time slots
+
+    Returns:
+        tuple: (df_ele, number of OE groups scheduled)
+    """
+    unique_oes = sorted(oe for oe in df_ele['OE'].unique() if pd.notna(oe) and str(oe).strip() != "")
+    if not unique_oes:
+        return df_ele, 0
+
+    oe_days = get_first_valid_days(datetime.combine(first_day, datetime.min.time()), len(unique_oes), holidays)
+    slot_1 = time_slots[1]['start'] + " - " + time_slots[1]['end']
+    for oe_group, exam_day_str in zip(unique_oes, oe_days.strs):
+        mask = df_ele['OE'] == oe_group
+        df_ele.loc[mask, 'Exam Date'] = exam_day_str
+        df_ele.loc[mask, 'Time Slot'] = slot_1
+        df_ele.loc[mask, 'ExamSlotNumber'] = 1
+    return df_ele, len(unique_oes)
+
+
+def fill_schedule_gaps(sem_dict, holidays, ledger, profile):
+    """
+    Move exams from the end of each semester's span into earlier free days.
+
+    Capacity is checked for Mumbai only and CM groups, INTD and OE subjects
+    stay put. Business schools are skipped: gap filling would undo their even
+    spread over the date range.
+
+    Args:
+        sem_dict (dict): Semester -> scheduled DataFrame; updated in place
+        holidays (set): Holiday dates (datetime.date)
+        ledger (CapacityLedger): Holds the loads of sem_dict; updated with
+                                 every move
+        profile (dict): Output of get_college_profile()
+
+    Returns:
+        tuple: (sem_dict, moves made, list of move descriptions)
+    """
+    if profile['is_business_school']:
+        return sem_dict, 0, []
+
+    moves_made = 0
+    optimization_log = []
+    for sem, df in sem_dict.items():
+        scheduled_dates = pd.to_datetime(df[df['Exam Date'].notna()]['Exam Date'], format="%d-%m-%Y", errors='coerce').dropna()
+        if scheduled_dates.empty:
+            continue
+
+        sem_start = min(scheduled_dates)
+        # Valid days of this semester's span; moves only go earlier, so it never grows
+        calendar = get_calendar(sem_start, max(scheduled_dates), holidays)
+
+        # Ensure CMGroup column handles nans/empty strings correctly for boolean indexing
+        cm_col = df['CMGroup'].fillna("").astype(str).str.strip().replace(["0", "0.0", "nan"], "")
+
+        candidates = df[
+            (df['Exam Date'].notna()) &
+            (df['Category'] != 'INTD') &
+            (df['OE'].isna() | (df['OE'] == "")) &
+            (cm_col == "") & # Only move subjects that do NOT have a CM Group
+            (pd.to_datetime(df['Exam Date'], format="%d-%m-%Y") > sem_start)
+        ].sort_values('Exam Date', ascending=False)
+
+        # (SubBranch, Exam Date) -> number of exams, kept in step with every move
+        # so each conflict probe is a dict lookup instead of a frame scan
+        occupancy = df.groupby(['SubBranch', 'Exam Date']).size().to_dict()
+        campus_of = campus_keys(df)
+
+        for idx, subject in candidates.iterrows():
+            current_date_str = subject['Exam Date']
+            current_day = calendar.first_on_or_after(datetime.strptime(current_date_str, "%d-%m-%Y"))
+
+            # 2-credit subjects (Difficulty == 0) bypass the alternate-day rule
+            diff_val = subject.get('Difficulty', -1)
+            try:
+                is_two_credit = (float(diff_val) == 0.0)
+            except (TypeError, ValueError):
+                is_two_credit = False
+
+            # Try to find an earlier gap (valid days only: no holidays or Sundays)
+            for check_day in range(len(calendar) if current_day is None else current_day):
+                check_date_str = calendar.strs[check_day]
+
+                # Student conflict (same branch, same day)
+                sub_branch = subject['SubBranch']
+                conflict_found = occupancy.get((sub_branch, check_date_str), 0) > 0
+
+                # Law school alternate-day rule. Exams only sit on valid days,
+                # so a neighbouring calendar day outside the calendar holds
+                # none of this semester's exams.
+                if not conflict_found and profile['is_law_school'] and not is_two_credit:
+                    prev_day, next_day = calendar.prev_adjacent[check_day], calendar.next_adjacent[check_day]
+
+                    busy_prev = prev_day is not None and occupancy.get((sub_branch, calendar.strs[prev_day]), 0) > 0
+                    busy_next = next_day is not None and occupancy.get((sub_branch, calendar.strs[next_day]), 0) > 0
+
+                    if busy_prev or busy_next:
+                        conflict_found = True
+
+                if not conflict_found:
+                    # Capacity per campus (only Mumbai is capped)
+                    target_time_slot = subject['Time Slot']
+                    campus = campus_of[idx]
+                    # The same unrounded count the ledger summed (CapacityLedger.add_frame)
+                    student_count = pd.to_numeric(subject.get('StudentCount', 0), errors='coerce')
+                    student_count = 0.0 if pd.isna(student_count) else float(student_count)
+
+                    if ledger.fits(check_date_str, target_time_slot, campus, student_count):
+                        sem_dict[sem].at[idx, 'Exam Date'] = check_date_str
+                        occupancy[(sub_branch, current_date_str)] = occupancy.get((sub_branch, current_date_str), 1) - 1
+                        occupancy[(sub_branch, check_date_str)] = occupancy.get((sub_branch, check_date_str), 0) + 1
+                        ledger.move(campus, student_count, current_date_str, target_time_slot,
+                                    check_date_str, target_time_slot)
+
+                        moves_made += 1
+                        optimization_log.append(f"Moved {subject['Subject']} from {current_date_str} to {check_date_str}")
+                        break
+
+    return sem_dict, moves_made, optimization_log
+
+
+def improve_oe_placement(sem_dict, time_slots, max_capacity, profile, enforce_cap=True,
+                         time_budget=OE_SEARCH_BUDGET, ledger=None, base_ledger=None):
+    """
+    Move whole OE groups between the days and slots OE already uses.
+
+    Every other exam is held in place (see improve_oe_groups).
+
+    Args:
+        sem_dict (dict): Semester -> scheduled DataFrame
+        time_slots (dict): Configured time slots
+        max_capacity (int): Mumbai student limit per date/slot
+        profile (dict): Output of get_college_profile()
+        enforce_cap (bool): Never add Mumbai overload
+        time_budget (float): Seconds for the search
+        ledger (CapacityLedger): Updated for the moved rows when given
+        base_ledger (CapacityLedger): Seats already taken by other timetables
+
+    Returns:
+        tuple: (sem_dict, moves made, list of move descriptions)
+    """
+    combined = pd.concat(sem_dict, names=['_Sem', '_Row'])
+    if 'OE' not in combined.columns:
+        return sem_dict, 0, []
+
+    updated, moves = improve_oe_groups(combined, time_slots, max_capacity, profile,
+                                       enforce_cap=enforce_cap, base_ledger=base_ledger, time_budget=time_budget)
+    if not moves:
+        return sem_dict, 0, []
+
+    if ledger is not None:
+        moved = (updated['Exam Date'] != combined['Exam Date']) | (updated['Time Slot'] != combined['Time Slot'])
+        ledger.add_frame(combined[moved], sign=-1)
+        ledger.add_frame(updated[moved])
+
+    sem_dict = {sem: updated.xs(sem, level='_Sem').rename_axis(frame.index.name) for sem, frame in sem_dict.items()}
+    log = [f"Moved OE group {oe} from {old_date} (Slot {old_slot}) to {new_date} (Slot {new_slot})"
+           for oe, old_date, old_slot, new_date, new_slot in moves]
+    return sem_dict, len(moves), log
+
+
+def generate_timetable(df_non, df_ele, holidays, base_date, end_date, time_slots, max_capacity, profile,
+                       mode="greedy", time_limit=None, allow_overload=False, scheduled=None, capacity_mode=None,
+                       base_ledger=None, units=None):
+    """
+    Run the scheduling steps of one generation.
+
+    Args:
+        df_non (DataFrame): Non-elective frame returned by read_timetable
+        df_ele (DataFrame): Elective frame returned by read_timetable, or None
+        holidays (set): Holiday dates (datetime.date)
+        base_date (datetime): First exam day
+        end_date (datetime): Last exam day
+        time_slots (dict): Configured time slots
+        max_capacity (int): Mumbai student limit per date/slot
+        profile (dict): Output of get_college_profile()
+        mode (str): Placement method (see placement_pass)
+        time_limit (int): Seconds per search/solver pass
+        allow_overload (bool): Relax capacity when strict scheduling leaves
+                               subjects out
+        scheduled (DataFrame): Core subjects already scheduled by the caller;
+                               schedule_core() runs when not given
+        capacity_mode (str): Capacity mode of scheduled ("NATURAL_FIT", "NO"
+                             or "YES")
+        base_ledger (CapacityLedger): Seats already taken by other timetables
+                                      (the schools scheduled earlier in a
+                                      batch); not modified
+        units (dict): build_scheduling_units() output for df_non, when the
+                      caller already has it
+
+    Returns:
+        dict: scheduled (core and OE rows as placed), unscheduled (units the
+              core passes left out; empty when scheduled was given),
+              out_of_range (rows left "Out of Range"), sem_dict (semester ->
+              final frame; empty when nothing could be placed), ledger and
+              report (this timetable's final Mumbai loads, without
+              base_ledger), capacity_mode, oe_groups, gap_moves, gap_log,
+              oe_moves and oe_log
+    """
+    unscheduled = []
+    if scheduled is None:
+        run_pass, _ = placement_pass(mode, time_limit)
+        scheduled, unscheduled, capacity_mode = schedule_core(
+            df_non, holidays, base_date, end_date, time_slots, max_capacity, profile, allow_overload, run_pass,
+            base_ledger=base_ledger, units=units)
+
+    result = {'unscheduled': unscheduled, 'capacity_mode': capacity_mode, 'oe_groups': 0, 'gap_moves': 0, 'gap_log': [],
+              'oe_moves': 0, 'oe_log': [], 'sem_dict': {}, 'ledger': CapacityLedger(max_capacity)}
+    has_electives = df_ele is not None and not df_ele.empty
+    if has_electives:
+        df_ele, result['oe_groups'] = schedule_oe_groups(df_ele, oe_start_date(base_date, end_date, holidays),
+                                                         holidays, time_slots)
+        scheduled = pd.concat([scheduled, df_ele], ignore_index=True)
+    result['scheduled'] = scheduled
+    result['out_of_range'] = scheduled[scheduled['Exam Date'] == "Out of Range"]
+
+    placed = scheduled[(scheduled['Exam Date'] != "") & (scheduled['Exam Date'] != "Out of Range")]
+    if placed.empty:
+        result['report'] = result['ledger'].to_frame(max_capacity)
+        return result
+
+    placed = placed.sort_values(["Semester", "Exam Date"], ascending=True)
+    sem_dict = {s: placed[placed["Semester"] == s] for s in sorted(placed["Semester"].unique())}
+
+    # One ledger for the post-processing passes, updated per move; it also
+    # holds the other timetables' seats so no move takes them
+    ledger = CapacityLedger.from_frame(sem_dict, max_capacity)
+    if base_ledger is not None:
+        ledger.add_ledger(base_ledger)
+    sem_dict, result['gap_moves'], result['gap_log'] = fill_schedule_gaps(sem_dict, holidays, ledger, profile)
+    if has_electives and mode == "search":
+        time_budget = min(OE_SEARCH_BUDGET, time_limit or PASS_TIME_LIMITS[mode])
+        sem_dict, result['oe_moves'], result['oe_log'] = improve_oe_placement(
+            sem_dict, time_slots, max_capacity, profile, enforce_cap=capacity_mode != "YES",
+            time_budget=time_budget, ledger=ledger, base_ledger=base_ledger)
+
+    if base_ledger is not None:
+        ledger = CapacityLedger.from_frame(sem_dict, max_capacity)
+    result.update(sem_dict=sem_dict, ledger=ledger, report=ledger.to_frame(max_capacity))
+    return result
@@ -0,0 +1,452 @@
+"""
+Local Search Improvement
+========================
+Simulated-annealing phase that starts from a finished placement and keeps
+moving and swapping units while a weighted objective improves.
+
+• Units are the engine's scheduling units, so a CM group always moves as one
+  block; improve_oe_groups() runs the same search over whole OE groups.
+• The objective weighs unscheduled units, Mumbai overload, schedule span
+  (not for business schools), capacity headroom, back-to-back exams per
+  cohort and slot balance, each term outweighing the ones after it, so
+  overload is never traded for span.
+• Units only move to slots the greedy pass would give them: a unit with a
+  fixed slot stays in it (or where greedy had to put it instead).
+• Every move only touches the moved unit's cohorts, campuses and day/slot
+  counters, so its cost delta is independent of the timetable size.
+• The search stops when its wall-clock budget runs out. Its best placement
+  is kept only when unscheduled units, overload and span (business schools:
+  unscheduled units and overload) are all no worse than greedy's; otherwise
+  the greedy placement stands.
+"""
+
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from timetable_engine import (
+    Calendar, base_session_load, campus_keys, execute_pass, flag_overloaded_units, get_time_slot_from_number,
+    is_capped_campus, no_worse_than, placement_summary, quality_keys, unit_placements, write_assignments
+)
+
+
+# Each term outweighs everything after it for any realistic timetable (a
+# student of overload costs more than 50 days of span), so the search never
+# stretches or packs the calendar at the price of overload.
+DEFAULT_WEIGHTS = {
+    'unscheduled': 1e9,       # per unit left without a date
+    'overload': 1e5,          # per student above capacity in a Mumbai session
+    'span': 2000.0,           # per day up to the last day in use
+    'headroom': 20.0,         # sum of squared Mumbai session fill ratios
+    'back_to_back': 10.0,     # cohort exams on the same or consecutive days
+    'slot_balance': 1.0,      # spread of unit counts across the slots of a day
+}
+
+
+def movable_slots(unit, slots, placed_slot=None):
+    """
+    Slots a unit may move to: all of them, or for a unit with a configured
+    fixed slot only that one and the slot greedy placed it in.
+    """
+    fixed = unit.get('fixed_slot', 0)
+    if not fixed > 0 or int(fixed) not in slots:
+        return list(slots)
+    return sorted({int(fixed), placed_slot} - {None})
+
+
+class _SessionLoad(dict):
+    """Students per (day, time slot, campus index), starting from the seats base_load already holds."""
+
+    def __init__(self, base_load=None):
+        super().__init__()
+        self.base_load = base_load
+
+    def __missing__(self, key):
+        value = self[key] = self.base_load(*key) if self.base_load else 0.0
+        return value
+
+
+def run_local_search(all_units, placements, day_dates, time_slots_dict, max_capacity, profile, enforce_cap,
+                     allowed_days=None, allowed_slots=None, movable=None, base_load=None, time_budget=5.0,
+                     weights=None, seed=0):
+    """
+    Improve a placement of units by simulated annealing.
+
+    Args:
+        all_units (list): Units with 'branch_sems', 'capped_idx', 'capped_demand'
+        placements (list): (day index, slot number) or None per unit
+        day_dates (list): datetime for each day index
+        time_slots_dict (dict): Configured time slots
+        max_capacity (int): Mumbai student limit per date/slot
+        profile (dict): Output of get_college_profile()
+        enforce_cap (bool): Treat Mumbai capacity as a hard limit for moves
+        allowed_days (list): Per unit, the day indices it may move to (default: all)
+        allowed_slots (list): Per unit, the slot numbers it may move to (default: all)
+        movable (list): Unit positions the search may move (default: all)
+        base_load (callable): Seats already held per (day, time slot, campus
+                              index), from base_session_load() (batch mode)
+        time_budget (float): Wall-clock budget in seconds
+        weights (dict): Overrides for DEFAULT_WEIGHTS
+        seed (int): Random seed
+
+    Returns:
+        tuple: (best placements, stats dict)
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    rng = random.Random(seed)
+    is_business = profile['is_business_school']
+    # Business schools spread their exams over the whole range on purpose
+    span_weight = 0.0 if is_business else weights['span']
+    num_days = len(day_dates)
+    slots = sorted(time_slots_dict.keys())
+    if allowed_days is None:
+        allowed_days = [range(num_days)] * len(all_units)
+    if allowed_slots is None:
+        allowed_slots = [slots] * len(all_units)
+    if movable is None:
+        movable = list(range(len(all_units)))
+    placements = list(placements)
+
+    # ── Static per-unit data ──
+    cohort_ids = {}
+    unit_cohorts = [[cohort_ids.setdefault(bs, len(cohort_ids)) for bs in unit['branch_sems']] for unit in all_units]
+    unit_gap = [
+        not is_business and (profile['is_law_school'] or unit['type'] == 'COMMON') and not unit.get('is_two_credit', False)
+        for unit in all_units
+    ]
+    unit_load = [list(zip(unit['capped_idx'].tolist(), unit['capped_demand'].tolist())) for unit in all_units]
+    slot_group = {s: get_time_slot_from_number(s, time_slots_dict)
+                  for s in set(slots) | {spot[1] for spot in placements if spot is not None}}
+    calendar = Calendar(day_dates)
+    prev_day, next_day = calendar.prev_adjacent, calendar.next_adjacent
+
+    # ── Incremental state ──
+    cohort_day = [[0] * num_days for _ in cohort_ids]
+    gap_day = [[0] * num_days for _ in cohort_ids]
+    cohort_slot = defaultdict(int)
+    session_load = _SessionLoad(base_load)
+    day_count = [0] * num_days
+    slot_count = defaultdict(int)
+    terms = {'unscheduled': 0.0, 'overload': 0.0, 'headroom': 0.0, 'back_to_back': 0.0, 'slot_balance': 0.0}
+    last_day = [-1]
+    # Headroom is the squared fill ratio; a capacity of 0 has no ratio
+    fill_scale = 1.0 / (max_capacity * max_capacity) if max_capacity > 0 else 0.0
+
+    def overload_of(load):
+        return load - max_capacity if load > max_capacity else 0.0
+
+    def add(u, d, s):
+        placements[u] = (d, s)
+        terms['unscheduled'] -= 1
+        for c in unit_cohorts[u]:
+            row = cohort_day[c]
+            n = row[d]
+            terms['back_to_back'] += n
+            if n == 0:
+                if prev_day[d] is not None and row[prev_day[d]]: terms['back_to_back'] += 1
+                if next_day[d] is not None and row[next_day[d]]: terms['back_to_back'] += 1
+            row[d] = n + 1
+            if unit_gap[u]: gap_day[c][d] += 1
+            if is_business: cohort_slot[(c, d, s)] += 1
+        for campus, demand in unit_load[u]:
+            key = (d, slot_group[s], campus)
+            old = session_load[key]
+            new = old + demand
+            session_load[key] = new
+            terms['overload'] += overload_of(new) - overload_of(old)
+            terms['headroom'] += (new * new - old * old) * fill_scale
+        terms['slot_balance'] += 2 * slot_count[(d, s)] + 1 - (2 * day_count[d] + 1) / len(slots)
+        slot_count[(d, s)] += 1
+        day_count[d] += 1
+        if d > last_day[0]: last_day[0] = d
+
+    def remove(u):
+        d, s = placements[u]
+        placements[u] = None
+        terms['unscheduled'] += 1
+        for c in unit_cohorts[u]:
+            row = cohort_day[c]
+            n = row[d] - 1
+            row[d] = n
+            terms['back_to_back'] -= n
+            if n == 0:
+                if prev_day[d] is not None and row[prev_day[d]]: terms['back_to_back'] -= 1
+                if next_day[d] is not None and row[next_day[d]]: terms['back_to_back'] -= 1
+            if unit_gap[u]: gap_day[c][d] -= 1
+            if is_business: cohort_slot[(c, d, s)] -= 1
+        for campus, demand in unit_load[u]:
+            key = (d, slot_group[s], campus)
+            old = session_load[key]
+            new = old - demand
+            session_load[key] = new
+            terms['overload'] += overload_of(new) - overload_of(old)
+            terms['headroom'] += (new * new - old * old) * fill_scale
+        slot_count[(d, s)] -= 1
+        day_count[d] -= 1
+        terms['slot_balance'] -= 2 * slot_count[(d, s)] + 1 - (2 * day_count[d] + 1) / len(slots)
+        while last_day[0] >= 0 and day_count[last_day[0]] == 0:
+            last_day[0] -= 1
+        return d, s
+
+    def fits(u, d, s):
+        """Hard rules for placing (currently unplaced) unit u at day d, slot s."""
+        for c in unit_cohorts[u]:
+            if is_business:
+                if cohort_slot[(c, d, s)]: return False
+            elif cohort_day[c][d]:
+                return False
+            if unit_gap[u]:
+                # Alternate-day gap between gap units of the same cohort
+                if prev_day[d] is not None and gap_day[c][prev_day[d]]: return False
+                if next_day[d] is not None and gap_day[c][next_day[d]]: return False
+        if enforce_cap:
+            for campus, demand in unit_load[u]:
+                if session_load[(d, slot_group[s], campus)] + demand > max_capacity:
+                    return False
+        return True
+
+    def cost():
+        return (weights['unscheduled'] * terms['unscheduled'] + weights['overload'] * terms['overload']
+                + span_weight * (last_day[0] + 1) + weights['headroom'] * terms['headroom']
+                + weights['back_to_back'] * terms['back_to_back'] + weights['slot_balance'] * terms['slot_balance'])
+
+    terms['unscheduled'] = len(all_units)
+    for u, spot in enumerate(placements):
+        if spot is not None:
+            placements[u] = None
+            add(u, *spot)
+
+    initial_cost = current_cost = best_cost = cost()
+    # best_saved is False while the current state itself is the best seen;
+    # it is copied out only before an uphill move leaves it.
+    best, best_saved = None, False
+    unplaced = [u for u in movable if placements[u] is None]
+    placed = [u for u in movable if placements[u] is not None]
+
+    temp_start, temp_end = weights['span'] * 0.05, 0.05
+    iterations = accepted = 0
+    start = time.perf_counter()
+    deadline = start + max(0.0, time_budget)
+    temperature = temp_start
+
+    while placed or unplaced:
+        if iterations % 128 == 0:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            progress = (now - start) / max(time_budget, 1e-9)
+            temperature = temp_start * (temp_end / temp_start) ** progress
+        iterations += 1
+
+        move = rng.random()
+        inserted = None
+        if unplaced and (move < 0.1 or not placed):
+            # Insert an unscheduled unit
+            i = rng.randrange(len(unplaced))
+            u = unplaced[i]
+            d, s = rng.choice(allowed_days[u]), rng.choice(allowed_slots[u])
+            if not fits(u, d, s):
+                continue
+            add(u, d, s)
+            inserted = i
+            undo = lambda u=u: remove(u)
+            redo = lambda u=u, d=d, s=s: add(u, d, s)
+        elif move < 0.75 or len(placed) < 2:
+            # Move one unit to another day/slot
+            u = placed[rng.randrange(len(placed))]
+            d, s = rng.choice(allowed_days[u]), rng.choice(allowed_slots[u])
+            if placements[u] == (d, s):
+                continue
+            old = remove(u)
+            if not fits(u, d, s):
+                add(u, *old)
+                continue
+            add(u, d, s)
+            undo = lambda u=u, old=old: (remove(u), add(u, *old))
+            redo = lambda u=u, d=d, s=s: (remove(u), add(u, d, s))
+        else:
+            # Swap the day/slot of two units
+            u = placed[rng.randrange(len(placed))]
+            v = placed[rng.randrange(len(placed))]
+            if u == v or placements[u] == placements[v]:
+                continue
+            old_u, old_v = remove(u), remove(v)
+            if (old_v[0] not in allowed_days[u] or old_u[0] not in allowed_days[v]
+                    or old_v[1] not in allowed_slots[u] or old_u[1] not in allowed_slots[v] or not fits(u, *old_v)):
+                add(v, *old_v); add(u, *old_u)
+                continue
+            add(u, *old_v)
+            if not fits(v, *old_u):
+                remove(u); add(v, *old_v); add(u, *old_u)
+                continue
+            add(v, *old_u)
+            undo = lambda u=u, v=v, a=old_u, b=old_v: (remove(u), remove(v), add(v, *b), add(u, *a))
+            redo = lambda u=u, v=v, a=old_u, b=old_v: (remove(u), remove(v), add(v, *a), add(u, *b))
+
+        new_cost = cost()
+        delta = new_cost - current_cost
+        if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+            undo()
+            continue
+        if delta > 0 and not best_saved:
+            undo()
+            best, best_saved = list(placements), True
+            redo()
+        if inserted is not None:
+            unplaced[inserted] = unplaced[-1]
+            unplaced.pop()
+            placed.append(u)
+
+        accepted += 1
+        current_cost = new_cost
+        if current_cost < best_cost:
+            best_cost, best_saved = current_cost, False
+
+    if not best_saved:
+        best = list(placements)
+
+    stats = {
+        'iterations': iterations, 'accepted': accepted, 'elapsed': time.perf_counter() - start,
+        'initial_cost': initial_cost, 'final_cost': best_cost,
+    }
+    return best, stats
+
+
+def search_pass(df, units, core_valid_dates, time_slots_dict, max_capacity, profile, enforce_cap,
+                base_ledger=None, time_budget=5.0, weights=None, seed=0):
+    """
+    Greedy placement followed by local search; same arguments and return value
+    as timetable_engine.execute_pass, including base_ledger (seats already
+    taken by other timetables in batch mode).
+
+    Returns:
+        tuple: (scheduled DataFrame, list of unscheduled units). The frame's
+               attrs['local_search'] holds the search statistics, with
+               'kept_greedy' set when the greedy placement was returned.
+    """
+    greedy_df, greedy_unscheduled = execute_pass(df, units, core_valid_dates, time_slots_dict,
+                                                 max_capacity, profile, enforce_cap, base_ledger=base_ledger)
+    all_units = units['priority'] + units['normal'] + units['individual']
+    date_strs = Calendar(core_valid_dates).strs
+    if not date_strs or not all_units:
+        return greedy_df, greedy_unscheduled
+    base_load = base_session_load(base_ledger, date_strs, units['campuses'])
+
+    slots = sorted(time_slots_dict.keys())
+    greedy_placements = unit_placements(greedy_df, all_units, date_strs)
+    greedy_summary = placement_summary(all_units, greedy_placements, time_slots_dict, max_capacity, base_load)
+    # A longer span than greedy's is never kept (business schools aside), so
+    # once greedy has placed every unit the search stays within its days.
+    keys = quality_keys(profile)
+    spread = 'span' not in keys or greedy_summary['unscheduled']
+    days = range(len(date_strs) if spread else greedy_summary['span'])
+    placements, stats = run_local_search(
+        all_units, greedy_placements, core_valid_dates, time_slots_dict, max_capacity, profile, enforce_cap,
+        allowed_days=[days] * len(all_units),
+        allowed_slots=[movable_slots(unit, slots, spot and spot[1]) for unit, spot in zip(all_units, greedy_placements)],
+        base_load=base_load, time_budget=time_budget, weights=weights, seed=seed,
+    )
+    stats['kept_greedy'] = not no_worse_than(
+        placement_summary(all_units, placements, time_slots_dict, max_capacity, base_load), greedy_summary, keys)
+    if stats['kept_greedy']:
+        stats['moved_units'] = 0
+        greedy_df.attrs['local_search'] = stats
+        return greedy_df, greedy_unscheduled
+
+    assigned = [(unit, spot) for unit, spot in zip(all_units, placements) if spot is not None]
+    assigned_units = [unit for unit, _ in assigned]
+    assigned_dates = [spot[0] for _, spot in assigned]
+    assigned_slots = [spot[1] for _, spot in assigned]
+    assigned_overload = flag_overloaded_units(assigned_units, assigned_dates, assigned_slots,
+                                              time_slots_dict, max_capacity, base_load)
+    work_df = write_assignments(df, assigned_units, assigned_dates, assigned_slots, assigned_overload,
+                                date_strs, time_slots_dict)
+    stats['moved_units'] = sum(1 for old, new in zip(greedy_placements, placements) if old != new)
+    work_df.attrs['local_search'] = stats
+    unscheduled = [unit for unit, spot in zip(all_units, placements) if spot is None]
+    return work_df, unscheduled
+
+def improve_oe_groups(scheduled_df, time_slots_dict, max_capacity, profile, enforce_cap=True,
+                      base_ledger=None, time_budget=2.0, weights=None, seed=0):
+    """
+    Local search over whole OE groups, keeping them on the days OE already uses.
+
+    Every other row stays where it is and only contributes cohort occupancy
+    and Mumbai load, so an OE group can trade day or slot with another OE
+    group or move to a quieter slot of the OE window.
+
+    Args:
+        scheduled_df (DataFrame): Full schedule (core and OE rows)
+        base_ledger (CapacityLedger): Seats already taken by other timetables
+
+    Returns:
+        tuple: (updated DataFrame, list of (OE tag, old date, old slot,
+                new date, new slot) for every moved group; empty when the
+                search found nothing no worse than the current placement)
+    """
+    is_oe = scheduled_df['OE'].notna() & (scheduled_df['OE'].astype(str).str.strip() != "")
+    dated = scheduled_df['Exam Date'].astype(str).str.match(r'^\d{2}-\d{2}-\d{4}$')
+    if not (is_oe & dated).any():
+        return scheduled_df, []
+
+    frame = scheduled_df[dated]
+    campus = campus_keys(frame)
+    campuses = sorted(campus.unique())
+    capped = {c: i for i, c in enumerate(campuses) if is_capped_campus(c)}
+    cohort = frame['Branch'].astype(str) + "_" + frame['Semester'].astype(str)
+
+    day_strs = sorted(frame['Exam Date'].unique(), key=lambda d: datetime.strptime(d, "%d-%m-%Y"))
+    day_pos = {d: i for i, d in enumerate(day_strs)}
+    oe_frame = frame[is_oe.loc[frame.index]]
+    core_frame = frame[~is_oe.loc[frame.index]]
+    oe_days = sorted({day_pos[d] for d in oe_frame['Exam Date']})
+
+    all_units, placements, movable = [], [], []
+    groups = [(tag, rows, 'OE') for tag, rows in oe_frame.groupby('OE', observed=True)]
+    groups += [(key, rows, 'INDIVIDUAL') for key, rows in core_frame.groupby(['Exam Date', 'ExamSlotNumber', 'ModuleCode'], observed=True)]
+    for key, rows, unit_type in groups:
+        slots_used = rows[['Exam Date', 'ExamSlotNumber']].drop_duplicates()
+        if len(slots_used) != 1:
+            continue  # a group split over several sittings is left alone
+        demand = rows['StudentCount'].groupby(campus.loc[rows.index]).sum()
+        demand = demand[demand.index.isin(list(capped))]
+        if unit_type == 'OE':
+            movable.append(len(all_units))
+        all_units.append({
+            'type': unit_type, 'id': key, 'indices': rows.index.tolist(),
+            'branch_sems': list(set(cohort.loc[rows.index])),
+            'capped_idx': np.array([capped[c] for c in demand.index], dtype=np.intp),
+            'capped_demand': demand.to_numpy(dtype=float),
+        })
+        placements.append((day_pos[slots_used.iloc[0, 0]], int(slots_used.iloc[0, 1])))
+    if not movable:
+        return scheduled_df, []
+
+    day_dates = [datetime.strptime(d, "%d-%m-%Y") for d in day_strs]
+    base_load = base_session_load(base_ledger, day_strs, campuses)
+    best, _ = run_local_search(
+        all_units, placements, day_dates, time_slots_dict, max_capacity, profile, enforce_cap,
+        allowed_days=[oe_days] * len(all_units), movable=movable, base_load=base_load, time_budget=time_budget,
+        weights=weights, seed=seed,
+    )
+    if not no_worse_than(placement_summary(all_units, best, time_slots_dict, max_capacity, base_load),
+                         placement_summary(all_units, placements, time_slots_dict, max_capacity, base_load),
+                         quality_keys(profile)):
+        return scheduled_df, []
+
+    updated = scheduled_df.copy(deep=False)
+    moves = []
+    for u in movable:
+        if best[u] == placements[u]:
+            continue
+        (old_d, old_s), (new_d, new_s) = placements[u], best[u]
+        rows = all_units[u]['indices']
+        updated.loc[rows, 'Exam Date'] = day_strs[new_d]
+        updated.loc[rows, 'Time Slot'] = get_time_slot_from_number(new_s, time_slots_dict)
+        updated.loc[rows, 'ExamSlotNumber'] = new_s
+        moves.append((all_units[u]['id'], day_strs[old_d], old_s, day_strs[new_d], new_s))
+    return updated, moves
@@ -0,0 +1,245 @@
+"""
+Exact Scheduling Mode (OR-Tools CP-SAT)
+=======================================
+Drop-in alternative to timetable_engine.execute_pass that places every unit
+with a constraint solver instead of greedy first-fit.
+
+• Same rules as the greedy passes: one exam per cohort per day (per slot for
+  business schools), the alternate-day gap for law and CM units, the Mumbai
+  capacity per date/slot/campus, a CM group sitting in a single slot, and the
+  last two valid days left for Open Electives (callers pass core dates only).
+• The greedy result is fed in as a complete hint (overflow included) and
+  seats are counted exactly as the greedy ledger counts them, so greedy's
+  placement is always a feasible starting point.
+• The incumbent found within the time limit is only kept when it is no worse
+  than greedy on unscheduled units, overload and span (span is not compared
+  for business schools); otherwise the greedy result is returned.
+• OR-Tools is optional; SOLVER_AVAILABLE tells the UI whether to offer it.
+"""
+
+from collections import defaultdict
+
+from timetable_engine import (
+    Calendar, base_session_load, execute_pass, flag_overloaded_units, get_time_slot_from_number, no_worse_than,
+    placement_summary, preferred_slot, quality_keys, unit_placements, write_assignments
+)
+
+try:
+    from ortools.sat.python import cp_model
+    SOLVER_AVAILABLE = True
+except ImportError:
+    cp_model = None
+    SOLVER_AVAILABLE = False
+
+
+# Objective weights: leaving a unit out dominates everything, then Mumbai
+# overload (relaxed mode only), then the span and number of exam days used
+# (not for business schools, which spread over the whole range on purpose).
+WEIGHT_UNSCHEDULED = 10000000
+WEIGHT_OVERLOAD_STUDENT = 100
+WEIGHT_SPAN_DAY = 100
+WEIGHT_EXAM_DAY = 10
+WEIGHT_SLOT_PREFERENCE = 1
+
+# Seconds a solve_pass call may run when the caller gives no limit; also the
+# sidebar's starting value (timetable_pipeline.PASS_TIME_LIMITS)
+DEFAULT_TIME_LIMIT = 20
+
+# Student counts are modelled in hundredths when any of them is fractional,
+# so a session's load is the same sum the greedy ledger adds up.
+FRACTIONAL_DEMAND_SCALE = 100
+
+
+def _demand_scale(all_units):
+    """1 when every Mumbai demand is a whole number of students, else FRACTIONAL_DEMAND_SCALE."""
+    whole = all(float(dm).is_integer() for unit in all_units for dm in unit['capped_demand'].tolist())
+    return 1 if whole else FRACTIONAL_DEMAND_SCALE
+
+
+def solve_pass(df, units, core_valid_dates, time_slots_dict, max_capacity, profile, enforce_cap,
+               base_ledger=None, time_limit=DEFAULT_TIME_LIMIT, num_workers=8):
+    """
+    Place all units with CP-SAT; same arguments and return value as execute_pass.
+
+    Args:
+        base_ledger (CapacityLedger): Seats already taken by other timetables
+                                      (batch mode); not modified
+        time_limit (float): Wall-clock budget in seconds
+        num_workers (int): CP-SAT search workers
+
+    Returns:
+        tuple: (scheduled DataFrame, list of unscheduled units). The frame's
+               attrs['solver'] records the solver status, objective and time,
+               and 'fallback' is "greedy" when the greedy result was kept.
+    """
+    if cp_model is None:
+        raise ImportError("The exact scheduling mode needs OR-Tools: pip install ortools")
+
+    greedy_df, greedy_unscheduled = execute_pass(df, units, core_valid_dates, time_slots_dict,
+                                                 max_capacity, profile, enforce_cap, base_ledger=base_ledger)
+    all_units = units['priority'] + units['normal'] + units['individual']
+    calendar = Calendar(core_valid_dates)
+    date_strs = calendar.strs
+    if not date_strs or not all_units:
+        return greedy_df, greedy_unscheduled
+    base_load = base_session_load(base_ledger, date_strs, units['campuses'])
+
+    slots = sorted(time_slots_dict.keys())
+    days = range(len(date_strs))
+    is_business = profile['is_business_school']
+    model = cp_model.CpModel()
+
+    # x[u][d][s] — unit u sits on day d in slot s
+    x = [[{s: model.NewBoolVar(f"x_{u}_{d}_{s}") for s in slots} for d in days] for u in range(len(all_units))]
+    on_day = [[model.NewBoolVar(f"y_{u}_{d}") for d in days] for u in range(len(all_units))]
+    placed = []
+    for u in range(len(all_units)):
+        for d in days:
+            model.Add(on_day[u][d] == sum(x[u][d].values()))
+        placed_u = model.NewBoolVar(f"placed_{u}")
+        model.Add(placed_u == sum(on_day[u]))
+        placed.append(placed_u)
+
+    # One exam per cohort per day (per slot in business-school mode)
+    cohort_units = defaultdict(list)
+    for u, unit in enumerate(all_units):
+        for bs in unit['branch_sems']:
+            cohort_units[bs].append(u)
+    for bs, members in cohort_units.items():
+        for d in days:
+            if is_business:
+                for s in slots:
+                    model.Add(sum(x[u][d][s] for u in members) <= 1)
+            else:
+                model.Add(sum(on_day[u][d] for u in members) <= 1)
+
+    # Alternate-day gap between gap units (law units and CM groups, two-credit
+    # subjects exempt) of the same cohort on consecutive calendar days. The
+    # greedy pass places these first, so individual subjects are not held to it.
+    if not is_business:
+        adjacent = [(d, calendar.next_adjacent[d]) for d in days if calendar.next_adjacent[d] is not None]
+        gap_units = [u for u, unit in enumerate(all_units)
+                     if (profile['is_law_school'] or unit['type'] == 'COMMON') and not unit.get('is_two_credit', False)]
+        gap_cohorts = defaultdict(list)
+        for u in gap_units:
+            for bs in all_units[u]['branch_sems']:
+                gap_cohorts[bs].append(u)
+        for bs, members in gap_cohorts.items():
+            if len(members) < 2:
+                continue
+            gap_busy = [sum(on_day[u][d] for u in members) for d in days]
+            for d, nxt in adjacent:
+                model.Add(gap_busy[d] + gap_busy[nxt] <= 1)
+
+    # Mumbai capacity per date / time slot / campus. Slots that share a time
+    # string share seats, demands are summed unrounded and seats held by
+    # base_ledger count against the limit, as in the greedy ledger.
+    scale = _demand_scale(all_units)
+    capacity = int(max_capacity * scale)
+    slot_groups = defaultdict(list)
+    for s in slots:
+        slot_groups[get_time_slot_from_number(s, time_slots_dict)].append(s)
+    campus_units = defaultdict(list)
+    for u, unit in enumerate(all_units):
+        for c, demand in zip(unit['capped_idx'].tolist(), unit['capped_demand'].tolist()):
+            if demand > 0:
+                campus_units[c].append((u, int(round(demand * scale))))
+    overflow = {}
+    free = {}
+    for c, members in campus_units.items():
+        for d in days:
+            for time_slot, group in slot_groups.items():
+                held = int(round(base_load(d, time_slot, c) * scale)) if base_load else 0
+                key = (c, d, tuple(group))
+                free[key] = max(0, capacity - held)
+                load = sum(demand * x[u][d][s] for u, demand in members for s in group)
+                if enforce_cap:
+                    model.Add(load <= free[key])
+                else:
+                    extra = model.NewIntVar(0, sum(dm for _, dm in members), f"over_{c}_{d}_{group[0]}")
+                    model.Add(load <= free[key] + extra)
+                    overflow[key] = extra
+
+    # Objective: place everything, then compress the calendar (business
+    # schools keep their spread, so they are not compressed)
+    objective = (WEIGHT_UNSCHEDULED * sum(1 - p for p in placed)
+                 + max(1, WEIGHT_OVERLOAD_STUDENT // scale) * sum(overflow.values()))
+    span = None
+    if not is_business:
+        exam_day = [model.NewBoolVar(f"exam_day_{d}") for d in days]
+        for d in days:
+            model.AddMaxEquality(exam_day[d], [on_day[u][d] for u in range(len(all_units))])
+        span = model.NewIntVar(0, len(date_strs) - 1, "span")
+        for d in days:
+            model.Add(span >= d * exam_day[d])
+        off_preference = []
+        for u, unit in enumerate(all_units):
+            preferred = preferred_slot(unit, time_slots_dict)
+            off_preference.extend(x[u][d][s] for d in days for s in slots if s != preferred)
+        objective += (WEIGHT_SPAN_DAY * span + WEIGHT_EXAM_DAY * sum(exam_day)
+                      + WEIGHT_SLOT_PREFERENCE * sum(off_preference))
+    model.Minimize(objective)
+
+    # Start from the greedy placement; hinting the derived variables as well
+    # (overflow included) lets CP-SAT take it as its first incumbent without a
+    # repair search.
+    greedy_placements = unit_placements(greedy_df, all_units, date_strs)
+    hinted_days = set()
+    for u, hint in enumerate(greedy_placements):
+        for d in days:
+            for s in slots:
+                model.AddHint(x[u][d][s], 1 if hint == (d, s) else 0)
+            model.AddHint(on_day[u][d], 1 if hint and hint[0] == d else 0)
+        model.AddHint(placed[u], 1 if hint else 0)
+        if hint:
+            hinted_days.add(hint[0])
+    if span is not None:
+        for d in days:
+            model.AddHint(exam_day[d], 1 if d in hinted_days else 0)
+        model.AddHint(span, max(hinted_days, default=0))
+    greedy_load = defaultdict(int)
+    for c, members in campus_units.items():
+        for u, demand in members:
+            if greedy_placements[u]:
+                greedy_load[(c,) + greedy_placements[u]] += demand
+    for key, extra in overflow.items():
+        c, d, group = key
+        load = sum(greedy_load[(c, d, s)] for s in group)
+        model.AddHint(extra, max(0, load - free[key]))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = float(time_limit)
+    solver.parameters.num_workers = int(num_workers)
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        greedy_df.attrs['solver'] = {'status': solver.StatusName(status), 'objective': None,
+                                     'wall_time': solver.WallTime(), 'fallback': 'greedy'}
+        return greedy_df, greedy_unscheduled
+
+    placements = [next(((d, s) for d in days for s in slots if solver.Value(x[u][d][s])), None)
+                  for u in range(len(all_units))]
+    solved = placement_summary(all_units, placements, time_slots_dict, max_capacity, base_load)
+    if not no_worse_than(solved, placement_summary(all_units, greedy_placements, time_slots_dict, max_capacity,
+                                                   base_load), quality_keys(profile)):
+        greedy_df.attrs['solver'] = {'status': solver.StatusName(status), 'objective': solver.ObjectiveValue(),
+                                     'wall_time': solver.WallTime(), 'fallback': 'greedy'}
+        return greedy_df, greedy_unscheduled
+
+    assigned_units, assigned_dates, assigned_slots, unscheduled = [], [], [], []
+    for unit, spot in zip(all_units, placements):
+        if spot is None:
+            unscheduled.append(unit)
+            continue
+        assigned_units.append(unit)
+        assigned_dates.append(spot[0])
+        assigned_slots.append(spot[1])
+
+    # Flag every unit that shares an over-capacity Mumbai session
+    assigned_overload = flag_overloaded_units(assigned_units, assigned_dates, assigned_slots,
+                                              time_slots_dict, max_capacity, base_load)
+
+    work_df = write_assignments(df, assigned_units, assigned_dates, assigned_slots, assigned_overload,
+                                date_strs, time_slots_dict)
+    work_df.attrs['solver'] = {'status': solver.StatusName(status), 'objective': solver.ObjectiveValue(),
+                               'wall_time': solver.WallTime(), 'fallback': None}
+    return work_df, unscheduled
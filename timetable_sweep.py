@@ -0,0 +1,185 @@
+"""
+What-If Sweep
+=============
+Evaluates a grid of (end date, Mumbai capacity, number of slots) for one
+input, so the shortest feasible window can be read off a table instead of
+found by regenerating with different sidebar settings.
+
+• Every grid point is an independent greedy run of the core (non-OE)
+  subjects: the strict pass, plus the relaxed pass when the strict one leaves
+  subject groups out, exactly as the capacity popup would offer.
+• The scheduling units are built once and handed to each worker process when
+  it starts; the tasks themselves are just (end date, capacity, slots).
+• "n slots" means the first n of the configured time slots.
+• find_minimal_end_date answers the usual question directly: feasibility only
+  improves as exam days are added, so it binary-searches the number of valid
+  exam days for the shortest window that fits everything, remembering every
+  probe so reruns (and later searches on the same input) reuse them.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import product
+
+import pandas as pd
+
+from timetable_engine import (
+    CapacityLedger, UNSCHEDULED_DATE_MARKERS, build_scheduling_units, execute_pass, get_core_exam_dates,
+    get_valid_dates_in_range
+)
+
+SWEEP_COLUMNS = ["End Date", "Capacity", "Slots", "Exam Days Available", "Unscheduled", "Overloaded Sessions",
+                 "Unscheduled (Relaxed)", "Span (Days)", "Exam Days Used", "Max Daily Load", "Feasible"]
+
+# Set in each worker by _init_worker (and in-process for a serial sweep)
+_SWEEP_INPUT = {}
+
+
+def _init_worker(df, units, profile, holidays, base_date, time_slots):
+    _SWEEP_INPUT.update(df=df, units=units, profile=profile, holidays=holidays, base_date=base_date,
+                        time_slots=time_slots)
+
+
+def schedule_metrics(scheduled):
+    """
+    Span, exam days used and per-cohort max daily load of one schedule.
+
+    The daily load of a cohort (branch + semester) is the number of distinct
+    subjects it sits on one day; the worst cohort-day is reported.
+    """
+    dates = scheduled['Exam Date']
+    placed = scheduled[dates.notna() & ~dates.isin(UNSCHEDULED_DATE_MARKERS)]
+    if placed.empty:
+        return 0, 0, 0
+    days = pd.to_datetime(placed['Exam Date'], format="%d-%m-%Y", errors='coerce')
+    span = (days.max() - days.min()).days + 1
+    daily_load = placed.groupby(['Branch', 'Semester', 'Exam Date'], observed=True)['Subject'].nunique()
+    return int(span), int(days.nunique()), int(daily_load.max())
+
+
+def evaluate_point(end_date, max_capacity, num_slots):
+    """
+    Schedule the worker's input for one grid point.
+
+    Returns:
+        dict: One row of the sweep table (see SWEEP_COLUMNS)
+    """
+    data = _SWEEP_INPUT
+    time_slots = {s: data['time_slots'][s] for s in sorted(data['time_slots'])[:num_slots]}
+    core_dates, _ = get_core_exam_dates(data['df'], data['base_date'], end_date, data['holidays'])
+    row = dict(zip(SWEEP_COLUMNS, [end_date.strftime("%d-%m-%Y"), max_capacity, num_slots, len(core_dates),
+                                   0, 0, 0, 0, 0, 0, True]))
+    if data['units'] is None or not core_dates:
+        row['Feasible'] = data['units'] is None
+        return row
+
+    pass_args = (data['df'], data['units'], core_dates, time_slots, max_capacity, data['profile'])
+    scheduled, unscheduled = execute_pass(*pass_args, enforce_cap=True)
+    row['Unscheduled'] = len(unscheduled)
+    if unscheduled:
+        scheduled, relaxed_unscheduled = execute_pass(*pass_args, enforce_cap=False)
+        row['Unscheduled (Relaxed)'] = len(relaxed_unscheduled)
+        row['Overloaded Sessions'] = len(CapacityLedger.from_frame(scheduled, max_capacity).violations())
+    row['Span (Days)'], row['Exam Days Used'], row['Max Daily Load'] = schedule_metrics(scheduled)
+    row['Feasible'] = not unscheduled
+    return row
+
+
+def sweep_grid(df, profile, holidays, base_date, time_slots, end_dates, capacities, slot_counts, max_workers=None):
+    """
+    Evaluate every (end date, capacity, slot count) combination.
+
+    Args:
+        df (DataFrame): Non-elective frame returned by read_timetable
+        profile (dict): Output of get_college_profile()
+        holidays (set): Holiday dates (datetime.date)
+        base_date (datetime): First exam day
+        time_slots (dict): Configured time slots; point n uses the first n
+        end_dates (list): Last exam days (datetime) to try
+        capacities (list): Mumbai student limits to try
+        slot_counts (list): Numbers of slots to try
+        max_workers (int): Worker processes; all CPUs when not given
+
+    Returns:
+        DataFrame: One row per grid point (SWEEP_COLUMNS), ordered by slots,
+                   capacity and end date
+    """
+    grid = [(end, cap, n) for n, cap, end in product(sorted(set(slot_counts)), sorted(set(capacities)),
+                                                     sorted(set(end_dates)))
+            if 1 <= n <= len(time_slots)]
+    if not grid:
+        return pd.DataFrame(columns=SWEEP_COLUMNS)
+
+    units = build_scheduling_units(df, profile)
+    init_args = (df, units, profile, holidays, base_date, time_slots)
+    workers = min(max_workers or os.cpu_count() or 1, len(grid))
+    if workers <= 1:
+        _init_worker(*init_args)
+        rows = [evaluate_point(*point) for point in grid]
+    else:
+        # Spawned rather than forked: the Streamlit server runs threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=init_args) as pool:
+            rows = list(pool.map(evaluate_point, *zip(*grid), chunksize=max(1, len(grid) // (4 * workers))))
+    return pd.DataFrame(rows, columns=SWEEP_COLUMNS)
+
+
+def find_minimal_end_date(df, profile, holidays, base_date, latest_end, time_slots, max_capacity, memo=None):
+    """
+    Earliest end date that schedules every core subject within capacity.
+
+    Each probe is one strict greedy pass over the first k valid exam days
+    (OE days are still held back from those k, as in a normal run); k is
+    binary-searched between 1 and the valid days up to latest_end.
+
+    Args:
+        df (DataFrame): Non-elective frame returned by read_timetable
+        profile (dict): Output of get_college_profile()
+        holidays (set): Holiday dates (datetime.date)
+        base_date (datetime): First exam day
+        latest_end (datetime): Latest acceptable last exam day
+        time_slots (dict): Configured time slots
+        max_capacity (int): Mumbai student limit per date/slot
+        memo (dict): End date string -> unscheduled units of earlier probes
+                     on this same input; filled in as probes run
+
+    Returns:
+        tuple: (end date as datetime, or None when even latest_end leaves
+                subjects out; list of (end date string, unscheduled count)
+                probes in the order they were asked)
+    """
+    valid_dates = get_valid_dates_in_range(base_date, latest_end, holidays)
+    memo = {} if memo is None else memo
+    probes = []
+    built = {}
+
+    def unscheduled_by(days):
+        end_str = valid_dates[days - 1]
+        if end_str not in memo:
+            if 'units' not in built:
+                built['units'] = build_scheduling_units(df, profile)
+            if built['units'] is None:
+                memo[end_str] = 0
+            else:
+                end = datetime.strptime(end_str, "%d-%m-%Y")
+                core_dates, _ = get_core_exam_dates(df, base_date, end, holidays)
+                _, unscheduled = execute_pass(df, built['units'], core_dates, time_slots, max_capacity, profile,
+                                              enforce_cap=True)
+                memo[end_str] = len(unscheduled)
+        probes.append((end_str, memo[end_str]))
+        return memo[end_str]
+
+    if not valid_dates or unscheduled_by(len(valid_dates)):
+        return None, probes
+
+    low, high = 1, len(valid_dates)  # high always fits
+    while low < high:
+        mid = (low + high) // 2
+        if unscheduled_by(mid):
+            low = mid + 1
+        else:
+            high = mid
+    return datetime.strptime(valid_dates[high - 1], "%d-%m-%Y"), probes